@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the client-side overhead of the hot paths without network access.
+
+Requests are answered by the ``fixtures.FakeAPI`` transport from the recorded
+responses, so the numbers only cover the work done by this library: building
+parameters, decoding and walking responses, and constructing page objects.
+
+For every benchmark the throughput and, from a separate traced run, the peak
+memory allocated during one call and the number of memory blocks still
+allocated afterwards (which should stay near zero) are reported.
+
+Usage::
+
+  python benchmarks/client_benchmark.py [--number 200] [--batches 20] [name ...]
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import gc
+import timeit
+import tracemalloc
+from collections import OrderedDict
+
+from fixtures import FakeAPI, synthetic_links, wikipedia
+
+
+def bench_page(api, args):
+  def page():
+    wikipedia._TITLE_CACHE.clear()
+    return wikipedia.page('Celtuce', auto_suggest=False)
+  return page
+
+
+def bench_page_cached(api, args):
+  return lambda: wikipedia.page('Celtuce', auto_suggest=False)
+
+
+def bench_summary(api, args):
+  def summary():
+    wikipedia.summary.clear_cache()
+    return wikipedia.summary('Celtuce', auto_suggest=False)
+  return summary
+
+
+def bench_section(api, args):
+  cyclone = wikipedia.page('Tropical Depression Ten (2005)', auto_suggest=False)
+  cyclone.content
+  return lambda: cyclone.section('Impact')
+
+
+def bench_disambiguation(api, args):
+  def disambiguation():
+    try:
+      wikipedia.page('Dodge Ram (disambiguation)', auto_suggest=False, redirect=False)
+    except wikipedia.DisambiguationError as e:
+      return e.options
+  return disambiguation
+
+
+def bench_continued_query(api, args):
+  celtuce = wikipedia.page('Celtuce', auto_suggest=False)
+  api.add_handler(
+    lambda params: params.get('prop') == 'links',
+    synthetic_links(celtuce.pageid, args.batches))
+  return lambda: sum(1 for link in celtuce.iter_links())
+
+
+BENCHMARKS = OrderedDict([
+  ('page', bench_page),
+  ('page_cached', bench_page_cached),
+  ('summary', bench_summary),
+  ('section', bench_section),
+  ('disambiguation', bench_disambiguation),
+  ('continued_query', bench_continued_query),
+])
+
+
+def traced(fn):
+  '''Peak bytes allocated during one call of `fn` and blocks it left allocated.'''
+  fn()  # warm up lazily filled caches
+  gc.collect()
+  tracemalloc.start()
+  try:
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+  finally:
+    tracemalloc.stop()
+
+  blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+  return peak, blocks
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--number', type=int, default=200, help='calls per benchmark')
+  parser.add_argument('--batches', type=int, default=20,
+                      help='500-link batches paged through by continued_query')
+  parser.add_argument('names', nargs='*', help='benchmarks to run: {0} (default: all)'.format(', '.join(BENCHMARKS)))
+  args = parser.parse_args()
+
+  unknown = [name for name in args.names if name not in BENCHMARKS]
+  if unknown:
+    parser.error('unknown benchmark: {0}'.format(', '.join(unknown)))
+
+  print('{0:<18} {1:>10} {2:>11} {3:>10} {4:>10} {5:>9}'.format(
+    'benchmark', 'calls/s', 'us/call', 'requests', 'peak KiB', 'blocks'))
+
+  for name in args.names or BENCHMARKS:
+    api = FakeAPI()
+    api.install()
+    try:
+      fn = BENCHMARKS[name](api, args)
+      peak, blocks = traced(fn)
+      del api.requests[:]
+      elapsed = timeit.timeit(fn, number=args.number)
+    finally:
+      api.uninstall()
+
+    print('{0:<18} {1:>10.0f} {2:>11.1f} {3:>10.1f} {4:>10.1f} {5:>9}'.format(
+      name, args.number / elapsed, elapsed / args.number * 1e6,
+      len(api.requests) / float(args.number), peak / 1024.0, blocks))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the cost of decoding API responses with each installed JSON decoder.
+
+The recorded responses in ``tests/request_mock_data.py`` are grouped by call
+type (the ``prop``, ``list``, ``generator`` or ``action`` of the request) and
+each one is decoded repeatedly. ``--scale`` repeats every list in the
+responses to approximate the large ``links``, ``extracts`` and ``revisions``
+replies of long articles.
+
+Usage::
+
+  python benchmarks/decode_benchmark.py [--number 2000] [--scale 1]
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import gzip
+import io
+import json
+import timeit
+from collections import defaultdict
+
+from fixtures import mock_data
+from wikipedia.instrumentation import call_type
+from wikipedia.util import json_decoders
+
+
+def scaled(value, scale):
+  if isinstance(value, list):
+    return [scaled(item, scale) for item in value] * scale
+  if isinstance(value, dict):
+    return dict((k, scaled(v, scale)) for k, v in value.items())
+  if isinstance(value, str) and len(value) > 200:
+    return value * scale
+  return value
+
+
+def gzipped_size(body):
+  buf = io.BytesIO()
+  with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+    f.write(body)
+  return len(buf.getvalue())
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--number', type=int, default=2000, help='decodes per response')
+  parser.add_argument('--scale', type=int, default=1, help='repeat lists and long texts this many times')
+  args = parser.parse_args()
+
+  bodies = defaultdict(list)
+  for params, response in mock_data['_wiki_request calls'].items():
+    bodies[call_type(dict(params))].append(json.dumps(scaled(response, args.scale)).encode('utf-8'))
+
+  decoders = json_decoders()
+  header = '{0:<48} {1:>9} {2:>9}'.format('call type', 'bytes', 'gzipped')
+  print(header + ''.join(' {0:>11}'.format(name + ' us') for name, loads in decoders))
+
+  for kind in sorted(bodies):
+    size = sum(len(body) for body in bodies[kind]) // len(bodies[kind])
+    compressed = sum(gzipped_size(body) for body in bodies[kind]) // len(bodies[kind])
+    row = '{0:<48} {1:>9} {2:>9}'.format(kind[:48], size, compressed)
+    for name, loads in decoders:
+      elapsed = sum(timeit.timeit(lambda: loads(body), number=args.number) for body in bodies[kind])
+      row += ' {0:>11.2f}'.format(elapsed / (args.number * len(bodies[kind])) * 1e6)
+    print(row)
+
+
+if __name__ == '__main__':
+  main()
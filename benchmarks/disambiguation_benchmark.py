@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Compare ways of extracting ``DisambiguationError.options`` from a rendered page.
+
+* ``beautifulsoup`` - the former implementation, building a BeautifulSoup tree
+  (skipped if beautifulsoup4 is not installed)
+* ``streaming`` - ``_parse_disambiguation``, which streams the HTML through HTMLParser
+* ``cached`` - looking up the options of an unchanged revision in the cache
+
+Pages are the recorded "Dodge Ram (disambiguation)" and synthetic disambiguation
+pages with ``--items`` list items.
+
+Usage::
+
+  python benchmarks/disambiguation_benchmark.py [--number 200] [--items 100 1000]
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import timeit
+
+from fixtures import mock_data, wikipedia
+
+
+def beautifulsoup_options(html):
+  from bs4 import BeautifulSoup
+
+  lis = BeautifulSoup(html, 'html.parser').find_all('li')
+  filtered_lis = [li for li in lis if not 'tocsection' in ''.join(li.get('class', []))]
+  return [li.a.get_text() for li in filtered_lis if li.a]
+
+
+def recorded_page():
+  for params, response in mock_data['_wiki_request calls'].items():
+    if dict(params).get('titles') == 'Dodge Ram (disambiguation)' and 'rvparse' in dict(params):
+      return list(response['query']['pages'].values())[0]['revisions'][0]['*']
+
+
+def synthetic_page(items):
+  toc = ''.join(
+    '<li class="toclevel-1 tocsection-{0}"><a href="#s{0}"><span class="toctext">Section {0}</span></a></li>'.format(i)
+    for i in range(items // 20))
+  entries = ''.join(
+    '<li><a href="/wiki/Option_{0}" title="Option {0}">Option <i>{0}</i></a>, '
+    'a <a href="/wiki/Thing">thing</a> &amp; more</li>'.format(i)
+    for i in range(items))
+  return '<div id="toc"><ul>{0}</ul></div><p>Term may refer to:</p><ul>{1}</ul>'.format(toc, entries)
+
+
+def cached_options(html):
+  pageid = '1'
+  options = wikipedia._cached_disambiguation_options(pageid, 1)
+  if options is None:
+    wikipedia._DISAMBIGUATION_CACHE.set((wikipedia.API_URL, pageid, 1), tuple(wikipedia._parse_disambiguation(html)))
+    options = wikipedia._cached_disambiguation_options(pageid, 1)
+  return options
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--number', type=int, default=200, help='extractions per page and method')
+  parser.add_argument('--items', type=int, nargs='*', default=[100, 1000], help='list items of the synthetic pages')
+  args = parser.parse_args()
+
+  methods = [('streaming', wikipedia._parse_disambiguation), ('cached', cached_options)]
+  try:
+    import bs4
+    methods.insert(0, ('beautifulsoup', beautifulsoup_options))
+  except ImportError:
+    pass
+
+  pages = [('Dodge Ram (recorded)', recorded_page())]
+  pages += [('{0} items'.format(items), synthetic_page(items)) for items in args.items]
+
+  print('{0:<22} {1:>9} {2:>8}'.format('page', 'bytes', 'options') + ''.join(
+    ' {0:>16}'.format(name + ' us') for name, extract in methods))
+
+  for name, html in pages:
+    options = wikipedia._parse_disambiguation(html)
+    row = '{0:<22} {1:>9} {2:>8}'.format(name, len(html), len(options))
+    for method, extract in methods:
+      wikipedia._DISAMBIGUATION_CACHE.clear()
+      assert extract(html) == options, method
+      elapsed = timeit.timeit(lambda: extract(html), number=args.number)
+      row += ' {0:>16.1f}'.format(elapsed / args.number * 1e6)
+    print(row)
+
+
+if __name__ == '__main__':
+  main()
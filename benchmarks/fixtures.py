@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Offline stand-in for the Wikipedia API used by the benchmarks.
+
+``FakeAPI`` is a ``FakeTransport`` serving the recorded responses in
+``tests/request_mock_data.py`` and, for queries registered with
+``add_handler``, synthetic responses. Requests go through the whole of
+``_wiki_request`` (retries, instrumentation, JSON decoding) as usual.
+"""
+from __future__ import unicode_literals
+
+import json
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from wikipedia import wikipedia
+from wikipedia.transport import FakeTransport, Response
+from request_mock_data import mock_data
+
+
+class FakeAPI(FakeTransport):
+  """Serve recorded and synthetic responses instead of making HTTP requests."""
+
+  def __init__(self):
+    super(FakeAPI, self).__init__(mock_data['_wiki_request calls'])
+    self.handlers = []
+
+  def add_handler(self, matches, respond):
+    """Answer requests for which ``matches(params)`` is true with ``respond(params)``."""
+    self.handlers.append((matches, respond))
+
+  def get(self, url, params, headers, timeout):
+    for matches, respond in self.handlers:
+      if matches(params):
+        self.requests.append(dict(params))
+        return Response(200, {}, json.dumps(respond(params)).encode('utf-8'))
+    return super(FakeAPI, self).get(url, params, headers, timeout)
+
+  def install(self):
+    self._original = wikipedia.TRANSPORT
+    wikipedia.set_transport(self)
+
+  def uninstall(self):
+    wikipedia.set_transport(self._original)
+
+
+def synthetic_links(pageid, batches, batch_size=500):
+  """
+  A ``respond`` function paging through ``batches * batch_size`` links of the
+  page `pageid`, one continued response per batch.
+  """
+  def respond(params):
+    batch = int(params.get('plcontinue', '0'))
+    links = [
+      {'ns': 0, 'title': 'Synthetic link {0}'.format(batch * batch_size + i)}
+      for i in range(batch_size)]
+    response = {'query': {'pages': {pageid: {'pageid': int(pageid), 'ns': 0, 'links': links}}}}
+    if batch + 1 < batches:
+      response['continue'] = {'plcontinue': str(batch + 1), 'continue': '||'}
+    return response
+
+  return respond
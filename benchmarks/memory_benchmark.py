@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the memory held by loaded pages, per 10,000 pages.
+
+Pages are loaded through the ``fixtures.FakeAPI`` transport with
+``prefetch(['content', 'links'])``, answered with synthetic pages of ``--words``
+words of text and ``--links`` links, and kept alive while the memory still
+allocated is measured with tracemalloc. Each mode is reported with the time to
+read ``content`` and ``links`` once more from every page.
+
+* ``page`` - ``WikipediaPage``
+* ``compact`` - ``CompactWikipediaPage``, which keeps text and lists compressed
+* ``released`` - ``CompactWikipediaPage`` after ``release()``, keeping only identity and revision IDs
+
+Usage::
+
+  python benchmarks/memory_benchmark.py [--pages 10000] [--words 2000] [--links 200]
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from fixtures import FakeAPI, wikipedia
+
+WORDS = (
+  'the of and in to a was is for on as by with from at that his an were which are it '
+  'century city river war government population district during first new national '
+  'school world state people later university century region church area music team'
+).split()
+
+
+def synthetic_page(args):
+  '''A ``respond`` function for merged content and links queries of any pageid.'''
+  def respond(params):
+    pageid = params['titles'].rpartition(' ')[2]
+    rng = random.Random(pageid)
+    text = ' '.join(rng.choice(WORDS) for i in range(args.words))
+    links = [{'ns': 0, 'title': 'Article {0}'.format(rng.randint(0, 10 ** 6))} for i in range(args.links)]
+    return {'query': {'pages': {pageid: {
+      'pageid': int(pageid), 'ns': 0, 'title': 'Page {0}'.format(pageid), 'extract': text,
+      'revisions': [{'revid': int(pageid) * 10, 'parentid': int(pageid) * 10 - 1}], 'links': links}}}}
+  return respond
+
+
+def load(page_class, pageid):
+  info = {'pageid': pageid, 'title': 'Page {0}'.format(pageid), 'fullurl': 'http://en.wikipedia.org/wiki/?curid={0}'.format(pageid)}
+  page = page_class._from_info(info)
+  page.prefetch(['content', 'links'])
+  return page
+
+
+def measure(api, args, page_class, release=False):
+  gc.collect()
+  tracemalloc.start()
+  try:
+    before = tracemalloc.get_traced_memory()[0]
+    pages = [load(page_class, pageid) for pageid in range(1, args.pages + 1)]
+    if release:
+      for page in pages:
+        page.release()
+    # requests recorded by the transport are not held by the pages
+    del api.requests[:]
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+  finally:
+    tracemalloc.stop()
+
+  started = time.time()
+  if not release:
+    for page in pages:
+      page.content
+      page.links
+  elapsed = time.time() - started
+
+  return held, elapsed
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--pages', type=int, default=10000, help='pages held in memory')
+  parser.add_argument('--words', type=int, default=2000, help='words of content per page')
+  parser.add_argument('--links', type=int, default=200, help='links per page')
+  args = parser.parse_args()
+
+  api = FakeAPI()
+  api.add_handler(lambda params: 'extracts' in params.get('prop', ''), synthetic_page(args))
+  api.install()
+  try:
+    print('{0:<10} {1:>18} {2:>14} {3:>16}'.format('mode', 'MiB / 10k pages', 'KiB / page', 'read ms / 10k'))
+    for mode, page_class, release in (
+        ('page', wikipedia.WikipediaPage, False),
+        ('compact', wikipedia.CompactWikipediaPage, False),
+        ('released', wikipedia.CompactWikipediaPage, True)):
+      held, elapsed = measure(api, args, page_class, release)
+      per_page = held / float(args.pages)
+      print('{0:<10} {1:>18.1f} {2:>14.2f} {3:>16.1f}'.format(
+        mode, per_page * 10000 / 2 ** 20, per_page / 1024, elapsed / args.pages * 10000 * 1000))
+  finally:
+    api.uninstall()
+
+
+if __name__ == '__main__':
+  main()
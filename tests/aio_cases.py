@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+'''
+Tests of wikipedia.aio, which needs Python 3.6 or newer. They are loaded by
+aio_test, so that the other test modules stay importable on Python 2.
+'''
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+
+import requests
+
+from wikipedia import aio, instrumentation, wikipedia
+from wikipedia.transport import FakeTransport
+from decode_test import BodyTransport
+from storage_test import RandomTransport
+from retry_test import FlakyTransport
+from request_mock_data import mock_data
+
+
+class MockTransport(object):
+  """Serve the recorded responses instead of making HTTP requests."""
+
+  def __init__(self):
+    self.requests = []
+
+  async def get(self, url, params, headers, timeout):
+    params = dict((k, v) for k, v in params.items() if k not in ('format', 'action') or v == 'parse')
+    self.requests.append(params)
+    # yield to the event loop like a real request, so concurrent requests interleave
+    await asyncio.sleep(0)
+    response = mock_data["_wiki_request calls"][tuple(sorted(params.items()))]
+    return aio.Response(200, {}, json.dumps(response).encode('utf-8'))
+
+  async def close(self):
+    pass
+
+
+def run(coroutine):
+  loop = asyncio.new_event_loop()
+  try:
+    return loop.run_until_complete(coroutine)
+  finally:
+    loop.close()
+
+
+class TestAio(unittest.TestCase):
+  """Test the asyncio counterparts of the wikipedia functions."""
+
+  def setUp(self):
+    self.transport = MockTransport()
+    aio.set_transport(self.transport)
+    for cached_func in (aio.search, aio.summary):
+      cached_func.clear_cache()
+
+  def tearDown(self):
+    aio.set_transport(None)
+
+  def test_search(self):
+    """Test parsing a search result."""
+    self.assertEqual(run(aio.search("Barack Obama")), mock_data['data']["barack.search"])
+
+  def test_page(self):
+    """Test loading a page and its lazy properties."""
+    async def load():
+      celtuce = await aio.page("Celtuce")
+      return celtuce, await celtuce.links(), await celtuce.images()
+
+    celtuce, links, images = run(load())
+    self.assertEqual(celtuce.url, "http://en.wikipedia.org/wiki/Celtuce")
+    self.assertEqual(links, mock_data['data']["celtuce.links"])
+    self.assertEqual(sorted(images), mock_data['data']["celtuce.images"])
+
+  def test_preload(self):
+    """Test that preloading requests the content once for content and sections."""
+    celtuce = run(aio.page("Celtuce", auto_suggest=False, preload=True))
+    self.assertEqual(celtuce._content, mock_data['data']["celtuce.content"])
+    self.assertEqual(
+      len([params for params in self.transport.requests if params['prop'] == 'extracts|revisions']), 1)
+
+  def test_iter_links(self):
+    """Test streaming the titles of links."""
+    async def load():
+      celtuce = await aio.page("Celtuce")
+      return [link async for link in celtuce.iter_links()]
+
+    self.assertEqual(run(load()), mock_data['data']["celtuce.links"])
+
+  def test_redirect(self):
+    """Test that a page successfully redirects a query."""
+    mp = run(aio.page("Menlo Park, New Jersey", auto_suggest=False))
+    self.assertEqual(mp.title, "Edison, New Jersey")
+
+  def test_disambiguate(self):
+    """Test that a disambiguation page raises DisambiguationError."""
+    ram = aio.page("Dodge Ram (disambiguation)", auto_suggest=False, redirect=False)
+    self.assertRaises(aio.DisambiguationError, run, ram)
+
+  def test_summary(self):
+    """Test the summary coroutine."""
+    self.assertEqual(run(aio.summary("Celtuce")), mock_data['data']["celtuce.summary"])
+
+  def test_cached(self):
+    """Test that results are cached without caching the coroutine."""
+    run(aio.search("Porsche", results=3))
+    self.assertEqual(run(aio.search("Porsche", results=3)), mock_data['data']["porsche.search"])
+    self.assertEqual(len(self.transport.requests), 1)
+
+  def test_no_coordinates(self):
+    """Test that a page without coordinates gives None and is requested once."""
+    transport = FakeTransport(mock_data["_wiki_request calls"])
+    transport.add(
+      (('colimit', 'max'), ('prop', 'coordinates'), ('titles', 'Celtuce')),
+      {'query': {'pages': {'1868108': {'pageid': 1868108, 'title': 'Celtuce'}}}})
+    aio.set_transport(AsyncTransport(transport))
+
+    celtuce = run(aio.page("Celtuce", auto_suggest=False))
+    self.assertIsNone(run(celtuce.coordinates()))
+    self.assertIsNone(run(celtuce.coordinates()))
+    self.assertEqual(len([params for params in transport.requests if params.get('prop') == 'coordinates']), 1)
+
+  def test_random_not_cached(self):
+    """Test that random pages bypass the response cache."""
+    directory = tempfile.mkdtemp()
+    wikipedia.set_response_cache(os.path.join(directory, 'responses.sqlite'))
+    aio.set_transport(AsyncTransport(RandomTransport()))
+    try:
+      self.assertEqual([run(aio.random()) for i in range(2)], ['Page 1', 'Page 2'])
+    finally:
+      wikipedia.set_response_cache(None)
+      shutil.rmtree(directory)
+
+  def test_executor_transport(self):
+    """Test serving asyncio requests through ExecutorTransport."""
+    transport = wikipedia.TRANSPORT
+    wikipedia.set_transport(FakeTransport(mock_data["_wiki_request calls"]))
+    aio.set_transport(aio.ExecutorTransport())
+    aio.search.clear_cache()
+    try:
+      self.assertEqual(run(aio.search("Porsche", results=3)), mock_data['data']["porsche.search"])
+    finally:
+      wikipedia.set_transport(transport)
+
+
+class AsyncTransport(object):
+  """Serve the responses of a synchronous transport to coroutines."""
+
+  def __init__(self, transport):
+    self.transport = transport
+
+  async def get(self, url, params, headers, timeout):
+    return self.transport.get(url, params, headers, timeout)
+
+  async def close(self):
+    pass
+
+
+class TestAioRequests(unittest.TestCase):
+  """Test retrying, decoding and instrumenting asyncio requests."""
+
+  body = json.dumps({'query': {'pages': {'1': {'title': 'Ünïcode'}}}}).encode('utf-8')
+
+  def setUp(self):
+    self.events = []
+    self.hook = lambda **kwargs: self.events.append(kwargs)
+    instrumentation.add_hook('after_request', self.hook)
+    wikipedia.reset_metrics()
+    self.policy = wikipedia.RETRY_POLICY
+    wikipedia.set_retry_policy(backoff=timedelta(0), maxlag=5)
+
+  def tearDown(self):
+    instrumentation.remove_hook('after_request', self.hook)
+    wikipedia.RETRY_POLICY = self.policy
+    wikipedia.set_json_decoder()
+    aio.set_transport(None)
+
+  def test_retry(self):
+    """Test that 5xx responses, maxlag errors and connection errors are retried."""
+    transport = FlakyTransport([429, 'maxlag', 'timeout'])
+    aio.set_transport(AsyncTransport(transport))
+    self.assertEqual(run(aio._wiki_request({'list': 'search'})), {'query': {}})
+    self.assertEqual(len(transport.requests), 4)
+    self.assertEqual(transport.requests[0]['maxlag'], 5)
+    self.assertEqual(self.events[-1]['retries'], 3)
+
+  def test_give_up(self):
+    """Test that the error is raised and counted once the retries are used up."""
+    aio.set_transport(AsyncTransport(FlakyTransport([502] * 4)))
+    self.assertRaises(requests.HTTPError, run, aio._wiki_request({'list': 'search'}))
+    self.assertIsNotNone(self.events[-1]['error'])
+    self.assertEqual(wikipedia.metrics()['by_call_type']['list=search']['errors'], 1)
+
+  def test_json_decoder(self):
+    """Test that responses use the configured decoder and raw requests are not decoded."""
+    calls = []
+
+    def loads(content):
+      calls.append(content)
+      return json.loads(content.decode('utf-8'))
+
+    wikipedia.set_json_decoder(loads)
+    aio.set_transport(AsyncTransport(BodyTransport(self.body)))
+    self.assertEqual(run(aio._wiki_request({'prop': 'info'}))['query']['pages']['1']['title'], 'Ünïcode')
+    self.assertEqual(run(aio.raw_request({'prop': 'info'})), self.body)
+    self.assertEqual(calls, [self.body])
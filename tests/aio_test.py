@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+import sys
+
+if sys.version_info >= (3, 6):
+  from aio_cases import *
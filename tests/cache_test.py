@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from decimal import Decimal
+import unittest
+
+from wikipedia import wikipedia
+from wikipedia.transport import FakeTransport
+from wikipedia.util import cache, haversine, SingleFlight, SpatialCache
+from storage_test import RandomTransport
+
+
+class TestCache(unittest.TestCase):
+  """Test the bounded LRU cache used by the cached API functions."""
+
+  def setUp(self):
+    self.calls = []
+
+    @cache(maxsize=2)
+    def double(x):
+      self.calls.append(x)
+      return x * 2
+
+    self.double = double
+
+  def test_hit(self):
+    """Test that repeated calls are served from the cache."""
+    self.assertEqual(self.double(1), 2)
+    self.assertEqual(self.double(1), 2)
+    self.assertEqual(self.calls, [1])
+    self.assertEqual(self.double.cache_info()['hits'], 1)
+    self.assertEqual(self.double.cache_info()['misses'], 1)
+
+  def test_lru_eviction(self):
+    """Test that the least recently used entry is evicted first."""
+    self.double(1)
+    self.double(2)
+    self.double(1)
+    self.double(3)
+    self.double(1)
+    self.double(2)
+
+    self.assertEqual(self.calls, [1, 2, 3, 2])
+    self.assertEqual(self.double.cache_info()['size'], 2)
+    self.assertEqual(self.double.cache_info()['evictions'], 2)
+
+  def test_ttl(self):
+    """Test that expired entries are fetched again."""
+    self.double.configure(maxsize=2, ttl=0.01)
+    self.double(1)
+    time.sleep(0.02)
+    self.double(1)
+    self.assertEqual(self.calls, [1, 1])
+
+  def test_none_is_cached(self):
+    """Test that a None result is cached like any other value."""
+    @cache
+    def nothing():
+      self.calls.append(None)
+
+    nothing()
+    nothing()
+    self.assertEqual(self.calls, [None])
+
+  def test_clear_cache(self):
+    """Test that clear_cache empties the cache."""
+    self.double(1)
+    self.double.clear_cache()
+    self.double(1)
+    self.assertEqual(self.calls, [1, 1])
+
+  def test_api_functions_bounded(self):
+    """Test that the cached API functions have a size limit."""
+    for cached_func in (wikipedia.search, wikipedia.suggest, wikipedia.summary, wikipedia.geosearch, wikipedia.languages):
+      self.assertIsNotNone(cached_func.cache_info()['maxsize'])
+
+
+class TestCacheKeys(unittest.TestCase):
+  """Test that equivalent calls share a cache entry."""
+
+  def setUp(self):
+    self.calls = []
+
+    @cache
+    def locate(latitude, longitude, radius=1000, **options):
+      self.calls.append((latitude, longitude, radius, options))
+      return len(self.calls)
+
+    self.locate = locate
+
+  def test_bound_arguments(self):
+    """Test that defaults and keyword arguments do not create new entries."""
+    self.locate(40.5, 117.25)
+    self.locate(40.5, 117.25, 1000)
+    self.locate(latitude=40.5, longitude=117.25, radius=1000)
+    self.locate(longitude=117.25, latitude=40.5)
+    self.assertEqual(len(self.calls), 1)
+
+    self.locate(40.5, 117.25, 10000)
+    self.assertEqual(len(self.calls), 2)
+
+  def test_numbers(self):
+    """Test that Decimal and float coordinates give the same key."""
+    self.locate(Decimal('40.5'), Decimal('117.250'))
+    self.locate(40.5, 117.25)
+    self.assertEqual(len(self.calls), 1)
+
+  def test_var_keyword(self):
+    """Test that extra keyword arguments are keyed regardless of order."""
+    self.locate(40.5, 117.25, title='A', limit=[1, 2])
+    self.locate(40.5, 117.25, limit=[1, 2], title='A')
+    self.assertEqual(len(self.calls), 1)
+
+  def test_invalid_call(self):
+    """Test that calls not matching the signature still raise TypeError."""
+    self.assertRaises(TypeError, self.locate, 40.5)
+
+
+class BlockingTransport(FakeTransport):
+  """Hold every request until `release` is set."""
+
+  def __init__(self, responses):
+    super(BlockingTransport, self).__init__(responses)
+    self.release = threading.Event()
+
+  def get(self, url, params, headers, timeout):
+    self.release.wait()
+    return super(BlockingTransport, self).get(url, params, headers, timeout)
+
+
+class BlockingRandomTransport(RandomTransport):
+  """Hold every request for random pages until `release` is set."""
+
+  def __init__(self):
+    super(BlockingRandomTransport, self).__init__()
+    self.release = threading.Event()
+
+  def get(self, url, params, headers, timeout):
+    response = super(BlockingRandomTransport, self).get(url, params, headers, timeout)
+    self.release.wait()
+    return response
+
+
+class TestSingleFlight(unittest.TestCase):
+  """Test that concurrent identical calls are coalesced."""
+
+  def run_concurrently(self, fn, in_flight, threads=4):
+    """Call `fn` on `threads` threads while the first call is held, return the results."""
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(fn())) for i in range(threads)]
+    workers[0].start()
+    while not in_flight():
+      time.sleep(0.001)
+    for worker in workers[1:]:
+      worker.start()
+    # let the others reach the in-flight call
+    time.sleep(0.05)
+    return workers, results
+
+  def test_shared_result(self):
+    """Test that waiting callers get the result of the running call."""
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+      calls.append(1)
+      release.wait()
+      return object()
+
+    workers, results = self.run_concurrently(lambda: flight.do('key', fetch), flight.in_flight)
+    release.set()
+    for worker in workers:
+      worker.join()
+
+    self.assertEqual(len(calls), 1)
+    self.assertEqual(len(set(map(id, results))), 1)
+    self.assertEqual(flight.in_flight(), 0)
+
+  def test_shared_error(self):
+    """Test that waiting callers get the exception of the running call."""
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+      release.wait()
+      raise ValueError('boom')
+
+    def call():
+      try:
+        flight.do('key', fail)
+      except ValueError as e:
+        return e
+
+    workers, results = self.run_concurrently(call, flight.in_flight)
+    release.set()
+    for worker in workers:
+      worker.join()
+
+    self.assertEqual(len(results), 4)
+    self.assertTrue(all(isinstance(e, ValueError) for e in results))
+
+  def test_requests(self):
+    """Test that concurrent identical API requests are sent once."""
+    transport = BlockingTransport({(('prop', 'info'), ('titles', 'Celtuce')): {'query': {}}})
+    original = wikipedia.TRANSPORT
+    wikipedia.set_transport(transport)
+    try:
+      workers, results = self.run_concurrently(
+        lambda: wikipedia.raw_request({'prop': 'info', 'titles': 'Celtuce'}), wikipedia._IN_FLIGHT.in_flight)
+      transport.release.set()
+      for worker in workers:
+        worker.join()
+    finally:
+      wikipedia.set_transport(original)
+
+    self.assertEqual(len(transport.requests), 1)
+    self.assertEqual(results, [b'{"query": {}}'] * 4)
+
+  def test_random(self):
+    """Test that concurrent random() calls are not coalesced."""
+    transport = BlockingRandomTransport()
+    original = wikipedia.TRANSPORT
+    wikipedia.set_transport(transport)
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(wikipedia.random())) for i in range(4)]
+    try:
+      for worker in workers:
+        worker.start()
+      # every call reaches the transport unless they share one request
+      deadline = time.time() + 1
+      while len(transport.requests) < 4 and time.time() < deadline:
+        time.sleep(0.001)
+      transport.release.set()
+      for worker in workers:
+        worker.join()
+    finally:
+      wikipedia.set_transport(original)
+
+    self.assertEqual(len(transport.requests), 4)
+    self.assertEqual(len(results), 4)
+
+
+class TestSpatialCache(unittest.TestCase):
+  """Test the cache of places found within circles."""
+
+  def setUp(self):
+    self.cache = SpatialCache(maxsize=4)
+    # 0.001 degrees of longitude are 111 meters at the equator
+    self.cache.add('en', 0, 0, 1000, [(0, 0.001, 'a'), (0, 0.005, 'b'), (0, -0.008, 'c')])
+
+  def test_haversine(self):
+    """Test distances on the globe."""
+    self.assertAlmostEqual(haversine(48.8566, 2.3522, 51.5074, -0.1278) / 1000, 343.6, places=0)
+    self.assertAlmostEqual(haversine(0, 179.9995, 0, -179.9995), 111.2, places=0)
+
+  def test_search(self):
+    """Test that covered searches are answered nearest first."""
+    self.assertEqual(self.cache.search('en', 0, 0.002, 500), ['a', 'b'])
+    self.assertEqual(self.cache.search('en', 0, 0.002, 500, limit=1), ['a'])
+    self.assertEqual(self.cache.search('en', 0, 0, 1000), ['a', 'b', 'c'])
+    self.assertIsNone(self.cache.search('en', 0, 0.002, 800))
+    self.assertIsNone(self.cache.search('de', 0, 0, 100))
+
+  def test_tiles(self):
+    """Test that circles are found from every tile they overlap, including across the antimeridian."""
+    self.assertEqual(self.cache.search('en', -0.001, -0.001, 10), [])
+    self.cache.add('en', 0, 179.9999, 1000, [(0, -179.9999, 'east')])
+    self.assertEqual(self.cache.search('en', 0, -179.9995, 100), ['east'])
+
+  def test_size(self):
+    """Test that the size of the cache is the number of places, not of circles."""
+    self.cache.add('en', 10, 10, 1000, [(10, 10, 'd')])
+    self.assertEqual(self.cache.info()['size'], 4)
+    self.cache.add('en', 20, 20, 1000, [(20, 20, 'e'), (20, 20.001, 'f')])
+    self.assertIsNone(self.cache.search('en', 0, 0, 100))
+    self.assertEqual(self.cache.search('en', 10, 10, 100), ['d'])
+    self.assertEqual(self.cache.info()['size'], 3)
+
+    self.cache.clear()
+    self.assertEqual(self.cache.info()['size'], 0)
+
+  def test_eviction(self):
+    """Test that evicted circles are removed from the tiles."""
+    self.cache.add('en', 10, 10, 1000, [])
+    self.cache.add('en', 20, 20, 1000, [])
+    self.assertIsNone(self.cache.search('en', 0, 0, 100))
+    self.assertEqual(self.cache.search('en', 20, 20, 100), [])
+    self.assertEqual(sorted(set(tile[1:] for tile in self.cache._tiles)), sorted(
+      self.cache._circle_tiles(10, 10, 1000) | self.cache._circle_tiles(20, 20, 1000)))
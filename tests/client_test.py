@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+from wikipedia import wikipedia
+from wikipedia.transport import FakeTransport
+from request_mock_data import mock_data
+from transport_case import FakeTransportCase
+
+
+class RecordingTransport(FakeTransport):
+  """Also record the URL and headers of every request."""
+
+  def __init__(self, responses=None):
+    super(RecordingTransport, self).__init__(responses)
+    self.urls = []
+    self.headers = []
+
+  def get(self, url, params, headers, timeout):
+    self.urls.append(url)
+    self.headers.append(headers)
+    return super(RecordingTransport, self).get(url, params, headers, timeout)
+
+
+PORSCHE_SEARCH = (('limit', 3), ('list', 'search'), ('srlimit', 3), ('srprop', ''), ('srsearch', 'Porsche'))
+
+
+class TestWikipediaClient(FakeTransportCase):
+  """Test independent clients for several languages."""
+
+  def fake_transport(self):
+    return RecordingTransport(mock_data["_wiki_request calls"])
+
+  def setUp(self):
+    super(TestWikipediaClient, self).setUp()
+    self.default = self.transport
+    wikipedia.search.clear_cache()
+    wikipedia._TITLE_CACHE.clear()
+
+    self.en = RecordingTransport(mock_data["_wiki_request calls"])
+    self.de = RecordingTransport({PORSCHE_SEARCH: {'query': {'search': [{'title': 'Porsche 911'}]}}})
+    self.en_client = wikipedia.WikipediaClient(transport=self.en)
+    self.de_client = wikipedia.WikipediaClient(lang='de', user_agent='de-bot', transport=self.de)
+
+  def test_settings(self):
+    """Test that requests use the language and User-Agent of the client."""
+    self.de_client.search("Porsche", results=3)
+    self.assertEqual(self.de.urls, ['http://de.wikipedia.org/w/api.php'])
+    self.assertEqual(self.de.headers[0]['User-Agent'], 'de-bot')
+    self.assertEqual(self.default.requests, [])
+
+  def test_separate_caches(self):
+    """Test that every client caches its own results."""
+    for i in range(2):
+      self.assertEqual(self.de_client.search("Porsche", results=3), ['Porsche 911'])
+      self.assertEqual(self.en_client.search("Porsche", results=3), mock_data['data']["porsche.search"])
+      self.assertEqual(wikipedia.search("Porsche", results=3), mock_data['data']["porsche.search"])
+
+    for transport in (self.de, self.en, self.default):
+      self.assertEqual(len(transport.requests), 1)
+
+    self.de_client.clear_cache()
+    self.de_client.search("Porsche", results=3)
+    self.assertEqual(len(self.de.requests), 2)
+    self.assertEqual(len(self.en.requests), 1)
+
+  def test_page(self):
+    """Test that pages make their later requests with the client they were loaded with."""
+    celtuce = self.en_client.page("Celtuce", auto_suggest=False)
+    self.assertEqual(celtuce.summary, mock_data['data']["celtuce.summary"])
+    self.assertEqual(len(self.en.requests), 2)
+    self.assertEqual(self.default.requests, [])
+
+  def test_pickle(self):
+    """Test that pickled pages leave their client behind and use the one active when loaded."""
+    celtuce = self.en_client.page("Celtuce", auto_suggest=False)
+    celtuce.content
+    data = pickle.dumps(celtuce, 2)
+
+    loaded = pickle.loads(data)
+    self.assertEqual(loaded, celtuce)
+    self.assertEqual(loaded.content, celtuce.content)
+    self.assertIs(loaded._client, wikipedia.DEFAULT_CLIENT)
+
+    with self.en_client._activated():
+      loaded = pickle.loads(data)
+    loaded.summary
+    self.assertEqual(self.default.requests, [])
+    self.assertEqual(len(self.en.requests), 3)
+
+  def test_map_summaries(self):
+    """Test that worker threads use the client of the caller."""
+    results = dict(self.en_client.map_summaries(["Celtuce"], workers=2))
+    self.assertEqual(results, {"Celtuce": mock_data['data']["celtuce.summary"]})
+    self.assertEqual(self.default.requests, [])
+
+  def test_default_client(self):
+    """Test that the default client follows the module-level settings."""
+    self.assertIs(wikipedia.DEFAULT_CLIENT.transport, self.default)
+    self.assertEqual(wikipedia.DEFAULT_CLIENT.api_url, wikipedia.API_URL)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from wikipedia import wikipedia
+from wikipedia.transport import Response, Transport
+from wikipedia.util import json_decoders
+
+
+class BodyTransport(Transport):
+  """Answer every request with the same body."""
+
+  def __init__(self, body):
+    self.body = body
+    self.headers = []
+
+  def get(self, url, params, headers, timeout):
+    self.headers.append(headers)
+    return Response(200, {}, self.body)
+
+
+class TestDecode(unittest.TestCase):
+  """Test decoding API responses."""
+
+  body = json.dumps({'query': {'pages': {'1': {'title': u'Ünïcode'}}}}).encode('utf-8')
+
+  def setUp(self):
+    self.transport = wikipedia.TRANSPORT
+
+  def tearDown(self):
+    wikipedia.set_json_decoder()
+    wikipedia.set_transport(self.transport)
+
+  def test_decoders(self):
+    """Test that every installed decoder parses UTF-8 bytes alike."""
+    decoders = json_decoders()
+    self.assertEqual(decoders[-1][0], 'json')
+    for name, loads in decoders:
+      self.assertEqual(loads(self.body), json.loads(self.body.decode('utf-8')), name)
+
+  def test_accept_encoding(self):
+    """Test that only encodings the HTTP stack can decode are requested."""
+    try:
+      from requests.packages.urllib3.util.request import ACCEPT_ENCODING
+    except ImportError:
+      ACCEPT_ENCODING = 'gzip, deflate'
+    self.assertEqual(wikipedia.ACCEPT_ENCODING, ACCEPT_ENCODING)
+
+  def test_set_json_decoder(self):
+    """Test that a custom decoder is used for responses."""
+    calls = []
+
+    def loads(content):
+      calls.append(content)
+      return json.loads(content.decode('utf-8'))
+
+    wikipedia.set_json_decoder(loads)
+    transport = BodyTransport(self.body)
+    wikipedia.set_transport(transport)
+    self.assertEqual(wikipedia._wiki_request({'prop': 'info'})['query']['pages']['1']['title'], u'Ünïcode')
+    self.assertEqual(calls, [self.body])
+    self.assertIn('gzip', transport.headers[0]['Accept-Encoding'])
+
+  def test_raw_request(self):
+    """Test that raw requests return the body undecoded."""
+    wikipedia.set_json_decoder(lambda content: self.fail('decoded a raw response'))
+    wikipedia.set_transport(BodyTransport(self.body))
+    self.assertEqual(wikipedia.raw_request({'prop': 'info'}), self.body)
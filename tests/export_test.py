@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from wikipedia import wikipedia
+from wikipedia.transport import FakeTransport, Response
+from request_mock_data import mock_data
+from transport_case import FakeTransportCase
+
+
+PROPS = ['content', 'references', 'links', 'categories']
+CELTUCE_PREFETCH = (
+  ('cllimit', 'max'), ('ellimit', 'max'), ('explaintext', ''), ('pllimit', 'max'), ('plnamespace', 0),
+  ('prop', 'extracts|revisions|extlinks|links|categories'), ('rvprop', 'ids'), ('titles', 'Celtuce'))
+
+
+def celtuce_transport(transport_class=FakeTransport):
+  """
+  A transport with the recorded responses, the links of Celtuce by pageid and
+  its other properties without the links.
+  """
+  transport = transport_class(mock_data["_wiki_request calls"])
+  links = [{'ns': 0, 'title': title} for title in mock_data['data']["celtuce.links"]]
+  transport.add(
+    (('pageids', '1868108'), ('pllimit', 'max'), ('plnamespace', 0), ('prop', 'links')),
+    {'query': {'pages': {'1868108': {'pageid': 1868108, 'links': links}}}})
+
+  # only the links continue past the first response
+  page = dict(mock_data["_wiki_request calls"][CELTUCE_PREFETCH]['query']['pages']['1868108'])
+  del page['links']
+  params = dict(CELTUCE_PREFETCH, prop='extracts|revisions|extlinks|categories')
+  del params['pllimit'], params['plnamespace']
+  transport.add(params, {'query': {'pages': {'1868108': page}}})
+  return transport
+
+
+class FailingTransport(FakeTransport):
+  """Fail the requests for page properties, as if the connection dropped."""
+
+  def get(self, url, params, headers, timeout):
+    if 'extracts' in params.get('prop', ''):
+      raise IOError('connection lost')
+    return super(FailingTransport, self).get(url, params, headers, timeout)
+
+
+class GeneratedTransport(FakeTransport):
+  """Answer for pages named Page 0, Page 1, ..., whose pageid is their number plus one."""
+
+  def get(self, url, params, headers, timeout):
+    self.requests.append(dict(params))
+    query = {'pages': {}}
+    response = {'query': query}
+    if params['prop'] == 'info|pageprops':
+      for title in params['titles'].split('|'):
+        pageid = int(title.split()[1]) + 1
+        query['pages'][str(pageid)] = {'pageid': pageid, 'title': title, 'fullurl': 'http://x/' + title}
+    elif params['prop'] == 'extracts':
+      for pageid in params['pageids'].split('|'):
+        query['pages'][pageid] = {'pageid': int(pageid), 'extract': 'Summary of ' + pageid}
+    elif 'plcontinue' not in params:
+      # the links of the first page continue in a second response
+      pageids = params['pageids'].split('|')
+      query['pages'][pageids[0]] = {'pageid': int(pageids[0]), 'links': [{'ns': 0, 'title': 'A'}]}
+      response['continue'] = {'plcontinue': pageids[0] + '|0|B', 'continue': '||'}
+    else:
+      pageids = params['pageids'].split('|')
+      for pageid in pageids:
+        query['pages'][pageid] = {'pageid': int(pageid), 'links': [{'ns': 0, 'title': 'B'}]}
+    return Response(200, {}, json.dumps(response).encode('utf-8'))
+
+
+class TestExport(FakeTransportCase):
+  """Test streaming pages to a JSON Lines file."""
+
+  def fake_transport(self):
+    return celtuce_transport()
+
+  def setUp(self):
+    super(TestExport, self).setUp()
+    wikipedia._TITLE_CACHE.clear()
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'pages.jsonl')
+    self.batch_size = wikipedia.BATCH_SIZE
+
+  def tearDown(self):
+    super(TestExport, self).tearDown()
+    wikipedia.BATCH_SIZE = self.batch_size
+    shutil.rmtree(self.directory)
+
+  def records(self):
+    with io.open(self.path, encoding='utf-8') as f:
+      return [json.loads(line) for line in f]
+
+  def test_export(self):
+    """Test that pages and errors are written in the order of the titles."""
+    titles = ["Celtuce", "Menlo Park, New Jersey", "purpleberry", "Dodge Ram (disambiguation)"]
+    self.assertEqual(wikipedia.export(titles, self.path, props=PROPS, redirect=False), 4)
+
+    celtuce, edison, purpleberry, ram = self.records()
+    self.assertEqual((celtuce['query'], celtuce['pageid'], celtuce['title']), ("Celtuce", "1868108", "Celtuce"))
+    self.assertEqual(celtuce['content'], mock_data['data']["celtuce.content"])
+    self.assertEqual(celtuce['links'], mock_data['data']["celtuce.links"])
+    self.assertEqual(edison['error'], 'RedirectError')
+    self.assertEqual((purpleberry['query'], purpleberry['error']), ("purpleberry", 'PageError'))
+    self.assertIn(u'Dodge Ramcharger', ram['options'])
+
+  def test_resume(self):
+    """Test that an interrupted export continues after the last checkpoint."""
+    wikipedia.BATCH_SIZE = 1
+    titles = ["purpleberry", "Celtuce", "Dodge Ram (disambiguation)"]
+
+    wikipedia.set_transport(celtuce_transport(FailingTransport))
+    self.assertRaises(IOError, wikipedia.export, titles, self.path, props=PROPS)
+    self.assertEqual([record['query'] for record in self.records()], ["purpleberry"])
+
+    wikipedia.set_transport(self.transport)
+    self.assertEqual(wikipedia.export(titles, self.path, props=PROPS), 2)
+    self.assertEqual([record['query'] for record in self.records()], titles)
+    self.assertNotIn('purpleberry', [params.get('titles') for params in self.transport.requests])
+
+    # finished: the checkpoint is gone and exporting again starts over
+    self.assertFalse(os.path.exists(self.path + '.checkpoint'))
+    self.assertEqual(wikipedia.export(titles[:1], self.path, props=PROPS), 1)
+    self.assertEqual([record['query'] for record in self.records()], ["purpleberry"])
+
+  def test_resume_other_titles(self):
+    """Test that a checkpoint is not resumed with other titles."""
+    wikipedia.BATCH_SIZE = 1
+    wikipedia.set_transport(celtuce_transport(FailingTransport))
+    self.assertRaises(IOError, wikipedia.export, ["purpleberry", "Celtuce"], self.path, props=PROPS)
+
+    wikipedia.set_transport(self.transport)
+    self.assertRaises(ValueError, wikipedia.export, ["Dodge Ram (disambiguation)", "Celtuce"], self.path, props=PROPS)
+    self.assertRaises(ValueError, wikipedia.export, [], self.path, props=PROPS)
+    self.assertEqual([record['query'] for record in self.records()], ["purpleberry"])
+    self.assertEqual(wikipedia.export(["purpleberry", "Celtuce"], self.path, props=PROPS), 1)
+
+  def test_batched(self):
+    """Test that summaries and links are loaded for many pages per request."""
+    transport = GeneratedTransport()
+    wikipedia.set_transport(transport)
+    titles = ['Page {0}'.format(i) for i in range(100)]
+    self.assertEqual(wikipedia.export(titles, self.path, props=['summary', 'links']), 100)
+
+    records = self.records()
+    self.assertEqual([record['title'] for record in records], titles)
+    self.assertEqual(records[0]['summary'], 'Summary of 1')
+    self.assertEqual([record['links'] for record in records[:2]], [['A', 'B'], ['B']])
+    self.assertEqual([records[50]['summary'], records[50]['links']], ['Summary of 51', ['A', 'B']])
+
+    # per batch of 50: one lookup, three requests of 20 summaries and two of links
+    self.assertEqual(len(transport.requests), 12)
+    self.assertEqual(len([params for params in transport.requests if params['prop'] == 'extracts']), 6)
+
+  def test_restart(self):
+    """Test that resume=False starts over and other props cannot be resumed."""
+    wikipedia.BATCH_SIZE = 1
+    wikipedia.set_transport(celtuce_transport(FailingTransport))
+    self.assertRaises(IOError, wikipedia.export, ["purpleberry", "Celtuce"], self.path, props=PROPS)
+
+    wikipedia.set_transport(self.transport)
+    self.assertRaises(ValueError, wikipedia.export, ["purpleberry", "Celtuce"], self.path, props=['links'])
+    self.assertEqual(wikipedia.export(["purpleberry"], self.path, props=['links'], resume=False), 1)
+    self.assertEqual(len(self.records()), 1)
+
+  def test_unknown_property(self):
+    """Test that only page properties can be exported."""
+    self.assertRaises(ValueError, wikipedia.export, ["Celtuce"], self.path, props=['html'])
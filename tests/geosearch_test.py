@@ -1,24 +1,16 @@
 # -*- coding: utf-8 -*-
 import unittest
-
-from collections import defaultdict
 from decimal import Decimal
 
 from wikipedia import wikipedia
+from wikipedia.transport import FakeTransport
 from request_mock_data import mock_data
+from transport_case import FakeTransportCase
 
 
-# mock out _wiki_request
-class _wiki_request(object):
-
-  calls = defaultdict(int)
-
-  @classmethod
-  def __call__(cls, params):
-    cls.calls[params.__str__()] += 1
-    return mock_data["_wiki_request calls"][tuple(sorted(params.items()))]
-
-wikipedia._wiki_request = _wiki_request()
+# serve the recorded responses instead of making HTTP requests
+transport = FakeTransport(mock_data["_wiki_request calls"])
+wikipedia.set_transport(transport)
 
 
 class TestSearchLoc(unittest.TestCase):
@@ -49,4 +41,40 @@ class TestSearchLoc(unittest.TestCase):
     self.assertEqual(wikipedia.geosearch(
       Decimal('40.67693'), Decimal('117.23193'), title='Test'),
       mock_data['data']["great_wall_of_china.geo_seach_with_non_existing_article_name"]
-    )
\ No newline at end of file
+    )
+
+class TestSpatialCache(FakeTransportCase):
+  """Test answering geo searches from earlier searches covering them."""
+
+  def setUp(self):
+    super(TestSpatialCache, self).setUp()
+    wikipedia.geosearch.clear_cache()
+    wikipedia._GEO_CACHE.clear()
+
+  def test_covered(self):
+    """Test that a search within an earlier, wider search makes no request."""
+    wikipedia.geosearch(Decimal('40.67693'), Decimal('117.23193'), radius=10000)
+    self.assertEqual(wikipedia.geosearch(40.6772, 117.2325, radius=500), ['Great Wall of China'])
+    self.assertEqual(wikipedia.geosearch(40.6772, 117.2325, radius=2000), ['Great Wall of China', 'Jinshanling'])
+    self.assertEqual(wikipedia.geosearch(40.6772, 117.2325, results=1, radius=2000), ['Great Wall of China'])
+    self.assertEqual(len(self.transport.requests), 1)
+
+  def test_not_covered(self):
+    """Test that searches reaching outside of cached circles are requested."""
+    wikipedia.geosearch(Decimal('40.67693'), Decimal('117.23193'))
+    self.assertRaises(KeyError, wikipedia.geosearch, 40.6772, 117.2325, radius=1000)
+
+  def test_geosearch_many(self):
+    """Test searching around many points with few requests."""
+    self.transport.add(
+      (('gscoord', '40.6772|117.2325'), ('gslimit', 500), ('gsradius', 10000), ('list', 'geosearch')),
+      mock_data["_wiki_request calls"][
+        (('gscoord', '40.67693|117.23193'), ('gslimit', 10), ('gsradius', 10000), ('list', 'geosearch'))])
+
+    points = [(40.6772, 117.2325), (40.6764, 117.2439), (40.68, 117.24)]
+    found = list(wikipedia.geosearch_many(points, radius=500))
+    self.assertEqual(found, [
+      ((40.6772, 117.2325), ['Great Wall of China']),
+      ((40.6764, 117.2439), ['Jinshanling']),
+      ((40.68, 117.24), [])])
+    self.assertEqual(len(self.transport.requests), 1)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from wikipedia import instrumentation, wikipedia
+from wikipedia.instrumentation import Histogram
+from retry_test import FlakyTransport
+from transport_case import FakeTransportCase
+
+
+class TestHistogram(unittest.TestCase):
+  """Test the latency histogram."""
+
+  def test_cumulative(self):
+    """Test that buckets count all values up to their bound."""
+    histogram = Histogram((0.1, 1))
+    for value in (0.05, 0.5, 0.7, 20):
+      histogram.observe(value)
+    self.assertEqual(histogram.as_dict(), {
+      'buckets': {'0.1': 1, '1': 3, '+Inf': 4}, 'count': 4, 'sum': 21.25})
+
+
+class TestInstrumentation(FakeTransportCase):
+  """Test the request and cache hooks and metrics."""
+
+  def setUp(self):
+    super(TestInstrumentation, self).setUp()
+    self.events = []
+    self.hooks = []
+    for event in instrumentation.EVENTS:
+      hook = lambda event=event, **kwargs: self.events.append((event, kwargs))
+      instrumentation.add_hook(event, hook)
+      self.hooks.append((event, hook))
+
+    wikipedia.reset_metrics()
+    wikipedia.search.clear_cache()
+    self.policy = wikipedia.RETRY_POLICY
+
+  def tearDown(self):
+    super(TestInstrumentation, self).tearDown()
+    for event, hook in self.hooks:
+      instrumentation.remove_hook(event, hook)
+    wikipedia.RETRY_POLICY = self.policy
+
+  def test_unknown_event(self):
+    """Test that hooks can only be added for known events."""
+    self.assertRaises(ValueError, wikipedia.add_hook, 'after_parse', lambda **kwargs: None)
+
+  def test_cache_events(self):
+    """Test that cache hits and misses are reported."""
+    wikipedia.search("Porsche", results=3)
+    wikipedia.search("Porsche", results=3)
+
+    self.assertEqual(
+      [event for event, kwargs in self.events],
+      ['cache_miss', 'before_request', 'after_request', 'cache_hit'])
+    self.assertEqual(self.events[0][1]['name'], 'wikipedia.search')
+    self.assertEqual(wikipedia.metrics()['caches'], {'wikipedia.search': {'hits': 1, 'misses': 1}})
+
+  def test_request_events(self):
+    """Test that requests are reported with their latency, size and retries."""
+    wikipedia.search("Porsche", results=3)
+
+    events = [event for event, kwargs in self.events]
+    self.assertEqual(events, ['cache_miss', 'before_request', 'after_request'])
+    after = self.events[2][1]
+    self.assertEqual(after['params']['srsearch'], 'Porsche')
+    self.assertGreater(after['size'], 0)
+    self.assertEqual((after['retries'], after['error']), (0, None))
+
+    metrics = wikipedia.metrics()
+    self.assertEqual(metrics['requests'], 1)
+    self.assertEqual(metrics['by_call_type']['list=search']['bytes'], after['size'])
+    self.assertEqual(metrics['latency']['count'], 1)
+
+  def test_failed_request(self):
+    """Test that retries and errors are counted."""
+    wikipedia.set_retry_policy(max_retries=1, backoff=0)
+    wikipedia.set_transport(FlakyTransport([503, 503]))
+    self.assertRaises(Exception, wikipedia.raw_request, {'prop': 'info'})
+
+    after = self.events[-1][1]
+    self.assertEqual(after['retries'], 1)
+    self.assertIsNotNone(after['error'])
+    self.assertEqual(wikipedia.metrics()['by_call_type']['prop=info']['errors'], 1)
@@ -1,15 +1,23 @@
 # -*- coding: utf-8 -*-
 from decimal import Decimal
+import pickle
 import unittest
 
 from wikipedia import wikipedia
+from wikipedia.transport import FakeTransport
 from request_mock_data import mock_data
+from transport_case import FakeTransportCase
 
+try:
+  long
+except NameError:
+  # Python 3
+  long = int
 
-# mock out _wiki_request
-def _wiki_request(params):
-  return mock_data["_wiki_request calls"][tuple(sorted(params.items()))]
-wikipedia._wiki_request = _wiki_request
+
+# serve the recorded responses instead of making HTTP requests
+transport = FakeTransport(mock_data["_wiki_request calls"])
+wikipedia.set_transport(transport)
 
 
 class TestPageSetUp(unittest.TestCase):
@@ -68,6 +76,11 @@ class TestPageSetUp(unittest.TestCase):
     self.assertTrue(error_raised)
     self.assertEqual(options, [u'Dodge Ramcharger', u'Dodge Ram Van', u'Dodge Mini Ram', u'Dodge Caravan C/V', u'Dodge Caravan C/V', u'Ram C/V', u'Dodge Ram 50', u'Dodge D-Series', u'Dodge Rampage', u'Ram (brand)'])
 
+  def test_disambiguation_references(self):
+    """Test that character and entity references in the options are unescaped."""
+    html = u'<ul><li><a href="#">Tom &amp; Jerry</a></li><li><a href="#">Caf&#233; &#x2013; Bar</a></li></ul>'
+    self.assertEqual(wikipedia._parse_disambiguation(html), [u'Tom & Jerry', u'Caf\xe9 – Bar'])
+
   def test_auto_suggest(self):
     """Test that auto_suggest properly corrects a typo."""
     # yum, butter.
@@ -77,6 +90,101 @@ class TestPageSetUp(unittest.TestCase):
     self.assertEqual(butterfly.url, "http://en.wikipedia.org/wiki/Butterfly")
 
 
+class TestPages(unittest.TestCase):
+  """Test loading many pages at once with wikipedia.pages."""
+
+  def setUp(self):
+    wikipedia._TITLE_CACHE.clear()
+
+  def test_titles(self):
+    """Test that a batch of titles resolves to pages and errors in input order."""
+    celtuce, edison, purpleberry, ram = wikipedia.pages(
+      ["Celtuce", "Menlo Park, New Jersey", "purpleberry", "Dodge Ram (disambiguation)"])
+
+    self.assertEqual(celtuce, wikipedia.page("Celtuce", auto_suggest=False))
+    self.assertEqual(edison.title, "Edison, New Jersey")
+    self.assertEqual(edison.original_title, "Menlo Park, New Jersey")
+    self.assertIsInstance(purpleberry, wikipedia.PageError)
+    self.assertIsInstance(ram, wikipedia.DisambiguationError)
+    self.assertIn(u'Dodge Ramcharger', ram.options)
+
+  def test_redirect_false(self):
+    """Test that redirects are reported as errors when redirect == False."""
+    result = wikipedia.pages(["Celtuce", "Menlo Park, New Jersey", "purpleberry", "Dodge Ram (disambiguation)"], redirect=False)
+    self.assertIsInstance(result[1], wikipedia.RedirectError)
+
+  def test_pageids(self):
+    """Test that a batch of pageids resolves in input order."""
+    celtuce, cyclone, missing = wikipedia.pages([1868108, 21196082, 1])
+
+    self.assertEqual(celtuce.title, "Celtuce")
+    self.assertEqual(cyclone.url, "http://en.wikipedia.org/wiki/Tropical_Depression_Ten_(2005)")
+    self.assertIsInstance(missing, wikipedia.PageError)
+
+  def test_iterator(self):
+    """Test that any iterable of titles and pageids, including longs, is accepted."""
+    celtuce, cyclone, missing = wikipedia.pages(iter([long(1868108), long(21196082), 1]))
+
+    self.assertEqual(celtuce.title, "Celtuce")
+    self.assertEqual(cyclone.url, "http://en.wikipedia.org/wiki/Tropical_Depression_Ten_(2005)")
+    self.assertIsInstance(missing, wikipedia.PageError)
+
+
+class TestSummary(FakeTransportCase):
+  """Test the single request fast path of wikipedia.summary."""
+
+  def setUp(self):
+    super(TestSummary, self).setUp()
+    wikipedia.summary.clear_cache()
+
+  def test_auto_suggest(self):
+    """Test that a summary is found and fetched with one request."""
+    self.assertEqual(wikipedia.summary("Celtuce"), mock_data['data']["celtuce.summary"])
+    self.assertEqual(len(self.transport.requests), 1)
+
+  def test_suggestion(self):
+    """Test that the search suggestion is preferred over the top result."""
+    self.assertEqual(wikipedia.summary("butteryfly"), mock_data['data']["butterfly.summary"])
+    self.assertEqual(len(self.transport.requests), 2)
+
+  def test_missing(self):
+    """Test that summary raises a PageError for a nonexistant page."""
+    self.assertRaises(wikipedia.PageError, wikipedia.summary, "purpleberry", auto_suggest=False)
+
+  def test_redirect(self):
+    """Test that redirects are followed unless redirect == False."""
+    self.assertTrue(wikipedia.summary("Menlo Park, New Jersey", auto_suggest=False).startswith("Edison"))
+    self.assertRaises(wikipedia.RedirectError, wikipedia.summary, "Menlo Park, New Jersey", auto_suggest=False, redirect=False)
+
+  def test_disambiguate(self):
+    """Test that summary raises an error when a disambiguation page is reached."""
+    try:
+      wikipedia.summary("Dodge Ram (disambiguation)", auto_suggest=False)
+      options = None
+    except wikipedia.DisambiguationError as e:
+      options = e.options
+
+    self.assertIn(u'Dodge Ramcharger', options)
+
+
+class TestMap(unittest.TestCase):
+  """Test looking up many pages concurrently."""
+
+  def test_map_summaries(self):
+    """Test that summaries and per-title errors are returned."""
+    results = dict(wikipedia.map_summaries(["Celtuce", "purpleberry"], workers=2, auto_suggest=False))
+
+    self.assertEqual(results["Celtuce"], mock_data['data']["celtuce.summary"])
+    self.assertIsInstance(results["purpleberry"], wikipedia.PageError)
+
+  def test_map_pages(self):
+    """Test that the requested properties are loaded."""
+    results = dict(wikipedia.map_pages(["Celtuce", "Tropical Depression Ten (2005)"], props=['links'], workers=2))
+
+    self.assertEqual(results["Celtuce"]._links, mock_data['data']["celtuce.links"])
+    self.assertEqual(results["Tropical Depression Ten (2005)"]._links, mock_data['data']["cyclone.links"])
+
+
 class TestPage(unittest.TestCase):
   """Test the functionality of the rest of wikipedia.page."""
 
@@ -136,6 +244,12 @@ class TestPage(unittest.TestCase):
     self.assertEqual(self.celtuce.links, mock_data['data']["celtuce.links"])
     self.assertEqual(self.cyclone.links, mock_data['data']["cyclone.links"])
 
+  def test_iter_links(self):
+    """Test streaming the titles of links."""
+    self.assertEqual(list(self.celtuce.iter_links()), mock_data['data']["celtuce.links"])
+    self.assertEqual(next(self.cyclone.iter_references()), mock_data['data']["cyclone.references"][0])
+    self.assertFalse(hasattr(self.celtuce, '_links'))
+
   def test_categories(self):
     """Test the list of categories of Wikipedia pages."""
     self.assertEqual(self.celtuce.categories, mock_data['data']["celtuce.categories"])
@@ -154,8 +268,229 @@ class TestPage(unittest.TestCase):
     self.assertEqual(self.cyclone.section("Impact"), mock_data['data']["cyclone.section.impact"])
     self.assertEqual(self.cyclone.section("History"), None)
 
+  def test_prefetch(self):
+    """Test that compatible properties are loaded from one continued query."""
+    wikipedia._TITLE_CACHE.clear()
+    counting = FakeTransport(mock_data["_wiki_request calls"])
+    wikipedia.set_transport(counting)
+    try:
+      celtuce = wikipedia.page("Celtuce", auto_suggest=False, preload=['content', 'references', 'links', 'categories'])
+    finally:
+      wikipedia.set_transport(transport)
+
+    self.assertEqual(len(counting.requests), 3)  # info, and two pages of the merged query
+    self.assertEqual(celtuce.content, mock_data['data']["celtuce.content"])
+    self.assertEqual(celtuce.revision_id, mock_data['data']["celtuce.revid"])
+    self.assertEqual(celtuce.references, mock_data['data']["celtuce.references"])
+    self.assertEqual(celtuce.links, mock_data['data']["celtuce.links"])
+    self.assertEqual(celtuce.categories, mock_data['data']["celtuce.categories"])
+
   def test_coordinates(self):
     """Test geo coordinates of a page"""
     lat, lon = self.great_wall_of_china.coordinates
     self.assertEqual(str(lat.quantize(Decimal('1.000'))), mock_data['data']['great_wall_of_china.coordinates.lat'])
     self.assertEqual(str(lon.quantize(Decimal('1.000'))), mock_data['data']['great_wall_of_china.coordinates.lon'])
+
+
+class TestSectionTree(unittest.TestCase):
+  """Test parsing the headings of page content."""
+
+  content = (
+    "Lead.\n\n\n== History ==\nOld.\n\n=== Early ===\nEarly text.\n\n==== Earliest ====\nFirst.\n\n"
+    "=== Late ===\nLate text.\n\n\n== Impact ==\nNone.")
+
+  def test_nesting(self):
+    """Test that subsections are nested under their section."""
+    tree = wikipedia.SectionTree(self.content)
+    self.assertEqual([s.title for s in tree.roots], ["History", "Impact"])
+    self.assertEqual([s.title for s in tree["History"].subsections], ["Early", "Late"])
+    self.assertEqual([(s.title, s.level) for s in tree["Early"].subsections], [("Earliest", 4)])
+    self.assertEqual([s.title for s in tree.sections], ["History", "Early", "Earliest", "Late", "Impact"])
+
+  def test_text(self):
+    """Test that a section's text includes its subsections."""
+    tree = wikipedia.SectionTree(self.content)
+    self.assertEqual(tree.text("Early"), "Early text.\n\n==== Earliest ====\nFirst.")
+    self.assertEqual(tree.text("Late"), "Late text.")
+    self.assertEqual(tree.text("Impact"), "None.")
+    self.assertTrue(tree.text("History").endswith("Late text."))
+    self.assertIsNone(tree.text("Legacy"))
+
+
+class TestDisambiguationOptions(FakeTransportCase):
+  """Test extracting the options of disambiguation pages."""
+
+  def test_parse(self):
+    """Test that the first link of each list item is listed, except in the table of contents."""
+    html = (
+      '<ul><li class="toclevel-1 tocsection-1"><a href="#a">1 Contents</a></li></ul>'
+      '<ul><li><a href="/wiki/A">A <i>b</i> &amp; c</a>, see <a href="/wiki/D">D</a>'
+      '<ul><li><span><a href="/wiki/E">E</a></span></li></ul></li>'
+      '<li>No link</li><li><img src="x.png"><a href="/wiki/F">F</a></ul>')
+    self.assertEqual(wikipedia._parse_disambiguation(html), ['A b & c', 'E', 'F'])
+
+  def test_cached(self):
+    """Test that the options of an unchanged revision are not fetched again."""
+    wikipedia._DISAMBIGUATION_CACHE.clear()
+    for i in range(2):
+      self.assertRaises(
+        wikipedia.DisambiguationError,
+        wikipedia.page, "Dodge Ram (disambiguation)", auto_suggest=False, redirect=False)
+
+    self.assertEqual([params['prop'] for params in self.transport.requests], ['info|pageprops', 'revisions', 'info|pageprops'])
+
+
+class TestRedirects(FakeTransportCase):
+  """Test resolving redirects and caching the titles they resolve to."""
+
+  def setUp(self):
+    super(TestRedirects, self).setUp()
+    wikipedia._TITLE_CACHE.clear()
+
+  def test_single_request(self):
+    """Test that a redirect is resolved from the first response."""
+    edison = wikipedia.page("Menlo Park, New Jersey", auto_suggest=False)
+    self.assertEqual(edison.title, "Edison, New Jersey")
+    self.assertEqual(edison.original_title, "Menlo Park, New Jersey")
+    self.assertEqual(len(self.transport.requests), 1)
+
+  def test_alias_cache(self):
+    """Test that aliases and canonical titles are resolved from the cache later on."""
+    edison = wikipedia.page("Menlo Park, New Jersey", auto_suggest=False)
+    self.assertEqual(wikipedia.page("Menlo Park, New Jersey", auto_suggest=False), edison)
+    self.assertEqual(wikipedia.page("Edison, New Jersey", auto_suggest=False), edison)
+    self.assertEqual(wikipedia.pages(["Menlo Park, New Jersey"]), [edison])
+    self.assertEqual(len(self.transport.requests), 1)
+
+  def test_alias_cache_redirect_false(self):
+    """Test that cached redirects are not followed when redirect == False."""
+    wikipedia.page("Menlo Park, New Jersey", auto_suggest=False)
+    self.assertRaises(
+      wikipedia.RedirectError, wikipedia.page, "Menlo Park, New Jersey", auto_suggest=False, redirect=False)
+
+
+class TestCompactPage(FakeTransportCase):
+  """Test pages keeping their data compressed, and releasing loaded data."""
+
+  def setUp(self):
+    super(TestCompactPage, self).setUp()
+    self.celtuce = wikipedia.page("Celtuce", auto_suggest=False, compact=True)
+
+  def test_slots(self):
+    """Test that loaded data is kept in slots rather than an instance dict."""
+    page = wikipedia.page("Celtuce", auto_suggest=False)
+    page.content
+    self.assertNotIn('_content', vars(page))
+
+  def test_properties(self):
+    """Test that compressed properties read back unchanged."""
+    self.assertIsInstance(self.celtuce, wikipedia.CompactWikipediaPage)
+    self.assertEqual(self.celtuce.content, mock_data['data']["celtuce.content"])
+    self.assertEqual(self.celtuce.links, mock_data['data']["celtuce.links"])
+    self.assertEqual(self.celtuce.html(), mock_data['data']["celtuce.html"])
+    self.assertIsInstance(self.celtuce._zcontent, bytes)
+
+  def test_pages(self):
+    """Test that pages can return compact pages."""
+    celtuce, = wikipedia.pages(["Celtuce"], compact=True)
+    self.assertIsInstance(celtuce, wikipedia.CompactWikipediaPage)
+
+  def test_release(self):
+    """Test that released properties are loaded again while the revision is kept."""
+    self.celtuce.content
+    self.celtuce.links
+    requests = len(self.transport.requests)
+
+    self.celtuce.release(['content'])
+    self.assertEqual(self.celtuce.revision_id, mock_data['data']["celtuce.revid"])
+    self.assertEqual(self.celtuce.links, mock_data['data']["celtuce.links"])
+    self.assertEqual(len(self.transport.requests), requests)
+
+    self.celtuce.release()
+    self.assertFalse(hasattr(self.celtuce, '_zlinks'))
+    self.assertEqual(self.celtuce.content, mock_data['data']["celtuce.content"])
+    self.assertEqual(len(self.transport.requests), requests + 1)
+
+  def test_pickle(self):
+    """Test that pages, compressed or not, survive every pickle protocol."""
+    page = wikipedia.page("Celtuce", auto_suggest=False)
+    page.sections
+    self.celtuce.content
+    self.celtuce.links
+
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+      loaded = pickle.loads(pickle.dumps(page, protocol))
+      self.assertEqual(loaded, page)
+      self.assertEqual(loaded.content, mock_data['data']["celtuce.content"])
+      self.assertFalse(hasattr(loaded, '_section_tree'))
+      self.assertEqual(loaded.sections, page.sections)
+
+      loaded = pickle.loads(pickle.dumps(self.celtuce, protocol))
+      self.assertIsInstance(loaded, wikipedia.CompactWikipediaPage)
+      self.assertEqual(loaded._zcontent, self.celtuce._zcontent)
+      self.assertEqual(loaded.links, mock_data['data']["celtuce.links"])
+
+  def test_release_unknown(self):
+    """Test that only known properties can be released."""
+    self.assertRaises(ValueError, self.celtuce.release, ['title'])
+
+
+class TestCoordinates(FakeTransportCase):
+  """Test loading the coordinates of many pages at once."""
+
+  def setUp(self):
+    super(TestCoordinates, self).setUp()
+    wikipedia._TITLE_CACHE.clear()
+
+    titles = (('colimit', 'max'), ('prop', 'coordinates'), ('redirects', ''))
+    self.transport.add(
+      titles + (('titles', 'Great Wall of China|celtuce|Menlo Park, New Jersey|Purpleberry'),),
+      {'continue': {'cocontinue': '5094570|1', 'continue': '||'},
+       'query': {
+         'normalized': [{'from': 'celtuce', 'to': 'Celtuce'}],
+         'redirects': [{'from': 'Menlo Park, New Jersey', 'to': 'Edison, New Jersey'}],
+         'pages': {
+           '5094570': {'pageid': 5094570, 'title': 'Great Wall of China', 'coordinates': [{'lat': 40.68, 'lon': 117.23}]},
+           '1868108': {'pageid': 1868108, 'title': 'Celtuce'},
+           '125414': {'pageid': 125414, 'title': 'Edison, New Jersey'},
+           '-1': {'missing': '', 'title': 'Purpleberry'}}}})
+    self.transport.add(
+      titles + (('titles', 'Great Wall of China|celtuce|Menlo Park, New Jersey|Purpleberry'),
+                ('cocontinue', '5094570|1'), ('continue', '||')),
+      {'query': {
+        'normalized': [{'from': 'celtuce', 'to': 'Celtuce'}],
+        'redirects': [{'from': 'Menlo Park, New Jersey', 'to': 'Edison, New Jersey'}],
+        'pages': {
+          '125414': {'pageid': 125414, 'title': 'Edison, New Jersey', 'coordinates': [{'lat': 40.5, 'lon': -74.35}]},
+          '-1': {'missing': '', 'title': 'Purpleberry'}}}})
+    self.transport.add(
+      titles + (('pageids', '1868108|5094570'),),
+      {'query': {'pages': {
+        '5094570': {'pageid': 5094570, 'title': 'Great Wall of China', 'coordinates': [{'lat': 40.68, 'lon': 117.23}]},
+        '1868108': {'pageid': 1868108, 'title': 'Celtuce'}}}})
+
+  def test_titles(self):
+    """Test that titles resolve through normalization, redirects and continuations."""
+    found = wikipedia.coordinates(["Great Wall of China", "celtuce", "Menlo Park, New Jersey", "Purpleberry"])
+    self.assertEqual(found, {
+      "Great Wall of China": (Decimal(40.68), Decimal(117.23)),
+      "celtuce": None,
+      "Menlo Park, New Jersey": (Decimal(40.5), Decimal(-74.35)),
+      "Purpleberry": None})
+    self.assertEqual(len(self.transport.requests), 2)
+
+  def test_iterator(self):
+    """Test that a generator of pages and long pageids is accepted."""
+    celtuce = wikipedia.page("Celtuce", auto_suggest=False)
+    found = wikipedia.coordinates(item for item in [celtuce, long(5094570)])
+    self.assertEqual(found, {"Celtuce": None, 5094570: (Decimal(40.68), Decimal(117.23))})
+
+  def test_pages(self):
+    """Test that the coordinates of pages are filled in."""
+    celtuce = wikipedia.page("Celtuce", auto_suggest=False)
+    found = wikipedia.coordinates([celtuce, 5094570])
+    self.assertEqual(found, {"Celtuce": None, 5094570: (Decimal(40.68), Decimal(117.23))})
+
+    requests = len(self.transport.requests)
+    self.assertIsNone(celtuce.coordinates)
+    self.assertEqual(len(self.transport.requests), requests)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+from datetime import timedelta
+
+from wikipedia import wikipedia
+from wikipedia.util import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+  """Test the token bucket used for rate limiting."""
+
+  def test_fractional_wait(self):
+    """Test that sub-second waits are not truncated to zero."""
+    limiter = RateLimiter(4)
+    self.assertEqual(limiter.reserve(), 0)
+    self.assertAlmostEqual(limiter.reserve(), 0.25, places=2)
+    self.assertAlmostEqual(limiter.reserve(), 0.5, places=2)
+
+  def test_burst(self):
+    """Test that a burst of requests goes through without waiting."""
+    limiter = RateLimiter(1, burst=3)
+    self.assertEqual([limiter.reserve() for i in range(3)], [0, 0, 0])
+    self.assertGreater(limiter.reserve(), 0.9)
+
+  def test_threads(self):
+    """Test that concurrent callers each get their own slot."""
+    limiter = RateLimiter(10)
+    delays = []
+
+    def reserve():
+      delays.append(limiter.reserve())
+
+    threads = [threading.Thread(target=reserve) for i in range(20)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    delays.sort()
+    for i, delay in enumerate(delays):
+      self.assertAlmostEqual(delay, i / 10.0, places=1)
+
+  def test_set_rate_limiting(self):
+    """Test that set_rate_limiting installs and removes the limiter."""
+    wikipedia.set_rate_limiting(True, min_wait=timedelta(milliseconds=250), burst=2)
+    self.assertEqual(wikipedia.RATE_LIMITER.rate, 4)
+    self.assertEqual(wikipedia.RATE_LIMITER.burst, 2)
+
+    wikipedia.set_rate_limiting(False)
+    self.assertIsNone(wikipedia.RATE_LIMITER)
@@ -34,8 +34,8 @@ mock_data = {
     (('inprop', 'url'), ('ppprop', 'disambiguation'), ('prop', 'info|pageprops'), ('redirects', ''), ('titles', 'Dodge Ram (disambiguation)')):
     {'query': {'pages': {'18803364': {'lastrevid': 567152802, 'pageid': 18803364, 'title': 'Dodge Ram (disambiguation)', 'editurl': 'http://en.wikipedia.org/w/index.php?title=Dodge_Ram_(disambiguation)&action=edit', 'counter': '', 'length': 702, 'contentmodel': 'wikitext', 'pagelanguage': 'en', 'touched': '2013-08-08T15:12:27Z', 'ns': 0, 'pageprops': {'disambiguation': ''}, 'fullurl': 'http://en.wikipedia.org/wiki/Dodge_Ram_(disambiguation)'}}}},
 
-    (('prop', 'revisions'), ('rvlimit', 1), ('rvparse', ''), ('rvprop', 'content'), ('titles', 'Dodge Ram (disambiguation)')):
-    {'query-continue': {'revisions': {'rvcontinue': 556603298}}, 'query': {'pages': {'18803364': {'ns': 0, 'pageid': 18803364, 'revisions': [{'*': '<p><b><a href="/wiki/Dodge_Ram" title="Dodge Ram">Dodge Ram</a></b> is a collective nameplate for light trucks made by <a href="/wiki/Dodge" title="Dodge">Dodge</a>\n</p>\n<ul><li><a href="/wiki/Dodge_Ramcharger" title="Dodge Ramcharger">Dodge Ramcharger</a> - full-size SUV based on the Ram chassis (first vehicle to use the Ram name)\n</li><li><a href="/wiki/Dodge_Ram_Van" title="Dodge Ram Van">Dodge Ram Van</a> - full-size van\n</li><li><a href="/wiki/Dodge_Mini_Ram" title="Dodge Mini Ram" class="mw-redirect">Dodge Mini Ram</a> - cargo version of the Dodge Caravan\n<ul><li>See also:\n<ul><li><a href="/wiki/Dodge_Caravan_C/V" title="Dodge Caravan C/V" class="mw-redirect">Dodge Caravan C/V</a>\n</li><li><a href="/wiki/Ram_C/V" title="Ram C/V" class="mw-redirect">Ram C/V</a> (modern day equivalent)\n</li></ul>\n</li></ul>\n</li><li><a href="/wiki/Dodge_Ram_50" title="Dodge Ram 50" class="mw-redirect">Dodge Ram 50</a> - Dodge version of the Mitsubishi Mighty Max, predecessor to the Dakota\n</li></ul>\n<p>See also:\n</p>\n<ul><li><a href="/wiki/Dodge_D-Series" title="Dodge D-Series" class="mw-redirect">Dodge D-Series</a> - Ram\'s predecessor, page includes first Ram body style\n</li><li><a href="/wiki/Dodge_Rampage" title="Dodge Rampage">Dodge Rampage</a> - car-based pickup truck\n</li><li><a href="/wiki/Ram_Trucks" title="Ram Trucks">Ram (brand)</a> - truck brand based on the Ram pickup truck\n</li></ul>\n<table id="disambigbox" class="metadata plainlinks dmbox dmbox-disambig" style="" role="presentation">\n<tr>\n<td class="mbox-image" style="padding: 2px 0 2px 0.4em;"> <a href="/wiki/File:Disambig_gray.svg" class="image"><img alt="Disambiguation icon" src="//upload.wikimedia.org/wikipedia/en/thumb/5/5f/Disambig_gray.svg/30px-Disambig_gray.svg.png" width="30" height="23" srcset="//upload.wikimedia.org/wikipedia/en/thumb/5/5f/Disambig_gray.svg/45px-Disambig_gray.svg.png 1.5x, //upload.wikimedia.org/wikipedia/en/thumb/5/5f/Disambig_gray.svg/60px-Disambig_gray.svg.png 2x" /></a></td>\n<td class="mbox-text" style="padding: 0.25em 0.4em; font-style: italic;"> This <a href="/wiki/Help:Disambiguation" title="Help:Disambiguation">disambiguation</a> page lists articles associated with the same title. <br/> <small>If an <a class="external text" href="//en.wikipedia.org/w/index.php?title=Special:WhatLinksHere/Dodge_Ram_(disambiguation)&amp;namespace=0">internal link</a> led you here, you may wish to change the link to point directly to the intended article.</small> </td>\n</tr>\n</table>\n'}], 'title': 'Dodge Ram (disambiguation)'}}}},
+    (('prop', 'revisions'), ('rvlimit', 1), ('rvparse', ''), ('rvprop', 'ids|content'), ('titles', 'Dodge Ram (disambiguation)')):
+    {'query-continue': {'revisions': {'rvcontinue': 556603298}}, 'query': {'pages': {'18803364': {'ns': 0, 'pageid': 18803364, 'revisions': [{'revid': 567152802, '*': '<p><b><a href="/wiki/Dodge_Ram" title="Dodge Ram">Dodge Ram</a></b> is a collective nameplate for light trucks made by <a href="/wiki/Dodge" title="Dodge">Dodge</a>\n</p>\n<ul><li><a href="/wiki/Dodge_Ramcharger" title="Dodge Ramcharger">Dodge Ramcharger</a> - full-size SUV based on the Ram chassis (first vehicle to use the Ram name)\n</li><li><a href="/wiki/Dodge_Ram_Van" title="Dodge Ram Van">Dodge Ram Van</a> - full-size van\n</li><li><a href="/wiki/Dodge_Mini_Ram" title="Dodge Mini Ram" class="mw-redirect">Dodge Mini Ram</a> - cargo version of the Dodge Caravan\n<ul><li>See also:\n<ul><li><a href="/wiki/Dodge_Caravan_C/V" title="Dodge Caravan C/V" class="mw-redirect">Dodge Caravan C/V</a>\n</li><li><a href="/wiki/Ram_C/V" title="Ram C/V" class="mw-redirect">Ram C/V</a> (modern day equivalent)\n</li></ul>\n</li></ul>\n</li><li><a href="/wiki/Dodge_Ram_50" title="Dodge Ram 50" class="mw-redirect">Dodge Ram 50</a> - Dodge version of the Mitsubishi Mighty Max, predecessor to the Dakota\n</li></ul>\n<p>See also:\n</p>\n<ul><li><a href="/wiki/Dodge_D-Series" title="Dodge D-Series" class="mw-redirect">Dodge D-Series</a> - Ram\'s predecessor, page includes first Ram body style\n</li><li><a href="/wiki/Dodge_Rampage" title="Dodge Rampage">Dodge Rampage</a> - car-based pickup truck\n</li><li><a href="/wiki/Ram_Trucks" title="Ram Trucks">Ram (brand)</a> - truck brand based on the Ram pickup truck\n</li></ul>\n<table id="disambigbox" class="metadata plainlinks dmbox dmbox-disambig" style="" role="presentation">\n<tr>\n<td class="mbox-image" style="padding: 2px 0 2px 0.4em;"> <a href="/wiki/File:Disambig_gray.svg" class="image"><img alt="Disambiguation icon" src="//upload.wikimedia.org/wikipedia/en/thumb/5/5f/Disambig_gray.svg/30px-Disambig_gray.svg.png" width="30" height="23" srcset="//upload.wikimedia.org/wikipedia/en/thumb/5/5f/Disambig_gray.svg/45px-Disambig_gray.svg.png 1.5x, //upload.wikimedia.org/wikipedia/en/thumb/5/5f/Disambig_gray.svg/60px-Disambig_gray.svg.png 2x" /></a></td>\n<td class="mbox-text" style="padding: 0.25em 0.4em; font-style: italic;"> This <a href="/wiki/Help:Disambiguation" title="Help:Disambiguation">disambiguation</a> page lists articles associated with the same title. <br/> <small>If an <a class="external text" href="//en.wikipedia.org/w/index.php?title=Special:WhatLinksHere/Dodge_Ram_(disambiguation)&amp;namespace=0">internal link</a> led you here, you may wish to change the link to point directly to the intended article.</small> </td>\n</tr>\n</table>\n'}], 'title': 'Dodge Ram (disambiguation)'}}}},
 
     (('limit', 1), ('list', 'search'), ('srinfo', 'suggestion'), ('srlimit', 1), ('srprop', ''), ('srsearch', 'butteryfly')):
     {'query-continue': {'search': {'sroffset': 1}}, 'query': {'searchinfo': {'suggestion': 'butterfly'}, 'search': [{'ns': 0, 'title': "Butterfly's Tongue"}]}, 'warnings': {'main': {'*': "Unrecognized parameter: 'limit'"}}},
@@ -129,6 +129,39 @@ mock_data = {
 
     (('gscoord', '40.67693|117.23193'), ('gslimit', 10), ('gsradius', 1000), ('list', 'geosearch'), ('titles', 'Test')):
     {'query': {'geosearch': []}},
+
+    (('inprop', 'url'), ('ppprop', 'disambiguation'), ('prop', 'info|pageprops'), ('redirects', ''), ('titles', 'Celtuce|Menlo Park, New Jersey|purpleberry|Dodge Ram (disambiguation)')):
+    {'query': {'normalized': [{'to': 'Purpleberry', 'from': 'purpleberry'}], 'redirects': [{'to': 'Edison, New Jersey', 'from': 'Menlo Park, New Jersey'}], 'pages': {'-1': {'missing': '', 'title': 'Purpleberry', 'contentmodel': 'wikitext', 'pagelanguage': 'en', 'ns': 0, 'fullurl': 'http://en.wikipedia.org/wiki/Purpleberry'}, '1868108': {'lastrevid': 562756085, 'pageid': 1868108, 'title': 'Celtuce', 'contentmodel': 'wikitext', 'pagelanguage': 'en', 'ns': 0, 'fullurl': 'http://en.wikipedia.org/wiki/Celtuce'}, '125414': {'lastrevid': 607768264, 'pageid': 125414, 'title': 'Edison, New Jersey', 'contentmodel': 'wikitext', 'pagelanguage': 'en', 'ns': 0, 'fullurl': 'http://en.wikipedia.org/wiki/Edison,_New_Jersey'}, '18803364': {'lastrevid': 567152802, 'pageid': 18803364, 'title': 'Dodge Ram (disambiguation)', 'contentmodel': 'wikitext', 'pagelanguage': 'en', 'ns': 0, 'pageprops': {'disambiguation': ''}, 'fullurl': 'http://en.wikipedia.org/wiki/Dodge_Ram_(disambiguation)'}}}},
+
+    (('inprop', 'url'), ('pageids', '1868108|21196082|1'), ('ppprop', 'disambiguation'), ('prop', 'info|pageprops'), ('redirects', '')):
+    {'query': {'pages': {'1': {'pageid': 1, 'missing': ''}, '1868108': {'lastrevid': 575687826, 'pageid': 1868108, 'title': 'Celtuce', 'contentmodel': 'wikitext', 'pagelanguage': 'en', 'ns': 0, 'fullurl': 'http://en.wikipedia.org/wiki/Celtuce'}, '21196082': {'lastrevid': 572715399, 'pageid': 21196082, 'title': 'Tropical Depression Ten (2005)', 'contentmodel': 'wikitext', 'pagelanguage': 'en', 'ns': 0, 'fullurl': 'http://en.wikipedia.org/wiki/Tropical_Depression_Ten_(2005)'}}}},
+
+    (('cllimit', 'max'), ('ellimit', 'max'), ('explaintext', ''), ('pllimit', 'max'), ('plnamespace', 0), ('prop', 'extracts|revisions|extlinks|links|categories'), ('rvprop', 'ids'), ('titles', 'Celtuce')):
+    {'continue': {'plcontinue': '1868108|0|Niacin', 'continue': '||'}, 'query': {'pages': {'1868108': {'extract': 'Celtuce (Lactuca sativa var. asparagina, augustana, or angustata), also called stem lettuce, celery lettuce, asparagus lettuce, or Chinese lettuce, IPA (UK,US) /ˈsɛlt.əs/, is a cultivar of lettuce grown primarily for its thick stem, used as a vegetable. It is especially popular in China, and is called wosun (Chinese: 莴笋; pinyin: wōsŭn) or woju (Chinese: 莴苣; pinyin: wōjù) (although the latter name may also be used to mean lettuce in general).\n\nThe stem is usually harvested at a length of around 15–20 cm and a diameter of around 3–4 cm. It is crisp, moist, and mildly flavored, and typically prepared by slicing and then stir frying with more strongly flavored ingredients.\n\nDown: Photos of the celtuce, chinese lettuce or "Wosun" taken in the province of Girona (Catalonia, Spain, Europe) in June 2013\nCeltuce Nutritional content', 'ns': 0, 'pageid': 1868108, 'revisions': [{'revid': 575687826, 'parentid': 574302108}], 'title': 'Celtuce', 'extlinks': [{'*': 'http://ndb.nal.usda.gov/ndb/search/list'}, {'*': 'http://ndb.nal.usda.gov/ndb/search/list?qlookup=11145&format=Full'}], 'links': [{'ns': 0, 'title': 'Calcium'}, {'ns': 0, 'title': 'Carbohydrate'}, {'ns': 0, 'title': 'Chinese language'}, {'ns': 0, 'title': 'Dietary Reference Intake'}, {'ns': 0, 'title': 'Dietary fiber'}, {'ns': 0, 'title': 'Fat'}, {'ns': 0, 'title': 'Folate'}, {'ns': 0, 'title': 'Food energy'}, {'ns': 0, 'title': 'Iron'}, {'ns': 0, 'title': 'Lettuce'}, {'ns': 0, 'title': 'Lhasa'}, {'ns': 0, 'title': 'Magnesium in biology'}, {'ns': 0, 'title': 'Manganese'}, {'ns': 0, 'title': 'Niacin'}], 'categories': [{'ns': 14, 'title': 'All articles lacking sources'}, {'ns': 14, 'title': 'All stub articles'}, {'ns': 14, 'title': 'Articles containing Chinese-language text'}, {'ns': 14, 'title': 'Articles lacking sources from December 2009'}, {'ns': 14, 'title': 'Stem vegetables'}, {'ns': 14, 'title': 'Vegetable stubs'}]}}}},
+
+    (('cllimit', 'max'), ('continue', '||'), ('ellimit', 'max'), ('explaintext', ''), ('plcontinue', '1868108|0|Niacin'), ('pllimit', 'max'), ('plnamespace', 0), ('prop', 'extracts|revisions|extlinks|links|categories'), ('rvprop', 'ids'), ('titles', 'Celtuce')):
+    {'query': {'pages': {'1868108': {'ns': 0, 'pageid': 1868108, 'title': 'Celtuce', 'links': [{'ns': 0, 'title': 'Pantothenic acid'}, {'ns': 0, 'title': 'Phosphorus'}, {'ns': 0, 'title': 'Pinyin'}, {'ns': 0, 'title': 'Plant stem'}, {'ns': 0, 'title': 'Potassium'}, {'ns': 0, 'title': 'Protein (nutrient)'}, {'ns': 0, 'title': 'Riboflavin'}, {'ns': 0, 'title': 'Sodium'}, {'ns': 0, 'title': 'Stir frying'}, {'ns': 0, 'title': 'Thiamine'}, {'ns': 0, 'title': 'Vegetable'}, {'ns': 0, 'title': 'Vitamin A'}, {'ns': 0, 'title': 'Vitamin B6'}, {'ns': 0, 'title': 'Vitamin C'}, {'ns': 0, 'title': 'Zinc'}]}}}},
+
+    (('exintro', ''), ('explaintext', ''), ('ppprop', 'disambiguation'), ('prop', 'extracts|pageprops'), ('redirects', ''), ('titles', 'Celtuce')):
+    {'query': {'pages': {'1868108': {'pageid': 1868108, 'ns': 0, 'title': 'Celtuce', 'extract': 'Celtuce (Lactuca sativa var. asparagina, augustana, or angustata), also called stem lettuce, celery lettuce, asparagus lettuce, or Chinese lettuce, IPA (UK,US) /ˈsɛlt.əs/, is a cultivar of lettuce grown primarily for its thick stem, used as a vegetable. It is especially popular in China, and is called wosun (Chinese: 莴笋; pinyin: wōsŭn) or woju (Chinese: 莴苣; pinyin: wōjù) (although the latter name may also be used to mean lettuce in general).\n\nThe stem is usually harvested at a length of around 15–20 cm and a diameter of around 3–4 cm. It is crisp, moist, and mildly flavored, and typically prepared by slicing and then stir frying with more strongly flavored ingredients.'}}}},
+
+    (('exintro', ''), ('explaintext', ''), ('ppprop', 'disambiguation'), ('prop', 'extracts|pageprops'), ('redirects', ''), ('titles', 'purpleberry')):
+    {'query': {'normalized': [{'from': 'purpleberry', 'to': 'Purpleberry'}], 'pages': {'-1': {'ns': 0, 'title': 'Purpleberry', 'missing': ''}}}},
+
+    (('exintro', ''), ('explaintext', ''), ('ppprop', 'disambiguation'), ('prop', 'extracts|pageprops'), ('redirects', ''), ('titles', 'Menlo Park, New Jersey')):
+    {'query': {'redirects': [{'from': 'Menlo Park, New Jersey', 'to': 'Edison, New Jersey'}], 'pages': {'125414': {'pageid': 125414, 'ns': 0, 'title': 'Edison, New Jersey', 'extract': 'Edison is a township in Middlesex County, New Jersey, United States.'}}}},
+
+    (('exintro', ''), ('explaintext', ''), ('ppprop', 'disambiguation'), ('prop', 'extracts|pageprops'), ('redirects', ''), ('titles', 'Dodge Ram (disambiguation)')):
+    {'query': {'pages': {'18803364': {'pageid': 18803364, 'ns': 0, 'title': 'Dodge Ram (disambiguation)', 'pageprops': {'disambiguation': ''}, 'extract': 'Dodge Ram is a collective nameplate for light trucks made by Dodge'}}}},
+
+    (('exintro', ''), ('explaintext', ''), ('generator', 'search'), ('gsrlimit', 1), ('gsrsearch', 'Celtuce'), ('list', 'search'), ('ppprop', 'disambiguation'), ('prop', 'extracts|pageprops'), ('redirects', ''), ('srinfo', 'suggestion'), ('srlimit', 1), ('srprop', ''), ('srsearch', 'Celtuce')):
+    {'batchcomplete': '', 'continue': {'gsroffset': 1, 'sroffset': 1, 'continue': 'gsroffset||'}, 'query': {'search': [{'ns': 0, 'title': 'Celtuce'}], 'pages': {'1868108': {'pageid': 1868108, 'ns': 0, 'title': 'Celtuce', 'extract': 'Celtuce (Lactuca sativa var. asparagina, augustana, or angustata), also called stem lettuce, celery lettuce, asparagus lettuce, or Chinese lettuce, IPA (UK,US) /ˈsɛlt.əs/, is a cultivar of lettuce grown primarily for its thick stem, used as a vegetable. It is especially popular in China, and is called wosun (Chinese: 莴笋; pinyin: wōsŭn) or woju (Chinese: 莴苣; pinyin: wōjù) (although the latter name may also be used to mean lettuce in general).\n\nThe stem is usually harvested at a length of around 15–20 cm and a diameter of around 3–4 cm. It is crisp, moist, and mildly flavored, and typically prepared by slicing and then stir frying with more strongly flavored ingredients.', 'index': 1}}}},
+
+    (('exintro', ''), ('explaintext', ''), ('generator', 'search'), ('gsrlimit', 1), ('gsrsearch', 'butteryfly'), ('list', 'search'), ('ppprop', 'disambiguation'), ('prop', 'extracts|pageprops'), ('redirects', ''), ('srinfo', 'suggestion'), ('srlimit', 1), ('srprop', ''), ('srsearch', 'butteryfly')):
+    {'continue': {'gsroffset': 1, 'sroffset': 1, 'continue': 'gsroffset||'}, 'query': {'searchinfo': {'suggestion': 'butterfly'}, 'search': [{'ns': 0, 'title': "Butterfly's Tongue"}], 'pages': {'9561573': {'pageid': 9561573, 'ns': 0, 'title': "Butterfly's Tongue", 'index': 1, 'extract': "Butterfly's Tongue is a 1999 Spanish film directed by José Luis Cuerda."}}}},
+
+    (('exintro', ''), ('explaintext', ''), ('ppprop', 'disambiguation'), ('prop', 'extracts|pageprops'), ('redirects', ''), ('titles', 'butterfly')):
+    {'query': {'normalized': [{'from': 'butterfly', 'to': 'Butterfly'}], 'pages': {'48338': {'pageid': 48338, 'ns': 0, 'title': 'Butterfly', 'extract': 'Butterflies are insects in the macrolepidopteran clade Rhopalocera from the order Lepidoptera, which also includes moths.'}}}},
   },
 
   "data": {
@@ -170,6 +203,8 @@ mock_data = {
 
     "cyclone.section.impact": 'Because Tropical Depression Ten never approached land as a tropical cyclone, no tropical cyclone watches and warnings were issued for any land masses. No effects, damages, or fatalities were reported, and no ships reported tropical storm-force winds in association with the depression. The system did not attain tropical storm status; as such, it was not given a name by the National Hurricane Center. The storm partially contributed to the formation of Hurricane Katrina, which became a Category 5 hurricane on the Saffir-Simpson Hurricane Scale and made landfall in Louisiana, causing catastrophic damage. Katrina was the costliest hurricane, and one of the five deadliest, in the history of the United States.',
 
+    "butterfly.summary": 'Butterflies are insects in the macrolepidopteran clade Rhopalocera from the order Lepidoptera, which also includes moths.',
+
     "barack.search": ['Barack Obama', 'Barack Obama, Sr.', 'Presidency of Barack Obama', 'Barack Obama presidential campaign, 2008', 'List of federal judges appointed by Barack Obama', 'Barack Obama in comics', 'Political positions of Barack Obama', 'Barack Obama on social media', 'List of Batman: The Brave and the Bold characters', 'Family of Barack Obama'],
 
     "porsche.search": ['Porsche', 'Porsche in motorsport', 'Porsche 911 GT3'],
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+import unittest
+from datetime import timedelta
+from email.utils import formatdate
+
+import requests
+
+from wikipedia import wikipedia
+from wikipedia.transport import Response, Transport
+from wikipedia.util import RetryPolicy, parse_retry_after, _clock
+
+
+class TestRetryPolicy(unittest.TestCase):
+  """Test the backoff computed between retries."""
+
+  def test_backoff(self):
+    """Test that the wait grows exponentially up to max_backoff."""
+    policy = RetryPolicy(max_retries=10, backoff=1, max_backoff=4, max_time=None)
+    started = _clock()
+    for attempt, limit in enumerate([1, 2, 4, 4, 4]):
+      for i in range(20):
+        delay = policy.delay(attempt, started)
+        self.assertTrue(0 <= delay <= limit, (attempt, delay))
+
+  def test_max_retries(self):
+    """Test giving up after max_retries retries."""
+    policy = RetryPolicy(max_retries=2)
+    started = _clock()
+    self.assertIsNotNone(policy.delay(1, started))
+    self.assertIsNone(policy.delay(2, started))
+
+  def test_max_time(self):
+    """Test giving up when the wait would exceed max_time."""
+    policy = RetryPolicy(max_time=timedelta(seconds=10))
+    self.assertIsNone(policy.delay(0, _clock() - 9, retry_after='5'))
+    self.assertEqual(policy.delay(0, _clock(), retry_after='5'), 5)
+
+  def test_retry_after(self):
+    """Test parsing both forms of the Retry-After header."""
+    self.assertEqual(parse_retry_after('3'), 3)
+    self.assertIsNone(parse_retry_after(None))
+    self.assertIsNone(parse_retry_after('soon'))
+    self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 60)), 60, delta=2)
+
+
+class FlakyTransport(Transport):
+  """Fail with the given status codes (or connection errors), then succeed."""
+
+  errors = (IOError,)
+
+  def __init__(self, statuses):
+    self.statuses = list(statuses)
+    self.requests = []
+
+  def get(self, url, params, headers, timeout):
+    self.requests.append(dict(params))
+    if self.statuses:
+      status = self.statuses.pop(0)
+      if status == 'timeout':
+        raise IOError('timed out')
+      if status == 'maxlag':
+        body = {'error': {'code': 'maxlag', 'info': 'Waiting for a database server'}}
+        return Response(200, {'Retry-After': '0'}, json.dumps(body).encode('utf-8'))
+      return Response(status, {}, b'')
+    return Response(200, {}, json.dumps({'query': {}}).encode('utf-8'))
+
+
+class TestRetry(unittest.TestCase):
+  """Test retrying failed requests."""
+
+  def setUp(self):
+    self.policy = wikipedia.RETRY_POLICY
+    wikipedia.set_retry_policy(backoff=timedelta(0), maxlag=5)
+
+    self.transport = wikipedia.TRANSPORT
+
+  def tearDown(self):
+    wikipedia.RETRY_POLICY = self.policy
+    wikipedia.set_transport(self.transport)
+
+  def test_retry(self):
+    """Test that 5xx responses, maxlag errors and connection errors are retried."""
+    transport = FlakyTransport([429, 'maxlag', 'timeout'])
+    wikipedia.set_transport(transport)
+    self.assertEqual(wikipedia._wiki_request({'list': 'search'}), {'query': {}})
+    self.assertEqual(len(transport.requests), 4)
+    self.assertEqual(transport.requests[0]['maxlag'], 5)
+
+  def test_give_up(self):
+    """Test that the error is raised once the retries are used up."""
+    wikipedia.set_transport(FlakyTransport([502] * 4))
+    self.assertRaises(requests.HTTPError, wikipedia._wiki_request, {'list': 'search'})
+
+    wikipedia.set_transport(FlakyTransport(['timeout'] * 4))
+    self.assertRaises(IOError, wikipedia._wiki_request, {'list': 'search'})
@@ -1,23 +1,14 @@
 # -*- coding: utf-8 -*-
 import unittest
 
-from collections import defaultdict
-
 from wikipedia import wikipedia
+from wikipedia.transport import FakeTransport
 from request_mock_data import mock_data
 
 
-# mock out _wiki_request
-class _wiki_request(object):
-
-  calls = defaultdict(int)
-
-  @classmethod
-  def __call__(cls, params):
-    cls.calls[params.__str__()] += 1
-    return mock_data["_wiki_request calls"][tuple(sorted(params.items()))]
-
-wikipedia._wiki_request = _wiki_request()
+# serve the recorded responses instead of making HTTP requests
+transport = FakeTransport(mock_data["_wiki_request calls"])
+wikipedia.set_transport(transport)
 
 
 class TestSearch(unittest.TestCase):
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from wikipedia import wikipedia
+
+
+class TestSession(unittest.TestCase):
+  """Test the persistent HTTP session shared by all requests."""
+
+  def tearDown(self):
+    wikipedia.set_session_options()
+
+  def test_session_reused(self):
+    """Test that consecutive lookups return the same session."""
+    self.assertIs(wikipedia._get_session(), wikipedia._get_session())
+
+  def test_pool_size(self):
+    """Test that the connection pool size is applied to both schemes."""
+    wikipedia.set_session_options(pool_size=25)
+    session = wikipedia._get_session()
+    for prefix in ('http://', 'https://'):
+      self.assertEqual(session.get_adapter(prefix)._pool_maxsize, 25)
+
+  def test_options_reset_session(self):
+    """Test that changing the options replaces the session."""
+    session = wikipedia._get_session()
+    wikipedia.set_session_options(timeout=5)
+    self.assertEqual(wikipedia.TIMEOUT, 5)
+    self.assertIsNot(wikipedia._get_session(), session)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from wikipedia import wikipedia
+from wikipedia.storage import SQLiteCache
+from wikipedia.transport import Response, Transport
+
+
+class TestSQLiteCache(unittest.TestCase):
+  """Test the persistent response cache."""
+
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.path = os.path.join(self.dir, 'responses.sqlite')
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def test_persistent(self):
+    """Test that a stored response survives reopening the database."""
+    cache = SQLiteCache(self.path)
+    key = cache.key('http://en.wikipedia.org/w/api.php', {'titles': 'Celtuce', 'rvlimit': 1})
+    cache.set(key, {'query': {'pages': {}}})
+    cache.close()
+
+    self.assertEqual(SQLiteCache(self.path).get(key), {'query': {'pages': {}}})
+
+  def test_key_normalized(self):
+    """Test that parameter order and value types do not change the key."""
+    url = 'http://en.wikipedia.org/w/api.php'
+    self.assertEqual(
+      SQLiteCache.key(url, {'rvlimit': 1, 'titles': 'Celtuce'}),
+      SQLiteCache.key(url, {'titles': 'Celtuce', 'rvlimit': '1'}))
+    self.assertNotEqual(
+      SQLiteCache.key(url, {'titles': 'Celtuce'}),
+      SQLiteCache.key('http://fr.wikipedia.org/w/api.php', {'titles': 'Celtuce'}))
+
+  def test_expire(self):
+    """Test that expired responses are not returned."""
+    cache = SQLiteCache(self.path, expire=0)
+    cache.set('key', {})
+    self.assertEqual(cache.get('key'), None)
+
+  def test_max_entries(self):
+    """Test that pruning keeps only the newest responses."""
+    cache = SQLiteCache(self.path, max_entries=2)
+    for i in range(5):
+      cache.set(str(i), i)
+    cache.prune()
+
+    self.assertEqual(len(cache), 2)
+    self.assertEqual(cache.get('4'), 4)
+    self.assertEqual(cache.get('0'), None)
+
+
+class RandomTransport(Transport):
+  """Answer every request with a new random page."""
+
+  def __init__(self):
+    self.requests = []
+
+  def get(self, url, params, headers, timeout):
+    self.requests.append(dict(params))
+    body = {'query': {'random': [{'title': 'Page {0}'.format(len(self.requests))}]}}
+    return Response(200, {}, json.dumps(body).encode('utf-8'))
+
+
+class TestResponseCache(unittest.TestCase):
+  """Test which responses are kept in the response cache."""
+
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    self.transport = wikipedia.TRANSPORT
+    wikipedia.set_response_cache(os.path.join(self.dir, 'responses.sqlite'))
+
+  def tearDown(self):
+    wikipedia.set_response_cache(None)
+    wikipedia.set_transport(self.transport)
+    shutil.rmtree(self.dir)
+
+  def test_random(self):
+    """Test that random pages are requested every time."""
+    transport = RandomTransport()
+    wikipedia.set_transport(transport)
+    self.assertEqual([wikipedia.random() for i in range(2)], ['Page 1', 'Page 2'])
+    self.assertEqual(len(wikipedia.RESPONSE_CACHE), 0)
+
+  def test_deterministic(self):
+    """Test that other requests are answered from the cache."""
+    transport = RandomTransport()
+    wikipedia.set_transport(transport)
+    for i in range(2):
+      wikipedia._wiki_request({'prop': 'info', 'titles': 'Celtuce'})
+    self.assertEqual(len(transport.requests), 1)
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from wikipedia import wikipedia
+from wikipedia.transport import FakeTransport
+from request_mock_data import mock_data
+
+
+class FakeTransportCase(unittest.TestCase):
+  """
+  Serve the recorded responses from a transport of each test's own, as
+  self.transport, so the test can count its requests or add responses.
+  The transport in use before is set again after the test.
+  """
+
+  def fake_transport(self):
+    return FakeTransport(mock_data["_wiki_request calls"])
+
+  def setUp(self):
+    self.original_transport = wikipedia.TRANSPORT
+    self.transport = self.fake_transport()
+    wikipedia.set_transport(self.transport)
+
+  def tearDown(self):
+    wikipedia.set_transport(self.original_transport)
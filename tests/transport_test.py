@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from wikipedia import wikipedia
+from wikipedia.transport import FakeTransport, RecordReplayTransport, Response
+
+
+class TestFakeTransport(unittest.TestCase):
+  """Test answering requests from memory."""
+
+  def test_key(self):
+    """Test that requests match regardless of value types and common parameters."""
+    transport = FakeTransport({(('pageids', 1868108), ('prop', 'info')): {'query': {}}})
+    r = transport.get(wikipedia.API_URL, {'pageids': '1868108', 'prop': 'info', 'format': 'json'}, {}, 30)
+    self.assertEqual((r.status_code, r.content), (200, b'{"query": {}}'))
+    self.assertEqual(len(transport.requests), 1)
+
+  def test_missing(self):
+    """Test that unknown requests raise KeyError."""
+    transport = FakeTransport()
+    self.assertRaises(KeyError, transport.get, wikipedia.API_URL, {'prop': 'info'}, {}, 30)
+
+
+class CountingTransport(FakeTransport):
+  """Fail the first request for each parameter set with a 503."""
+
+  def get(self, url, params, headers, timeout):
+    r = super(CountingTransport, self).get(url, params, headers, timeout)
+    if len(self.requests) == 1:
+      return Response(503, {}, b'')
+    return r
+
+
+class TestRecordReplayTransport(unittest.TestCase):
+  """Test recording responses to a file and replaying them."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'traffic.jsonl')
+    self.inner = CountingTransport({(('list', 'search'), ('srsearch', u'Ünïcode')): {'query': {'search': []}}})
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def get(self, transport):
+    return transport.get(wikipedia.API_URL, {'list': 'search', 'srsearch': u'Ünïcode'}, {}, 30)
+
+  def test_record_replay(self):
+    """Test that recorded responses are served back without requests."""
+    recorder = RecordReplayTransport(self.path, mode='record', transport=self.inner)
+    self.assertEqual(self.get(recorder).status_code, 503)
+    self.assertEqual(self.get(recorder).content, b'{"query": {"search": []}}')
+
+    replayer = RecordReplayTransport(self.path, mode='replay', transport=FakeTransport())
+    self.assertEqual(self.get(replayer).content, b'{"query": {"search": []}}')
+    self.assertRaises(
+      KeyError, replayer.get, 'http://de.wikipedia.org/w/api.php', {'list': 'search', 'srsearch': u'Ünïcode'}, {}, 30)
+
+  def test_auto(self):
+    """Test that auto mode only makes requests that were not recorded."""
+    transport = RecordReplayTransport(self.path, transport=self.inner)
+    for i in range(3):
+      self.get(transport)
+    self.assertEqual(len(self.inner.requests), 2)
+
+    with open(self.path, 'rb') as f:
+      self.assertEqual(len(f.readlines()), 1)
+
+  def test_invalid_mode(self):
+    """Test that the mode is checked."""
+    self.assertRaises(ValueError, RecordReplayTransport, self.path, mode='rewind')
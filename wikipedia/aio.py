@@ -0,0 +1,620 @@
+"""
+Asyncio counterparts of the functions in ``wikipedia``.
+
+Every function here is a coroutine with the same arguments as its blocking
+twin. ``page`` returns a ``WikipediaPage`` whose lazy properties are
+coroutine methods instead, e.g. ``await (await aio.page("Celtuce")).links()``.
+
+The language, User-Agent, timeout and response cache configured through
+``wikipedia.set_lang`` and friends apply here as well. HTTP requests go
+through a pluggable transport (see ``set_transport``).
+
+.. note:: Requires Python 3.6 or newer, for asynchronous generators.
+"""
+
+import asyncio
+import functools
+
+from . import instrumentation
+from . import wikipedia as _wikipedia
+from .exceptions import PageError, DisambiguationError, RedirectError, ODD_ERROR_MESSAGE
+from .transport import Response
+from .util import cache as _cache, _MISSING, _clock
+
+
+class ExecutorTransport(object):
+  '''
+  Transport that runs the blocking transport of ``wikipedia`` (see
+  ``wikipedia.set_transport``) in the event loop's default executor.
+
+  Used when aiohttp is not installed, and to serve asyncio requests from a
+  ``FakeTransport`` or ``RecordReplayTransport``.
+  '''
+
+  @property
+  def errors(self):
+    return _wikipedia._get_transport().errors
+
+  async def get(self, url, params, headers, timeout):
+    loop = asyncio.get_event_loop()
+    get = functools.partial(_wikipedia._get_transport().get, url, params, headers, timeout)
+    return await loop.run_in_executor(None, get)
+
+  async def close(self):
+    pass
+
+
+class AiohttpTransport(object):
+  '''
+  Transport built on an ``aiohttp.ClientSession``, so that hundreds of
+  requests can be in flight without a thread each.
+
+  Keyword arguments:
+
+  * session - an existing aiohttp.ClientSession to use. By default one is
+         created on the first request and closed by ``close``
+  * pool_size - the maximum number of simultaneous connections of the created session
+  '''
+
+  def __init__(self, session=None, pool_size=100):
+    import aiohttp
+
+    self._aiohttp = aiohttp
+    self.errors = (aiohttp.ClientError, asyncio.TimeoutError)
+    self._session = session
+    self._owns_session = session is None
+    self.pool_size = pool_size
+
+  async def get(self, url, params, headers, timeout):
+    if self._session is None:
+      connector = self._aiohttp.TCPConnector(limit=self.pool_size)
+      self._session = self._aiohttp.ClientSession(connector=connector)
+
+    params = dict((k, '{0}'.format(v)) for k, v in params.items())
+    timeout = self._aiohttp.ClientTimeout(total=timeout)
+
+    async with self._session.get(url, params=params, headers=headers, timeout=timeout) as r:
+      return Response(r.status, r.headers, await r.read())
+
+  async def close(self):
+    if self._owns_session and self._session is not None:
+      await self._session.close()
+    self._session = None
+
+
+TRANSPORT = None
+
+
+def set_transport(transport):
+  '''
+  Set the transport used for all asyncio requests.
+
+  A transport is an object with a coroutine method
+  ``get(url, params, headers, timeout)`` returning a response with
+  ``status_code``, ``headers`` and ``content`` (the raw body as bytes).
+  Its optional ``errors`` attribute is a tuple of the exception types raised
+  for connection failures and timeouts, which are retried.
+
+  Arguments:
+
+  * transport - the transport to use, or None to go back to the default
+         (``AiohttpTransport`` if aiohttp is installed, ``ExecutorTransport`` otherwise)
+  '''
+  global TRANSPORT
+  TRANSPORT = transport
+
+
+def _get_transport():
+  global TRANSPORT
+
+  if TRANSPORT is None:
+    try:
+      TRANSPORT = AiohttpTransport()
+    except ImportError:
+      TRANSPORT = ExecutorTransport()
+
+  return TRANSPORT
+
+
+class cache(_cache):
+  '''
+  ``wikipedia.util.cache`` for coroutine functions. Entries are kept per
+  API URL, so changing the language never serves stale results.
+  '''
+
+  async def __call__(self, *args, **kwargs):
+    key = (_wikipedia.API_URL, self._key(args, kwargs))
+    ret = self._cache.get(key, _MISSING)
+    if ret is _MISSING:
+      instrumentation.cache_miss(self.name, key)
+      ret = await self.fn(*args, **kwargs)
+      self._cache.set(key, ret)
+    else:
+      instrumentation.cache_hit(self.name, key)
+
+    return ret
+
+
+@cache
+async def search(query, results=10, suggestion=False):
+  '''
+  Coroutine version of ``wikipedia.search``.
+  '''
+  raw_results = await _wiki_request(_wikipedia._search_params(query, results, suggestion))
+
+  return _wikipedia._search_results(raw_results, query, suggestion)
+
+
+@cache
+async def geosearch(latitude, longitude, title=None, results=10, radius=1000):
+  '''
+  Coroutine version of ``wikipedia.geosearch``.
+  '''
+  raw_results = await _wiki_request(
+    _wikipedia._geosearch_params(latitude, longitude, title, results, radius))
+
+  return _wikipedia._geosearch_results(raw_results, latitude, longitude)
+
+
+@cache
+async def suggest(query):
+  '''
+  Coroutine version of ``wikipedia.suggest``.
+  '''
+  raw_result = await _wiki_request(_wikipedia._suggest_params(query))
+
+  return _wikipedia._suggest_result(raw_result)
+
+
+async def random(pages=1):
+  '''
+  Coroutine version of ``wikipedia.random``.
+  '''
+  request = await _wiki_request({
+    'list': 'random',
+    'rnnamespace': 0,
+    'rnlimit': pages,
+  })
+  titles = [page['title'] for page in request['query']['random']]
+
+  if len(titles) == 1:
+    return titles[0]
+
+  return titles
+
+
+@cache
+async def summary(title, sentences=0, chars=0, auto_suggest=True, redirect=True):
+  '''
+  Coroutine version of ``wikipedia.summary``.
+  '''
+  request = await _wiki_request(_wikipedia._summary_params(title, sentences, chars, auto_suggest))
+  query = request.get('query', {})
+
+  if auto_suggest:
+    title, suggested = _wikipedia._summary_title(query, title)
+    if suggested:
+      request = await _wiki_request(_wikipedia._summary_params(title, sentences, chars))
+      query = request.get('query', {})
+
+  page_info = _wikipedia._summary_page(query, title, redirect)
+
+  if 'pageprops' in page_info:
+    title = page_info['title'] if 'redirects' in query else title
+    request = await _wiki_request(_wikipedia._disambiguation_params({'titles': title}))
+    raise DisambiguationError(title, _wikipedia._disambiguation_options_from(request, str(page_info['pageid'])))
+
+  return page_info['extract']
+
+
+async def page(title=None, pageid=None, auto_suggest=True, redirect=True, preload=False):
+  '''
+  Coroutine version of ``wikipedia.page``. With `preload`, all properties
+  are fetched concurrently.
+  '''
+  if title is not None:
+    if auto_suggest:
+      results, suggestion = await search(title, results=1, suggestion=True)
+      try:
+        title = suggestion or results[0]
+      except IndexError:
+        # if there is no suggestion or search results, the page doesn't exist
+        raise PageError(title)
+    wiki_page = WikipediaPage(title)
+  elif pageid is not None:
+    wiki_page = WikipediaPage(pageid=pageid)
+  else:
+    raise ValueError("Either a title or a pageid must be specified")
+
+  await wiki_page.load(redirect=redirect, preload=preload)
+
+  return wiki_page
+
+
+class WikipediaPage(object):
+  '''
+  Asyncio counterpart of ``wikipedia.WikipediaPage``.
+
+  Create pages with ``await page(...)``. The lazy properties of the blocking
+  class are coroutine methods here, and cache their results the same way.
+  '''
+
+  def __init__(self, title=None, pageid=None, original_title=''):
+    if title is not None:
+      self.title = title
+      self.original_title = original_title or title
+    elif pageid is not None:
+      self.pageid = pageid
+    else:
+      raise ValueError("Either a title or a pageid must be specified")
+
+  def __repr__(self):
+    return u'<aio.WikipediaPage \'{}\'>'.format(self.title)
+
+  def __eq__(self, other):
+    try:
+      return (
+        self.pageid == other.pageid
+        and self.title == other.title
+        and self.url == other.url
+      )
+    except AttributeError:
+      return False
+
+  async def load(self, redirect=True, preload=False):
+    '''
+    Load basic information from Wikipedia.
+    Confirm that page exists and is not a disambiguation/redirect.
+
+    Called by ``page``.
+    '''
+    title = getattr(self, 'title', None)
+    page_info = None if title is None else _wikipedia._cached_title(title, redirect)
+
+    if page_info is not None:
+      self.pageid, self.title, self.url = page_info['pageid'], page_info['title'], page_info['fullurl']
+
+    else:
+      request = await _wiki_request(_wikipedia._page_info_params(self._title_query_param()))
+      pageid, page, redirected = _wikipedia._resolved_page(
+        request['query'], title, getattr(self, 'pageid', None), redirect)
+
+      if 'pageprops' in page:
+        if redirected:
+          title_param, title = {'titles': page['title']}, page['title']
+        else:
+          title_param, title = self._title_query_param(), getattr(self, 'title', page['title'])
+
+        options = _wikipedia._cached_disambiguation_options(pageid, page.get('lastrevid'))
+        if options is None:
+          request = await _wiki_request(_wikipedia._disambiguation_params(title_param))
+          options = _wikipedia._disambiguation_options_from(request, pageid)
+
+        raise DisambiguationError(title, options)
+
+      if title is not None:
+        _wikipedia._cache_title(title, page, redirected)
+
+      self.pageid = pageid
+      self.title = page['title']
+      self.url = page['fullurl']
+
+    if preload:
+      # sections are parsed from the content, so load it before starting the
+      # others rather than requesting it twice
+      await self.content()
+      await asyncio.gather(*(getattr(self, prop)() for prop in _wikipedia._PRELOAD_PROPERTIES if prop != 'content'))
+
+  def _title_query_param(self):
+    if getattr(self, 'title', None) is not None:
+      return {'titles': self.title}
+    else:
+      return {'pageids': self.pageid}
+
+  async def _continued_query(self, query_params):
+    '''
+    Based on https://www.mediawiki.org/wiki/API:Query#Continuing_queries
+
+    Asynchronously yields the items of each response as a list.
+    '''
+    query_params.update(self._title_query_param())
+
+    last_continue = {}
+
+    while True:
+      params = query_params.copy()
+      params.update(last_continue)
+
+      request = await _wiki_request(params)
+
+      if 'query' not in request:
+        break
+
+      yield list(_wikipedia._continued_items(request, query_params, self.pageid))
+
+      if 'continue' not in request:
+        break
+
+      last_continue = request['continue']
+
+  async def _list_query(self, name):
+    return [value async for value in self._iter_list(name)]
+
+  async def _iter_list(self, name):
+    loaded = getattr(self, '_' + name, False)
+    if loaded:
+      for value in loaded:
+        yield value
+      return
+
+    query_params, values = _wikipedia._LIST_QUERIES[name]
+    async for items in self._continued_query(dict(query_params)):
+      for value in values(items):
+        yield value
+
+  async def html(self):
+    '''
+    Full page HTML.
+    '''
+    if not getattr(self, '_html', False):
+      request = await _wiki_request({
+        'prop': 'revisions',
+        'rvprop': 'content',
+        'rvlimit': 1,
+        'rvparse': '',
+        'titles': self.title
+      })
+      self._html = request['query']['pages'][self.pageid]['revisions'][0]['*']
+
+    return self._html
+
+  async def content(self):
+    '''
+    Plain text content of the page, excluding images, tables, and other data.
+    '''
+    if not getattr(self, '_content', False):
+      query_params = {
+        'prop': 'extracts|revisions',
+        'explaintext': '',
+        'rvprop': 'ids'
+      }
+      query_params.update(self._title_query_param())
+
+      request = await _wiki_request(query_params)
+      self._content = request['query']['pages'][self.pageid]['extract']
+      self._revision_id = request['query']['pages'][self.pageid]['revisions'][0]['revid']
+      self._parent_id = request['query']['pages'][self.pageid]['revisions'][0]['parentid']
+
+    return self._content
+
+  async def revision_id(self):
+    '''
+    Revision ID of the page.
+    '''
+    if not getattr(self, '_revision_id', False):
+      await self.content()
+
+    return self._revision_id
+
+  async def parent_id(self):
+    '''
+    Revision ID of the parent version of the current revision of this page.
+    '''
+    if not getattr(self, '_parent_id', False):
+      await self.content()
+
+    return self._parent_id
+
+  async def summary(self):
+    '''
+    Plain text summary of the page.
+    '''
+    if not getattr(self, '_summary', False):
+      query_params = {
+        'prop': 'extracts',
+        'explaintext': '',
+        'exintro': '',
+      }
+      query_params.update(self._title_query_param())
+
+      request = await _wiki_request(query_params)
+      self._summary = request['query']['pages'][self.pageid]['extract']
+
+    return self._summary
+
+  async def images(self):
+    '''
+    List of URLs of images on the page.
+    '''
+    if not getattr(self, '_images', False):
+      self._images = await self._list_query('images')
+
+    return self._images
+
+  def iter_images(self):
+    '''
+    Asynchronous generator version of ``wikipedia.WikipediaPage.iter_images``.
+    '''
+    return self._iter_list('images')
+
+  async def coordinates(self):
+    '''
+    Tuple of Decimals in the form of (lat, lon) or None
+    '''
+    # None is remembered too: the page has no coordinates
+    if not hasattr(self, '_coordinates'):
+      request = await _wiki_request({
+        'prop': 'coordinates',
+        'colimit': 'max',
+        'titles': self.title,
+      })
+
+      if 'query' in request and 'coordinates' in request['query']['pages'][self.pageid]:
+        self._coordinates = _wikipedia._decimal_coordinates(request['query']['pages'][self.pageid]['coordinates'])
+      else:
+        self._coordinates = None
+
+    return self._coordinates
+
+  async def references(self):
+    '''
+    List of URLs of external links on a page.
+    '''
+    if not getattr(self, '_references', False):
+      self._references = await self._list_query('references')
+
+    return self._references
+
+  def iter_references(self):
+    '''
+    Asynchronous generator version of ``wikipedia.WikipediaPage.iter_references``.
+    '''
+    return self._iter_list('references')
+
+  async def links(self):
+    '''
+    List of titles of Wikipedia page links on a page.
+    '''
+    if not getattr(self, '_links', False):
+      self._links = await self._list_query('links')
+
+    return self._links
+
+  def iter_links(self):
+    '''
+    Asynchronous generator version of ``wikipedia.WikipediaPage.iter_links``.
+    '''
+    return self._iter_list('links')
+
+  async def categories(self):
+    '''
+    List of categories of a page.
+    '''
+    if not getattr(self, '_categories', False):
+      self._categories = await self._list_query('categories')
+
+    return self._categories
+
+  def iter_categories(self):
+    '''
+    Asynchronous generator version of ``wikipedia.WikipediaPage.iter_categories``.
+    '''
+    return self._iter_list('categories')
+
+  async def sections(self):
+    '''
+    List of section titles of the page, see ``wikipedia.WikipediaPage.sections``.
+    '''
+    if not getattr(self, '_sections', False):
+      self._sections = [section.title for section in (await self._get_section_tree()).sections]
+
+    return self._sections
+
+  async def section(self, section_title):
+    '''
+    Get the plain text content of a section, see ``wikipedia.WikipediaPage.section``.
+    '''
+    return (await self._get_section_tree()).text(section_title)
+
+  async def _get_section_tree(self):
+    if not getattr(self, '_section_tree', False):
+      self._section_tree = _wikipedia.SectionTree(await self.content())
+
+    return self._section_tree
+
+
+@cache
+async def languages():
+  '''
+  Coroutine version of ``wikipedia.languages``.
+  '''
+  response = await _wiki_request({
+    'meta': 'siteinfo',
+    'siprop': 'languages'
+  })
+
+  return {
+    lang['code']: lang['*']
+    for lang in response['query']['languages']
+  }
+
+
+async def raw_request(params):
+  '''
+  Coroutine version of ``wikipedia.raw_request``.
+  '''
+  return await _wiki_request(dict(params), raw=True)
+
+
+async def close():
+  '''
+  Close the transport, releasing its connections.
+  '''
+  if TRANSPORT is not None:
+    await TRANSPORT.close()
+
+
+async def _wiki_request(params, raw=False):
+  '''
+  Make a request to the Wikipedia API using the given search parameters.
+  Returns a parsed dict of the JSON response, or the undecoded bytes if `raw`.
+  '''
+  params['format'] = 'json'
+  if not 'action' in params:
+    params['action'] = 'query'
+
+  response_cache = None if raw or not _wikipedia._is_deterministic(params) else _wikipedia.RESPONSE_CACHE
+  if response_cache is not None:
+    cache_key = response_cache.key(_wikipedia.API_URL, params)
+    response = response_cache.get(cache_key)
+    if response is not None:
+      instrumentation.cache_hit('response', cache_key)
+      return response
+    instrumentation.cache_miss('response', cache_key)
+
+  headers = {
+    'User-Agent': _wikipedia.USER_AGENT,
+    'Accept-Encoding': _wikipedia.ACCEPT_ENCODING
+  }
+
+  retry_policy = _wikipedia.RETRY_POLICY
+  if retry_policy.maxlag is not None:
+    params['maxlag'] = retry_policy.maxlag
+
+  transport = _get_transport()
+  errors = getattr(transport, 'errors', (OSError, asyncio.TimeoutError))
+  instrumentation.before_request(params)
+  started = _clock()
+  attempt = 0
+  size = 0
+
+  try:
+    while True:
+      rate_limiter = _wikipedia.RATE_LIMITER
+      if rate_limiter is not None:
+        # shares the limit with blocking callers, without blocking the event loop
+        await asyncio.sleep(rate_limiter.reserve())
+
+      try:
+        r = await transport.get(_wikipedia.API_URL, params, headers, _wikipedia.TIMEOUT)
+      except errors as e:
+        response, delay = _wikipedia._attempt_outcome(None, e, raw, retry_policy, attempt, started)
+      else:
+        size += len(r.content)
+        response, delay = _wikipedia._attempt_outcome(r, None, raw, retry_policy, attempt, started)
+
+      if delay is None:
+        break
+
+      await asyncio.sleep(delay)
+      attempt += 1
+  except Exception as e:
+    instrumentation.after_request(params, _clock() - started, size, attempt, e)
+    raise
+
+  instrumentation.after_request(params, _clock() - started, size, attempt, _wikipedia._api_error(response))
+
+  if response_cache is not None and 'error' not in response:
+    response_cache.set(cache_key, response)
+
+  return response
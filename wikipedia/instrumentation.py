@@ -0,0 +1,199 @@
+"""
+Hooks and metrics describing the requests made to the API and the use of the caches.
+
+Hooks are plain functions registered for one of the events below with
+``add_hook``; they are called synchronously, with keyword arguments, from the
+thread (or event loop) making the request:
+
+* ``before_request(params)`` - a request is about to be sent
+* ``after_request(params, latency, size, retries, error)`` - a request finished.
+  `latency` is in seconds and includes retries, `size` is the number of response
+  bytes received, `retries` the number of retries made, and `error` None, the
+  exception raised, or the ``error`` object of an API error response
+* ``cache_hit(name, key)`` and ``cache_miss(name, key)`` - a lookup in the cache
+  `name` (e.g. ``wikipedia.search``, or ``response`` for the response cache)
+
+Independently of hooks, counters and latency histograms are always kept and can
+be read with ``metrics()``.
+"""
+
+from __future__ import unicode_literals
+
+import threading
+
+EVENTS = ('before_request', 'after_request', 'cache_hit', 'cache_miss')
+
+# upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_HOOKS = dict((event, ()) for event in EVENTS)
+_HOOKS_LOCK = threading.Lock()
+
+
+def add_hook(event, hook):
+  '''
+  Call `hook` on every `event`.
+
+  Arguments:
+
+  * event - one of ``before_request``, ``after_request``, ``cache_hit`` or ``cache_miss``
+  * hook - a function accepting the keyword arguments of the event
+  '''
+  if event not in _HOOKS:
+    raise ValueError('Unknown event {0!r}, expected one of {1}'.format(event, ', '.join(EVENTS)))
+
+  with _HOOKS_LOCK:
+    _HOOKS[event] = _HOOKS[event] + (hook,)
+
+
+def remove_hook(event, hook):
+  '''
+  Stop calling `hook` on `event`.
+  '''
+  with _HOOKS_LOCK:
+    hooks = list(_HOOKS[event])
+    hooks.remove(hook)
+    _HOOKS[event] = tuple(hooks)
+
+
+def call_type(params):
+  '''
+  Describe a request by its ``prop``, ``list``, ``generator``, ``meta`` or non-query ``action``,
+  e.g. ``prop=links``, which maps it to the function or ``WikipediaPage`` property that made it.
+  '''
+  action = params.get('action', 'query')
+  if action != 'query':
+    return 'action={0}'.format(action)
+
+  return ' '.join(
+    '{0}={1}'.format(name, params[name])
+    for name in ('generator', 'list', 'prop', 'meta') if name in params)
+
+
+class Histogram(object):
+  """
+  Cumulative histogram of values: ``buckets[bound]`` counts the values that
+  were at most `bound`, like a Prometheus histogram.
+  """
+
+  def __init__(self, bounds=LATENCY_BUCKETS):
+    self.bounds = bounds
+    self.counts = [0] * (len(bounds) + 1)
+    self.count = 0
+    self.sum = 0.0
+
+  def observe(self, value):
+    for i, bound in enumerate(self.bounds):
+      if value <= bound:
+        break
+    else:
+      i = len(self.bounds)
+
+    self.counts[i] += 1
+    self.count += 1
+    self.sum += value
+
+  def as_dict(self):
+    buckets = {}
+    total = 0
+    for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+      total += count
+      buckets['{0}'.format(bound)] = total
+
+    return {'buckets': buckets, 'count': self.count, 'sum': self.sum}
+
+
+class Metrics(object):
+  """
+  Thread-safe request and cache counters, with latency histograms overall and per call type.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.reset()
+
+  def reset(self):
+    with self._lock:
+      self._totals = self._counters()
+      self._by_call_type = {}
+      self._caches = {}
+
+  @staticmethod
+  def _counters():
+    return {'requests': 0, 'errors': 0, 'retries': 0, 'bytes': 0, 'latency': Histogram()}
+
+  def record_request(self, params, latency, size, retries, error):
+    kind = call_type(params)
+
+    with self._lock:
+      if kind not in self._by_call_type:
+        self._by_call_type[kind] = self._counters()
+
+      for counters in (self._totals, self._by_call_type[kind]):
+        counters['requests'] += 1
+        counters['errors'] += error is not None
+        counters['retries'] += retries
+        counters['bytes'] += size
+        counters['latency'].observe(latency)
+
+  def record_cache(self, name, hit):
+    with self._lock:
+      counters = self._caches.setdefault(name, {'hits': 0, 'misses': 0})
+      counters['hits' if hit else 'misses'] += 1
+
+  def as_dict(self):
+    def plain(counters):
+      return dict((k, v.as_dict() if isinstance(v, Histogram) else v) for k, v in counters.items())
+
+    with self._lock:
+      metrics = plain(self._totals)
+      metrics['by_call_type'] = dict((kind, plain(c)) for kind, c in self._by_call_type.items())
+      metrics['caches'] = dict((name, dict(c)) for name, c in self._caches.items())
+
+    return metrics
+
+
+METRICS = Metrics()
+
+
+def metrics():
+  '''
+  Get the request and cache metrics collected since the start or the last ``reset_metrics``, as a dict:
+
+  * requests, errors, retries, bytes - totals over all requests
+  * latency - a cumulative histogram of request latencies in seconds:
+         ``{'buckets': {'0.01': n, ..., '+Inf': n}, 'count': n, 'sum': seconds}``
+  * by_call_type - the same counters per kind of request, e.g. ``prop=links``
+  * caches - ``{'hits': n, 'misses': n}`` per cache
+  '''
+  return METRICS.as_dict()
+
+
+def reset_metrics():
+  '''
+  Set all metrics back to zero.
+  '''
+  METRICS.reset()
+
+
+def before_request(params):
+  for hook in _HOOKS['before_request']:
+    hook(params=params)
+
+
+def after_request(params, latency, size, retries, error):
+  METRICS.record_request(params, latency, size, retries, error)
+  for hook in _HOOKS['after_request']:
+    hook(params=params, latency=latency, size=size, retries=retries, error=error)
+
+
+def cache_hit(name, key):
+  METRICS.record_cache(name, True)
+  for hook in _HOOKS['cache_hit']:
+    hook(name=name, key=key)
+
+
+def cache_miss(name, key):
+  METRICS.record_cache(name, False)
+  for hook in _HOOKS['cache_miss']:
+    hook(name=name, key=key)
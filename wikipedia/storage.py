@@ -0,0 +1,113 @@
+"""
+Persistent storage for decoded API responses.
+"""
+
+from __future__ import unicode_literals
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+
+from .util import seconds
+
+
+class SQLiteCache(object):
+  """
+  Cache of decoded API responses kept in a SQLite database, so that they
+  survive restarts of the process.
+
+  Arguments:
+
+  * path - filename of the database (created if it does not exist)
+
+  Keyword arguments:
+
+  * max_entries - the maximum number of responses kept; the oldest are removed first.
+         None for no limit
+  * expire - how long a response is served from the cache, as a timedelta or
+         number of seconds. None to keep responses until they are evicted
+  """
+
+  # how many writes to make between two pruning passes
+  PRUNE_INTERVAL = 100
+
+  def __init__(self, path, max_entries=100000, expire=timedelta(days=1)):
+    self.path = path
+    self.max_entries = max_entries
+    self.expire = seconds(expire)
+
+    self._lock = threading.Lock()
+    self._writes = 0
+    self._db = sqlite3.connect(path, check_same_thread=False)
+
+    with self._db:
+      self._db.execute(
+        'CREATE TABLE IF NOT EXISTS responses '
+        '(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)')
+      self._db.execute('CREATE INDEX IF NOT EXISTS responses_created ON responses (created)')
+
+  @staticmethod
+  def key(url, params):
+    """Build the cache key for a request to `url` with `params`."""
+    return json.dumps([url, dict((k, '{0}'.format(v)) for k, v in params.items())], sort_keys=True)
+
+  def get(self, key):
+    """Return the response stored under `key`, or None if it is missing or expired."""
+    with self._lock:
+      row = self._db.execute('SELECT value, created FROM responses WHERE key = ?', (key,)).fetchone()
+
+    if row is None:
+      return None
+
+    value, created = row
+    if self.expire is not None and created + self.expire <= time.time():
+      return None
+
+    return json.loads(value)
+
+  def set(self, key, response):
+    """Store the decoded `response` under `key`."""
+    value = json.dumps(response)
+
+    with self._lock:
+      with self._db:
+        self._db.execute(
+          'INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)',
+          (key, value, time.time()))
+
+      self._writes += 1
+      if self._writes % self.PRUNE_INTERVAL == 0:
+        self._prune()
+
+  def prune(self):
+    """Remove expired responses, then the oldest ones above `max_entries`."""
+    with self._lock:
+      self._prune()
+
+  def clear(self):
+    with self._lock:
+      with self._db:
+        self._db.execute('DELETE FROM responses')
+
+  def close(self):
+    with self._lock:
+      self._db.close()
+
+  def __len__(self):
+    with self._lock:
+      return self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+  def _prune(self):
+    with self._db:
+      if self.expire is not None:
+        self._db.execute('DELETE FROM responses WHERE created <= ?', (time.time() - self.expire,))
+
+      if self.max_entries is not None:
+        count = self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        if count > self.max_entries:
+          self._db.execute(
+            'DELETE FROM responses WHERE key IN '
+            '(SELECT key FROM responses ORDER BY created, rowid LIMIT ?)',
+            (count - self.max_entries,))
@@ -0,0 +1,203 @@
+"""
+Transports send the HTTP requests made by ``wikipedia``.
+
+``HTTPTransport`` is used by default. ``FakeTransport`` answers from memory and
+``RecordReplayTransport`` saves real traffic to a file and serves it back, so
+that code using this library can be tested and profiled offline with
+deterministic responses. Select one with ``wikipedia.set_transport``.
+"""
+
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import threading
+from collections import namedtuple
+
+import requests
+
+Response = namedtuple('Response', ['status_code', 'headers', 'content'])
+
+
+def request_key(url, params):
+  '''
+  Identify a request independently of parameter order, value types and the
+  parameters every request carries (``format=json`` and ``action=query``).
+  '''
+  if hasattr(params, 'items'):
+    params = params.items()
+
+  return (url,) + tuple(sorted(
+    (k, '{0}'.format(v)) for k, v in params
+    if (k, v) not in (('format', 'json'), ('action', 'query'))))
+
+
+class Transport(object):
+  '''
+  Interface of transports.
+
+  ``get`` returns an object with ``status_code``, ``headers`` and ``content``
+  (the response body as bytes), like ``requests.Response`` or ``Response``.
+  ``errors`` lists the exception types raised for connection failures and
+  timeouts, which are retried.
+  '''
+
+  errors = ()
+
+  def get(self, url, params, headers, timeout):
+    raise NotImplementedError
+
+  def close(self):
+    pass
+
+
+class HTTPTransport(Transport):
+  '''
+  Transport making real HTTP requests with ``requests``.
+
+  Keyword arguments:
+
+  * session - the requests.Session to use. By default the pooled keep-alive
+         session configured with ``wikipedia.set_session_options`` is used
+  '''
+
+  errors = (requests.ConnectionError, requests.Timeout)
+
+  def __init__(self, session=None):
+    self.session = session
+
+  def get(self, url, params, headers, timeout):
+    session = self.session
+    if session is None:
+      # imported here as wikipedia imports this module
+      from .wikipedia import _get_session
+      session = _get_session()
+
+    return session.get(url, params=params, headers=headers, timeout=timeout)
+
+  def close(self):
+    if self.session is not None:
+      self.session.close()
+
+
+class FakeTransport(Transport):
+  '''
+  Transport answering from memory, without network access.
+
+  Arguments:
+
+  * responses - a dict of decoded API responses keyed on the request parameters,
+         either as a sorted tuple of ``(name, value)`` pairs or as returned by ``request_key``
+
+  Keyword arguments:
+
+  * url - the API URL the responses belong to, or None to serve them for any language
+
+  Requests without a response raise KeyError. All requests are appended to ``requests``.
+  '''
+
+  def __init__(self, responses=None, url=None):
+    self.url = url
+    self.requests = []
+    self._responses = {}
+    self._lock = threading.Lock()
+    for params, response in (responses or {}).items():
+      self.add(params, response)
+
+  def add(self, params, response, status_code=200, headers=None):
+    '''
+    Answer requests with `params` with the decoded `response` (or raw bytes).
+    '''
+    if not isinstance(response, bytes):
+      response = json.dumps(response).encode('utf-8')
+    self._responses[request_key(self.url, params)] = Response(status_code, headers or {}, response)
+
+  def get(self, url, params, headers, timeout):
+    with self._lock:
+      self.requests.append(dict(params))
+
+    try:
+      return self._responses[request_key(self.url, params)]
+    except KeyError:
+      raise KeyError('No response for {0} {1}'.format(url, request_key(None, params)[1:]))
+
+
+class RecordReplayTransport(Transport):
+  '''
+  Transport that records responses to a file and plays them back.
+
+  The file holds one JSON object per line with the URL, parameters, status code
+  and body of a response.
+
+  Arguments:
+
+  * path - the file to record to and replay from
+
+  Keyword arguments:
+
+  * mode - ``replay`` to only serve recorded responses (unknown requests raise KeyError),
+         ``record`` to make every request and record it, or ``auto`` to replay what was
+         recorded and record the rest. Defaults to ``auto``
+  * transport - the transport making the recorded requests. Defaults to ``HTTPTransport()``
+  '''
+
+  MODES = ('replay', 'record', 'auto')
+
+  def __init__(self, path, mode='auto', transport=None):
+    if mode not in self.MODES:
+      raise ValueError('mode must be one of {0}'.format(', '.join(self.MODES)))
+
+    self.path = path
+    self.mode = mode
+    self.transport = transport or HTTPTransport()
+    self._lock = threading.Lock()
+    self._responses = {}
+
+    if mode == 'record':
+      io.open(path, 'w').close()
+    elif os.path.exists(path):
+      with io.open(path, encoding='utf-8') as f:
+        for line in f:
+          if line.strip():
+            self._load(json.loads(line))
+
+  @property
+  def errors(self):
+    return self.transport.errors
+
+  def _load(self, record):
+    response = Response(record['status_code'], {}, record['content'].encode('utf-8'))
+    self._responses[request_key(record['url'], record['params'])] = response
+
+  def get(self, url, params, headers, timeout):
+    key = request_key(url, params)
+
+    if self.mode != 'record':
+      response = self._responses.get(key)
+      if response is not None:
+        return response
+      if self.mode == 'replay':
+        raise KeyError('No recorded response for {0} {1}'.format(url, key[1:]))
+
+    r = self.transport.get(url, params, headers, timeout)
+    if r.status_code == 429 or r.status_code >= 500:
+      # transient failures are retried, not recorded
+      return r
+
+    record = {
+      'url': url,
+      'params': dict((k, '{0}'.format(v)) for k, v in params.items()),
+      'status_code': r.status_code,
+      'content': r.content.decode('utf-8'),
+    }
+
+    with self._lock:
+      self._load(record)
+      with io.open(self.path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, sort_keys=True, ensure_ascii=False) + '\n')
+
+    return self._responses[key]
+
+  def close(self):
+    self.transport.close()
@@ -2,6 +2,28 @@ from __future__ import print_function, unicode_literals
 
 import sys
 import functools
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from email.utils import parsedate_tz, mktime_tz
+
+from inspect import getcallargs
+
+try:
+  from inspect import BoundArguments, signature
+  if not hasattr(BoundArguments, 'apply_defaults'):
+    # Python 3.3 and 3.4: arguments are bound with getcallargs instead
+    signature = None
+except ImportError:
+  # Python 2, likewise
+  signature = None
+
+from . import instrumentation
 
 def debug(fn):
   def wrapper(*args, **kwargs):
@@ -13,24 +35,495 @@ def debug(fn):
   return wrapper
 
 
+DEFAULT_CACHE_SIZE = 1024
+
+_MISSING = object()
+
+
+def seconds(value):
+  """Convert a number of seconds or a timedelta to seconds (None stays None)."""
+  if value is None or isinstance(value, (int, float)):
+    return value
+  return value.total_seconds()
+
+
+class LRUCache(object):
+  """
+  Thread-safe mapping that holds at most `maxsize` entries (None for no limit),
+  evicting the least recently used entry first.
+
+  If `ttl` (seconds or a timedelta) is set, entries older than `ttl` are
+  treated as missing.
+  """
+
+  def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=None):
+    self._data = OrderedDict()
+    self._lock = threading.RLock()
+    self.hits = self.misses = self.evictions = 0
+    self.configure(maxsize, ttl)
+
+  def configure(self, maxsize=DEFAULT_CACHE_SIZE, ttl=None):
+    with self._lock:
+      self.maxsize = maxsize
+      self.ttl = seconds(ttl)
+      self._trim()
+
+  def get(self, key, default=None):
+    with self._lock:
+      try:
+        value, expires = self._data.pop(key)
+      except KeyError:
+        self.misses += 1
+        return default
+
+      if expires is not None and expires <= time.time():
+        self.misses += 1
+        return default
+
+      # re-inserting moves the entry to the most recently used end
+      self._data[key] = (value, expires)
+      self.hits += 1
+      return value
+
+  def set(self, key, value):
+    with self._lock:
+      self._data.pop(key, None)
+      expires = time.time() + self.ttl if self.ttl is not None else None
+      self._data[key] = (value, expires)
+      self._trim()
+
+  def clear(self):
+    with self._lock:
+      self._data.clear()
+
+  def info(self):
+    with self._lock:
+      return {
+        'hits': self.hits,
+        'misses': self.misses,
+        'evictions': self.evictions,
+        'size': len(self._data),
+        'maxsize': self.maxsize,
+        'ttl': self.ttl,
+      }
+
+  def __len__(self):
+    return len(self._data)
+
+  def _trim(self):
+    while self.maxsize is not None and len(self._data) > self.maxsize:
+      self._data.popitem(last=False)
+      self.evictions += 1
+
+
+# mean radius of the Earth in meters
+EARTH_RADIUS = 6371008.8
+
+
+def haversine(latitude1, longitude1, latitude2, longitude2):
+  """Great-circle distance in meters between two points given in degrees."""
+  lat1, lon1, lat2, lon2 = map(math.radians, (latitude1, longitude1, latitude2, longitude2))
+  a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+  return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialCache(LRUCache):
+  """
+  LRUCache of the places found within circles on the globe, which answers
+  searches within smaller circles they cover without a request.
+
+  Circles are indexed under every tile of `tile_size` degrees their bounding
+  box overlaps, so a search only looks at the circles of the tile of its center.
+  Entries live in `namespace`s, e.g. one per API URL.
+
+  `maxsize` bounds the number of places held, a circle without places counting
+  as one, so that a few dense circles cannot make the cache grow unnoticed.
+  """
+
+  def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=None, tile_size=0.1):
+    self.tile_size = tile_size
+    self._tiles = {}
+    self._ids = itertools.count()
+    self._size = 0
+    super(SpatialCache, self).__init__(maxsize, ttl)
+
+  def add(self, namespace, latitude, longitude, radius, places):
+    """
+    Remember `places`, a list of ``(latitude, longitude, value)``, as all the places
+    within `radius` meters of `latitude` and `longitude`.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    tiles = [(namespace,) + tile for tile in self._circle_tiles(latitude, longitude, radius)]
+    circle = (latitude, longitude, radius, tuple(places), tiles)
+
+    with self._lock:
+      key = next(self._ids)
+      for tile in tiles:
+        self._tiles.setdefault(tile, set()).add(key)
+      self._size += _circle_size(circle)
+      self.set(key, circle)
+
+  def search(self, namespace, latitude, longitude, radius, limit=None):
+    """
+    The values of the places within `radius` meters, nearest first and at most `limit`,
+    or None if no cached circle covers the search.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+
+    with self._lock:
+      for key in self._tiles.get((namespace,) + self.tile(latitude, longitude), ()):
+        value, expires = self._data[key]
+        if expires is not None and expires <= time.time():
+          continue
+
+        center_latitude, center_longitude, covered, places, tiles = value
+        if haversine(center_latitude, center_longitude, latitude, longitude) + radius <= covered:
+          # move to the most recently used end
+          self._data[key] = self._data.pop(key)
+          self.hits += 1
+          break
+      else:
+        self.misses += 1
+        return None
+
+    found = []
+    for place_latitude, place_longitude, place in places:
+      distance = haversine(latitude, longitude, place_latitude, place_longitude)
+      if distance <= radius:
+        found.append((distance, place))
+
+    found.sort(key=lambda item: item[0])
+    return [place for distance, place in found[:limit]]
+
+  def clear(self):
+    with self._lock:
+      super(SpatialCache, self).clear()
+      self._tiles.clear()
+      self._size = 0
+
+  def info(self):
+    with self._lock:
+      info = super(SpatialCache, self).info()
+      info['size'] = self._size
+      return info
+
+  def _trim(self):
+    while self.maxsize is not None and self._size > self.maxsize:
+      key, (circle, expires) = self._data.popitem(last=False)
+      self._unindex(key, circle)
+      self._size -= _circle_size(circle)
+      self.evictions += 1
+
+  def _unindex(self, key, circle):
+    for tile in circle[4]:
+      keys = self._tiles.get(tile)
+      if keys is not None:
+        keys.discard(key)
+        if not keys:
+          del self._tiles[tile]
+
+  def tile(self, latitude, longitude):
+    """The (row, column) of the tile of a point."""
+    columns = int(round(360 / self.tile_size))
+    return (int(math.floor(latitude / self.tile_size)), int(math.floor(longitude / self.tile_size)) % columns)
+
+  def _circle_tiles(self, latitude, longitude, radius):
+    columns = int(round(360 / self.tile_size))
+    delta_latitude = math.degrees(float(radius) / EARTH_RADIUS)
+    south, north = latitude - delta_latitude, latitude + delta_latitude
+
+    cos_latitude = math.cos(math.radians(max(abs(south), abs(north))))
+    if north >= 90 or south <= -90 or cos_latitude <= 0:
+      # around a pole the circle may span every longitude
+      west, east = 0, columns - 1
+    else:
+      delta_longitude = min(180.0, delta_latitude / cos_latitude)
+      west = int(math.floor((longitude - delta_longitude) / self.tile_size))
+      east = int(math.floor((longitude + delta_longitude) / self.tile_size))
+      east = min(east, west + columns - 1)
+
+    rows = range(int(math.floor(south / self.tile_size)), int(math.floor(north / self.tile_size)) + 1)
+    return set((row, column % columns) for row in rows for column in range(west, east + 1))
+
+
+def _circle_size(circle):
+  return max(1, len(circle[3]))
+
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class RateLimiter(object):
+  """
+  Thread-safe token bucket allowing `rate` requests per second on average
+  (fractions allowed), with bursts of up to `burst` requests.
+
+  ``reserve`` takes a token and returns the number of seconds to wait before
+  using it, so the same limiter serves blocking callers (``wait``) and
+  asyncio callers (``await asyncio.sleep(limiter.reserve())``).
+  """
+
+  def __init__(self, rate, burst=1):
+    self.rate = float(rate)
+    self.burst = burst
+    self._tokens = float(burst)
+    self._last = _clock()
+    self._lock = threading.Lock()
+
+  def reserve(self):
+    with self._lock:
+      now = _clock()
+      self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+      self._last = now
+
+      # the bucket may go negative: later callers queue up behind earlier ones
+      self._tokens -= 1
+      if self._tokens >= 0:
+        return 0.0
+      return -self._tokens / self.rate
+
+  def wait(self):
+    delay = self.reserve()
+    if delay > 0:
+      time.sleep(delay)
+
+
+class RetryPolicy(object):
+  """
+  How long to wait before retrying a failed request: exponential backoff with
+  full jitter, at most `max_backoff` per retry, giving up after `max_retries`
+  retries or once `max_time` would be exceeded (all times in seconds or timedeltas).
+
+  `maxlag` is the MediaWiki ``maxlag`` parameter sent with every request, or None.
+  """
+
+  def __init__(self, max_retries=3, backoff=0.5, max_backoff=30, max_time=60, maxlag=None):
+    self.max_retries = max_retries
+    self.backoff = seconds(backoff)
+    self.max_backoff = seconds(max_backoff)
+    self.max_time = seconds(max_time)
+    self.maxlag = maxlag
+
+  def delay(self, attempt, started, retry_after=None):
+    """
+    Seconds to wait before retry number `attempt` (counting from 0) of a request
+    first sent at ``_clock()`` time `started`, or None to give up.
+
+    `retry_after` is the value of the response's Retry-After header, if any.
+    """
+    if attempt >= self.max_retries:
+      return None
+
+    delay = parse_retry_after(retry_after)
+    if delay is None:
+      delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    if self.max_time is not None and _clock() - started + delay > self.max_time:
+      return None
+
+    return delay
+
+
+class SingleFlight(object):
+  """
+  Coalesce concurrent calls: while a call for a key is running, other threads
+  calling ``do`` with the same key wait for it and share its result or exception
+  instead of running the function again.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._calls = {}
+
+  def do(self, key, fn, *args, **kwargs):
+    with self._lock:
+      call = self._calls.get(key)
+      leader = call is None
+      if leader:
+        call = self._calls[key] = _Call()
+
+    if not leader:
+      call.done.wait()
+      if call.error is not None:
+        raise call.error
+      return call.result
+
+    try:
+      call.result = fn(*args, **kwargs)
+    except BaseException as e:
+      call.error = e
+      raise
+    finally:
+      with self._lock:
+        del self._calls[key]
+      call.done.set()
+
+    return call.result
+
+  def in_flight(self):
+    """The number of calls running."""
+    return len(self._calls)
+
+
+class _Call(object):
+  __slots__ = ('done', 'result', 'error')
+
+  def __init__(self):
+    self.done = threading.Event()
+    self.result = None
+    self.error = None
+
+
+def _json_loads(content):
+  return json.loads(content.decode('utf-8'))
+
+
+def json_decoders():
+  """
+  The installed JSON decoders as a list of ``(name, loads)`` pairs, fastest first.
+  Each ``loads`` parses a document given as UTF-8 bytes.
+  """
+  decoders = []
+
+  try:
+    import orjson
+    decoders.append(('orjson', orjson.loads))
+  except ImportError:
+    pass
+
+  try:
+    import ujson
+    decoders.append(('ujson', ujson.loads))
+  except ImportError:
+    pass
+
+  decoders.append(('json', _json_loads))
+  return decoders
+
+
+def parse_retry_after(value):
+  """Seconds to wait according to a Retry-After header (seconds or an HTTP date), or None."""
+  if value is None:
+    return None
+
+  try:
+    return max(0.0, float(value))
+  except ValueError:
+    date = parsedate_tz(value)
+    if date is None:
+      return None
+    return max(0.0, mktime_tz(date) - time.time())
+
+
 class cache(object):
+  """
+  Memoize a function in an LRUCache.
+
+  Use either as ``@cache`` or with options as ``@cache(maxsize=100, ttl=3600)``.
 
-  def __init__(self, fn):
+  Calls are keyed on their arguments bound to the signature of the function,
+  with defaults applied, so ``search('x')``, ``search('x', 10)`` and
+  ``search(query='x', results=10)`` share one entry.
+  """
+
+  def __new__(cls, fn=None, **options):
+    if fn is None:
+      return functools.partial(cls, **options)
+    return super(cache, cls).__new__(cls)
+
+  def __init__(self, fn, maxsize=DEFAULT_CACHE_SIZE, ttl=None):
     self.fn = fn
-    self._cache = {}
+    self._cache = LRUCache(maxsize, ttl)
+    self._in_flight = SingleFlight()
     functools.update_wrapper(self, fn)
+    self._signature = _signature(fn)
+    # reported to instrumentation hooks, e.g. "wikipedia.search"
+    self.name = '{0}.{1}'.format(fn.__module__.rpartition('.')[2], fn.__name__)
 
   def __call__(self, *args, **kwargs):
-    key = str(args) + str(kwargs)
-    if key in self._cache:
-      ret = self._cache[key]
+    key = self._key(args, kwargs)
+    store = self._store()
+    ret = store.get(key, _MISSING)
+    if ret is _MISSING:
+      instrumentation.cache_miss(self.name, key)
+      # concurrent misses for the same key wait for the first one
+      ret = self._in_flight.do((id(store), key), self._load, store, key, args, kwargs)
     else:
-      ret = self._cache[key] = self.fn(*args, **kwargs)
+      instrumentation.cache_hit(self.name, key)
+
+    return ret
 
+  def _load(self, store, key, args, kwargs):
+    ret = self.fn(*args, **kwargs)
+    store.set(key, ret)
     return ret
 
+  def _key(self, args, kwargs):
+    if self._signature is not None:
+      try:
+        bound = self._signature.bind(*args, **kwargs)
+      except TypeError:
+        # the call itself raises the error
+        pass
+      else:
+        bound.apply_defaults()
+        return tuple((name, _key_value(value)) for name, value in bound.arguments.items())
+
+    elif signature is None:
+      try:
+        arguments = getcallargs(self.fn, *args, **kwargs)
+      except TypeError:
+        pass
+      else:
+        return tuple(sorted((name, _key_value(value)) for name, value in arguments.items()))
+
+    return str(args) + str(kwargs)
+
+  def _store(self):
+    """The LRUCache holding the results, which subclasses may choose per call."""
+    return self._cache
+
   def clear_cache(self):
-    self._cache = {}
+    self._store().clear()
+
+  def configure(self, maxsize=DEFAULT_CACHE_SIZE, ttl=None):
+    """Change the maximum size and time to live of the cache."""
+    self._store().configure(maxsize, ttl)
+
+  def cache_info(self):
+    """Return a dict of hits, misses, evictions, size, maxsize and ttl."""
+    return self._store().info()
+
+
+def _signature(fn):
+  if signature is None:
+    return None
+
+  try:
+    return signature(fn)
+  except (TypeError, ValueError):
+    # builtins without signature information
+    return None
+
+
+def _key_value(value):
+  """
+  A hashable form of the argument `value` that is equal for equal arguments,
+  e.g. ``Decimal('40.5')`` and ``40.5``, or lists and tuples with the same items.
+  """
+  if isinstance(value, (float, Decimal)):
+    # equal numbers of different types must give equal keys; Decimal does not hash like float
+    return float(value)
+  if isinstance(value, dict):
+    return tuple(sorted((k, _key_value(v)) for k, v in value.items()))
+  if isinstance(value, (list, tuple)):
+    return tuple(_key_value(v) for v in value)
+
+  try:
+    hash(value)
+  except TypeError:
+    return repr(value)
+  return value
 
 
 # from http://stackoverflow.com/questions/3627793/best-output-type-and-encoding-practices-for-repr-functions
@@ -1,22 +1,94 @@
 from __future__ import unicode_literals
 
+import functools
+import hashlib
+import itertools
+import json
+import numbers
+import os
 import requests
+import threading
 import time
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+import zlib
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from datetime import timedelta
 from decimal import Decimal
 
 from .exceptions import (
   PageError, DisambiguationError, RedirectError, HTTPTimeoutError,
   WikipediaException, ODD_ERROR_MESSAGE)
-from .util import cache, stdout_encode, debug
+from . import instrumentation
+from .instrumentation import add_hook, remove_hook, metrics, reset_metrics
+from .storage import SQLiteCache
+from .transport import HTTPTransport, request_key
+from .util import (
+  cache as _cache, stdout_encode, debug, seconds, LRUCache, RateLimiter, RetryPolicy, SingleFlight, SpatialCache,
+  _clock, json_decoders, haversine,
+  DEFAULT_CACHE_SIZE)
 import re
 
+try:
+  from html.parser import HTMLParser
+except ImportError:
+  from HTMLParser import HTMLParser
+
+try:
+  from html.entities import name2codepoint
+except ImportError:
+  from htmlentitydefs import name2codepoint
+
+try:
+  unichr
+except NameError:
+  unichr = chr
+
 API_URL = 'http://en.wikipedia.org/w/api.php'
 RATE_LIMIT = False
 RATE_LIMIT_MIN_WAIT = None
-RATE_LIMIT_LAST_CALL = None
+RATE_LIMITER = None
+RETRY_POLICY = RetryPolicy()
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
 USER_AGENT = 'wikipedia (https://github.com/goldsmith/Wikipedia/)'
+BATCH_SIZE = 50
+POOL_SIZE = 10
+TIMEOUT = 30
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+TRANSPORT = None
+RESPONSE_CACHE = None
+JSON_DECODER = json_decoders()[0][1]
+
+
+def _accept_encoding():
+  '''
+  The encodings urllib3 can decode: brotli only when it is installed and the
+  urllib3 used by requests knows how to use it, which older versions do not.
+  '''
+  try:
+    from requests.packages.urllib3.util.request import ACCEPT_ENCODING
+  except ImportError:
+    return 'gzip, deflate'
+  return ACCEPT_ENCODING
+
+ACCEPT_ENCODING = _accept_encoding()
+
+# the WikipediaClient whose methods are running on each thread
+_LOCAL = threading.local()
+
+
+def _current_client():
+  return getattr(_LOCAL, 'client', None) or DEFAULT_CLIENT
+
+
+class cache(_cache):
+  '''
+  ``wikipedia.util.cache`` keeping separate results for every ``WikipediaClient``.
+  '''
+
+  def _store(self):
+    return _current_client()._cache_for(self)
 
 
 def set_lang(prefix):
@@ -29,12 +101,16 @@ def set_lang(prefix):
   .. note:: Make sure you search for page titles in the language that you have set.
   '''
   global API_URL
-  API_URL = 'http://' + prefix.lower() + '.wikipedia.org/w/api.php'
+  API_URL = _api_url(prefix)
 
   for cached_func in (search, suggest, summary):
     cached_func.clear_cache()
 
 
+def _api_url(prefix):
+  return 'http://' + prefix.lower() + '.wikipedia.org/w/api.php'
+
+
 def set_user_agent(user_agent_string):
   '''
   Set the User-Agent string to be used for all requests.
@@ -47,7 +123,7 @@ def set_user_agent(user_agent_string):
   USER_AGENT = user_agent_string
 
 
-def set_rate_limiting(rate_limit, min_wait=timedelta(milliseconds=50)):
+def set_rate_limiting(rate_limit, min_wait=timedelta(milliseconds=50), burst=1):
   '''
   Enable or disable rate limiting on requests to the Mediawiki servers.
   If rate limiting is not enabled, under some circumstances (depending on
@@ -64,19 +140,147 @@ def set_rate_limiting(rate_limit, min_wait=timedelta(milliseconds=50)):
   Keyword arguments:
 
   * min_wait - if rate limiting is enabled, `min_wait` is a timedelta describing the minimum time to wait before requests.
+         Fractions of a second are honoured, so timedelta(milliseconds=250) allows exactly 4 requests per second.
          Defaults to timedelta(milliseconds=50)
+  * burst - the number of requests that may be made back to back after a quiet period,
+         before `min_wait` applies again. Defaults to 1
+
+  The limit is shared by all threads, and by ``wikipedia.aio``.
   '''
   global RATE_LIMIT
   global RATE_LIMIT_MIN_WAIT
-  global RATE_LIMIT_LAST_CALL
+  global RATE_LIMITER
 
   RATE_LIMIT = rate_limit
   if not rate_limit:
     RATE_LIMIT_MIN_WAIT = None
+    RATE_LIMITER = None
   else:
     RATE_LIMIT_MIN_WAIT = min_wait
+    RATE_LIMITER = _rate_limiter(min_wait, burst)
+
+
+def _rate_limiter(min_wait, burst):
+  return RateLimiter(1 / seconds(min_wait), burst=burst) if seconds(min_wait) > 0 else None
+
+
+def set_retry_policy(max_retries=3, backoff=timedelta(milliseconds=500), max_backoff=timedelta(seconds=30),
+                     max_time=timedelta(seconds=60), maxlag=None):
+  '''
+  Configure how requests that fail for transient reasons are retried.
+
+  Connection errors and timeouts, HTTP 429 and 5xx responses, and API errors
+  caused by server load (maxlag, "HTTP request timed out.", "Pool queue is full")
+  are retried with exponential backoff and random jitter. A Retry-After header
+  sent by the server takes precedence over the computed wait.
+
+  Keyword arguments:
+
+  * max_retries - the maximum number of retries of one request; 0 disables retrying. Defaults to 3
+  * backoff - a timedelta describing the wait before the first retry, doubled for each further retry
+         (the actual wait is picked at random up to that value). Defaults to timedelta(milliseconds=500)
+  * max_backoff - a timedelta describing the longest wait before one retry. Defaults to timedelta(seconds=30)
+  * max_time - a timedelta describing the longest total time spent on one request including retries.
+         Defaults to timedelta(seconds=60)
+  * maxlag - if set, the `maxlag <https://www.mediawiki.org/wiki/Manual:Maxlag_parameter>`_ parameter,
+         in seconds, sent with every request. Recommended for long running batch jobs
+  '''
+  global RETRY_POLICY
+  RETRY_POLICY = RetryPolicy(max_retries, backoff, max_backoff, max_time, maxlag)
+
+
+def set_session_options(pool_size=10, timeout=30):
+  '''
+  Configure the persistent HTTP session used for all requests.
+
+  Requests to the Mediawiki servers share a single keep-alive session, so
+  consecutive calls reuse warm connections instead of paying for a new TCP
+  and TLS handshake each time. Changing the options closes the current
+  session; a new one is created on the next request.
+
+  Keyword arguments:
+
+  * pool_size - the maximum number of connections kept open per host. Raise this when
+         making requests from many threads at once. Defaults to 10
+  * timeout - number of seconds to wait for the server before giving up, or None
+         to wait forever. Defaults to 30
+  '''
+  global POOL_SIZE
+  global TIMEOUT
+  global _SESSION
+
+  with _SESSION_LOCK:
+    POOL_SIZE = pool_size
+    TIMEOUT = timeout
+
+    if _SESSION is not None:
+      _SESSION.close()
+    _SESSION = None
+
+
+def set_json_decoder(decoder=None):
+  '''
+  Set the function used to parse API responses.
+
+  By default the fastest installed of `orjson <https://pypi.org/project/orjson/>`_,
+  `ujson <https://pypi.org/project/ujson/>`_ and the standard ``json`` module is used,
+  so installing one of the former speeds up large responses such as page content
+  and long link lists.
+
+  Arguments:
+
+  * decoder - a function that parses a JSON document given as UTF-8 bytes,
+         or None to go back to the default
+  '''
+  global JSON_DECODER
+  JSON_DECODER = json_decoders()[0][1] if decoder is None else decoder
+
+
+def set_transport(transport):
+  '''
+  Set the transport that sends all requests.
+
+  A transport is an object with a method ``get(url, params, headers, timeout)``
+  returning a response with ``status_code``, ``headers`` and ``content`` (the
+  body as bytes), and an ``errors`` attribute listing the exception types to retry.
+  ``wikipedia.transport`` provides ``HTTPTransport``, the in-memory ``FakeTransport``
+  and ``RecordReplayTransport``, which saves real traffic to a file and serves it back.
+
+  Arguments:
+
+  * transport - the transport to use, or None to go back to the default ``HTTPTransport``
+  '''
+  global TRANSPORT
+  TRANSPORT = transport
+
+
+def set_response_cache(path, max_entries=100000, expire=timedelta(days=1)):
+  '''
+  Keep API responses in a persistent on-disk cache, so that they are not
+  downloaded again after the process restarts.
 
-  RATE_LIMIT_LAST_CALL = None
+  Responses are keyed on the API URL and the request parameters. Error
+  responses and random pages are never cached.
+
+  Arguments:
+
+  * path - filename of the SQLite database to store responses in, or None to disable the cache
+
+  Keyword arguments:
+
+  * max_entries - the maximum number of responses kept; the oldest are removed first.
+         Defaults to 100000
+  * expire - a timedelta describing how long a response is reused. Defaults to timedelta(days=1)
+  '''
+  global RESPONSE_CACHE
+
+  if RESPONSE_CACHE is not None:
+    RESPONSE_CACHE.close()
+
+  if path is None:
+    RESPONSE_CACHE = None
+  else:
+    RESPONSE_CACHE = SQLiteCache(path, max_entries=max_entries, expire=expire)
 
 
 @cache
@@ -90,6 +294,12 @@ def search(query, results=10, suggestion=False):
   * suggestion - if True, return results and suggestion (if any) in a tuple
   '''
 
+  raw_results = _wiki_request(_search_params(query, results, suggestion))
+
+  return _search_results(raw_results, query, suggestion)
+
+
+def _search_params(query, results, suggestion):
   search_params = {
     'list': 'search',
     'srprop': '',
@@ -100,13 +310,11 @@ def search(query, results=10, suggestion=False):
   if suggestion:
     search_params['srinfo'] = 'suggestion'
 
-  raw_results = _wiki_request(search_params)
+  return search_params
 
-  if 'error' in raw_results:
-    if raw_results['error']['info'] in ('HTTP request timed out.', 'Pool queue is full'):
-      raise HTTPTimeoutError(query)
-    else:
-      raise WikipediaException(raw_results['error']['info'])
+
+def _search_results(raw_results, query, suggestion):
+  _raise_for_error(raw_results, query)
 
   search_results = (d['title'] for d in raw_results['query']['search'])
 
@@ -135,8 +343,107 @@ def geosearch(latitude, longitude, title=None, results=10, radius=1000):
   * title - The title of an article to search for
   * results - the maximum number of results returned
   * radius - Search radius in meters. The value must be between 10 and 10000
+
+  Searches without a `title` are answered without a request when an earlier search
+  covered their whole circle, by filtering its results by distance.
+  '''
+  if not title:
+    return _geosearch_near(latitude, longitude, results, radius, results, radius)
+
+  raw_results = _wiki_request(_geosearch_params(latitude, longitude, title, results, radius))
+
+  return _geosearch_results(raw_results, latitude, longitude)
+
+
+def geosearch_many(points, results=10, radius=1000, prefetch_radius=10000, prefetch_results=500):
+  '''
+  Do a geo search around each of many `points`, such as GPS tracks.
+
+  Returns a generator of ``((latitude, longitude), titles)`` tuples in the order
+  of `points`, with the exception in place of the titles if a search failed.
+
+  Searches that miss the spatial cache request up to `prefetch_results` pages within
+  `prefetch_radius`, so that the following points nearby are answered from the
+  cache. Points are taken 1000 at a time and searched in the order of their
+  location, so long or lazy iterables of points are fine.
+
+  Arguments:
+
+  * points - an iterable of ``(latitude, longitude)`` pairs (floats or decimal.Decimal)
+
+  Keyword arguments:
+
+  * results - the maximum number of titles returned per point
+  * radius - search radius in meters around each point, between 10 and 10000
+  * prefetch_radius - search radius in meters of the requests made. Defaults to 10000, the maximum
+  * prefetch_results - the number of results of the requests made. Defaults to 500, the maximum
+  '''
+  return _geosearch_many(
+    _current_client(), iter(points), results, radius, max(radius, prefetch_radius), max(results, prefetch_results))
+
+
+def _geosearch_many(client, points, results, radius, fetch_radius, fetch_results):
+  while True:
+    chunk = list(itertools.islice(points, _GEOSEARCH_CHUNK_SIZE))
+    if not chunk:
+      break
+
+    found = [None] * len(chunk)
+    # neighbours one after the other, so that they share the prefetched circles
+    for i in sorted(range(len(chunk)), key=lambda i: _GEO_CACHE.tile(*map(float, chunk[i]))):
+      latitude, longitude = chunk[i]
+      try:
+        with client._activated():
+          found[i] = _geosearch_near(latitude, longitude, results, radius, fetch_results, fetch_radius)
+      except Exception as e:
+        found[i] = e
+
+    for point, titles in zip(chunk, found):
+      yield point, titles
+
+
+_GEOSEARCH_CHUNK_SIZE = 1000
+
+# places found by earlier geo searches, by API URL: up to 102400 places, about
+# 200 circles of geosearch_many with the default 500 prefetched results
+_GEO_CACHE = SpatialCache(DEFAULT_CACHE_SIZE * 100)
+
+
+def _geosearch_near(latitude, longitude, results, radius, fetch_results, fetch_radius):
   '''
+  Titles of the `results` pages nearest to a point within `radius`, from the spatial
+  cache or from a search for `fetch_results` pages within `fetch_radius`.
+  '''
+  api_url = _current_client().api_url
+  key = (api_url, float(latitude), float(longitude), radius)
+  titles = _GEO_CACHE.search(api_url, latitude, longitude, radius, results)
+  if titles is not None:
+    instrumentation.cache_hit('geosearch_tiles', key)
+    return titles
+  instrumentation.cache_miss('geosearch_tiles', key)
+
+  raw_results = _wiki_request(_geosearch_params(latitude, longitude, None, fetch_results, fetch_radius))
+  titles = _geosearch_results(raw_results, latitude, longitude)
+
+  places = [(place['lat'], place['lon'], place['title']) for place in raw_results['query']['geosearch']]
+  if len(places) < fetch_results:
+    covered = fetch_radius
+  else:
+    # cut off at the limit: only the circle up to the farthest result is complete
+    covered = max(haversine(latitude, longitude, lat, lon) for lat, lon, title in places)
+  _GEO_CACHE.add(api_url, latitude, longitude, covered, places)
+
+  if (fetch_results, fetch_radius) == (results, radius):
+    return titles
 
+  titles = _GEO_CACHE.search(api_url, latitude, longitude, radius, results)
+  if titles is None:
+    # the wider search was cut off within `radius`
+    return _geosearch_near(latitude, longitude, results, radius, results, radius)
+  return titles
+
+
+def _geosearch_params(latitude, longitude, title, results, radius):
   search_params = {
     'list': 'geosearch',
     'gsradius': radius,
@@ -146,13 +453,11 @@ def geosearch(latitude, longitude, title=None, results=10, radius=1000):
   if title:
     search_params['titles'] = title
 
-  raw_results = _wiki_request(search_params)
+  return search_params
 
-  if 'error' in raw_results:
-    if raw_results['error']['info'] in ('HTTP request timed out.', 'Pool queue is full'):
-      raise HTTPTimeoutError('{0}|{1}'.format(latitude, longitude))
-    else:
-      raise WikipediaException(raw_results['error']['info'])
+
+def _geosearch_results(raw_results, latitude, longitude):
+  _raise_for_error(raw_results, '{0}|{1}'.format(latitude, longitude))
 
   search_pages = raw_results['query'].get('pages', None)
   if search_pages:
@@ -170,6 +475,12 @@ def suggest(query):
   Returns a string or None if no suggestion was found.
   '''
 
+  raw_result = _wiki_request(_suggest_params(query))
+
+  return _suggest_result(raw_result)
+
+
+def _suggest_params(query):
   search_params = {
     'list': 'search',
     'srinfo': 'suggestion',
@@ -177,8 +488,10 @@ def suggest(query):
   }
   search_params['srsearch'] = query
 
-  raw_result = _wiki_request(search_params)
+  return search_params
+
 
+def _suggest_result(raw_result):
   if raw_result['query'].get('searchinfo'):
     return raw_result['query']['searchinfo']['suggestion']
 
@@ -202,7 +515,8 @@ def random(pages=1):
     'rnlimit': pages,
   }
 
-  request = _wiki_request(query_params)
+  # concurrent calls must not share one set of random pages
+  request = _wiki_request(query_params, coalesce=False)
   titles = [page['title'] for page in request['query']['random']]
 
   if len(titles) == 1:
@@ -218,6 +532,9 @@ def summary(title, sentences=0, chars=0, auto_suggest=True, redirect=True):
 
   .. note:: This is a convenience wrapper - auto_suggest and redirect are enabled by default
 
+  The title is resolved and the summary fetched in a single request
+  (two if the search suggests a different spelling).
+
   Keyword arguments:
 
   * sentences - if set, return the first `sentences` sentences (can be no greater than 10).
@@ -226,18 +543,48 @@ def summary(title, sentences=0, chars=0, auto_suggest=True, redirect=True):
   * redirect - allow redirection without raising RedirectError
   '''
 
-  # use auto_suggest and redirect to get the correct article
-  # also, use page's error checking to raise DisambiguationError if necessary
-  page_info = page(title, auto_suggest=auto_suggest, redirect=redirect)
-  title = page_info.title
-  pageid = page_info.pageid
+  # resolve the title, follow redirects, check for disambiguation pages and
+  # get the extract in a single request, with the same rules as page()
+  query = _wiki_request(_summary_params(title, sentences, chars, auto_suggest)).get('query', {})
 
+  if auto_suggest:
+    title, suggested = _summary_title(query, title)
+    if suggested:
+      # the extract is of the top search result, but page() prefers the suggestion
+      query = _wiki_request(_summary_params(title, sentences, chars)).get('query', {})
+
+  page_info = _summary_page(query, title, redirect)
+
+  if 'pageprops' in page_info:
+    title = page_info['title'] if 'redirects' in query else title
+    raise DisambiguationError(title, _disambiguation_options(str(page_info['pageid']), {'titles': title}))
+
+  return page_info['extract']
+
+
+def _summary_params(title, sentences, chars, auto_suggest=False):
   query_params = {
-    'prop': 'extracts',
+    'prop': 'extracts|pageprops',
     'explaintext': '',
-    'titles': title
+    'ppprop': 'disambiguation',
+    'redirects': '',
   }
 
+  if auto_suggest:
+    # list=search returns the suggestion, generator=search the top result with its extract
+    query_params.update({
+      'list': 'search',
+      'srsearch': title,
+      'srinfo': 'suggestion',
+      'srprop': '',
+      'srlimit': 1,
+      'generator': 'search',
+      'gsrsearch': title,
+      'gsrlimit': 1,
+    })
+  else:
+    query_params['titles'] = title
+
   if sentences:
     query_params['exsentences'] = sentences
   elif chars:
@@ -245,13 +592,40 @@ def summary(title, sentences=0, chars=0, auto_suggest=True, redirect=True):
   else:
     query_params['exintro'] = ''
 
-  request = _wiki_request(query_params)
-  summary = request['query']['pages'][pageid]['extract']
+  return query_params
+
+
+def _summary_title(query, title):
+  '''
+  Pick the title page() would for `title` from the search part of a summary query.
+  Returns the title and whether it is the search suggestion.
+  '''
+  suggestion = query.get('searchinfo', {}).get('suggestion')
+  if suggestion:
+    return suggestion, True
 
-  return summary
+  try:
+    return query['search'][0]['title'], False
+  except (KeyError, IndexError):
+    # if there is no suggestion or search results, the page doesn't exist
+    raise PageError(title)
 
 
-def page(title=None, pageid=None, auto_suggest=True, redirect=True, preload=False):
+def _summary_page(query, title, redirect):
+  '''
+  The page of a summary query, raising the errors page() would for `title`.
+  '''
+  if 'redirects' in query and not redirect:
+    raise RedirectError(title)
+
+  pages = list(query.get('pages', {}).values())
+  if not pages or 'missing' in pages[0] or 'invalid' in pages[0]:
+    raise PageError(title)
+
+  return pages[0]
+
+
+def page(title=None, pageid=None, auto_suggest=True, redirect=True, preload=False, compact=False):
   '''
   Get a WikipediaPage object for the page with title `title` or the pageid
   `pageid` (mutually exclusive).
@@ -262,23 +636,825 @@ def page(title=None, pageid=None, auto_suggest=True, redirect=True, preload=Fals
   * pageid - the numeric pageid of the page to load
   * auto_suggest - let Wikipedia find a valid page title for the query
   * redirect - allow redirection without raising RedirectError
-  * preload - load content, summary, images, references, and links during initialization
+  * preload - load content, summary, images, references, links and sections during initialization,
+         or only the properties in `preload` if it is a list of property names (see ``WikipediaPage.prefetch``)
+  * compact - return a ``CompactWikipediaPage``, which keeps its text compressed
+  '''
+  page_class = CompactWikipediaPage if compact else WikipediaPage
+
+  if title is not None:
+    if auto_suggest:
+      results, suggestion = search(title, results=1, suggestion=True)
+      try:
+        title = suggestion or results[0]
+      except IndexError:
+        # if there is no suggestion or search results, the page doesn't exist
+        raise PageError(title)
+    return page_class(title, redirect=redirect, preload=preload)
+  elif pageid is not None:
+    return page_class(pageid=pageid, preload=preload)
+  else:
+    raise ValueError("Either a title or a pageid must be specified")
+
+
+def pages(titles_or_pageids, redirect=True, preload=False, compact=False):
+  '''
+  Get WikipediaPage objects for many pages at once, packing up to
+  ``BATCH_SIZE`` (50) titles or pageids into each request.
+
+  Integers in `titles_or_pageids` are treated as pageids, anything else as a title.
+
+  Returns a list in the same order as `titles_or_pageids`. Each item is either a
+  WikipediaPage or the exception (PageError, DisambiguationError or RedirectError)
+  that ``page`` would have raised for that title, so one bad title does not
+  abort the rest of the batch.
+
+  .. note:: Titles are not auto-suggested, since that would need one search request per title.
+
+  Keyword arguments:
+
+  * redirect - allow redirection without raising RedirectError
+  * preload - load content, summary, images, references, links and sections for every page,
+         or only the properties in `preload` if it is a list of property names
+  * compact - return ``CompactWikipediaPage`` objects, which keep their text compressed
   '''
+  page_class = CompactWikipediaPage if compact else WikipediaPage
+  titles_or_pageids = list(titles_or_pageids)
+  results = [None] * len(titles_or_pageids)
+
+  titles = []
+  for i, title in enumerate(titles_or_pageids):
+    if _is_pageid(title):
+      continue
+
+    page_info = _cached_title(title, redirect)
+    if page_info is not None:
+      results[i] = page_class._from_info(page_info, original_title=title, preload=preload)
+    else:
+      titles.append((i, title))
+
+  pageids = [(i, str(p)) for i, p in enumerate(titles_or_pageids) if _is_pageid(p)]
+
+  for start in range(0, len(titles), BATCH_SIZE):
+    batch = titles[start:start + BATCH_SIZE]
+    query = _page_info_query({'titles': '|'.join(_unique(t for i, t in batch))})
+
+    normalized = dict((n['from'], n['to']) for n in query.get('normalized', []))
+    redirects = dict((r['from'], r['to']) for r in query.get('redirects', []))
+    by_title = dict((page['title'], page) for page in query['pages'].values())
+
+    for i, title in batch:
+      from_title = normalized.get(title, title)
+      redirected = from_title in redirects
+      if redirected:
+        if not redirect:
+          results[i] = RedirectError(title)
+          continue
+        # like page(), a redirected page is reported under the title it redirects to
+        title = redirects[from_title]
+
+      page_info = by_title.get(normalized.get(title, title))
+      results[i] = _page_or_error(page_info, {'titles': title}, titles_or_pageids[i], preload, page_class)
+      if isinstance(results[i], WikipediaPage):
+        _cache_title(titles_or_pageids[i], page_info, redirected)
+
+  for start in range(0, len(pageids), BATCH_SIZE):
+    batch = pageids[start:start + BATCH_SIZE]
+    query = _page_info_query({'pageids': '|'.join(_unique(p for i, p in batch))})
+
+    for i, pageid in batch:
+      page_info = query['pages'].get(pageid)
+      results[i] = _page_or_error(page_info, {'pageids': pageid}, '', preload, page_class)
+
+  return results
+
+
+def coordinates(titles_or_pageids):
+  '''
+  Get the coordinates of many pages at once, packing up to ``BATCH_SIZE`` (50)
+  titles or pageids into each request.
+
+  Integers in `titles_or_pageids` are treated as pageids and WikipediaPage objects
+  as their pageid; anything else is a title. Redirects are followed.
+
+  Returns a dict mapping each title and pageid, and the title of each
+  WikipediaPage, to a tuple of Decimals in the form of (lat, lon), or to None if
+  the page has no coordinates or does not exist. The ``coordinates`` property of
+  the given WikipediaPage objects is filled in as well.
+  '''
+  titles_or_pageids = list(titles_or_pageids)
+  titles = []
+  pageids = []
+  loaded_pages = []
+  for item in titles_or_pageids:
+    if isinstance(item, WikipediaPage):
+      loaded_pages.append(item)
+      pageids.append(str(item.pageid))
+    elif _is_pageid(item):
+      pageids.append(str(item))
+    else:
+      titles.append(item)
+
+  results = {}
+
+  titles = _unique(titles)
+  for start in range(0, len(titles), BATCH_SIZE):
+    batch = titles[start:start + BATCH_SIZE]
+    by_title, aliases = _coordinates_query({'titles': '|'.join(batch)})
+    for title in batch:
+      normalized = aliases.get(title, title)
+      results[title] = by_title.get(aliases.get(normalized, normalized))
+
+  by_pageid = {}
+  pageids = _unique(pageids)
+  for start in range(0, len(pageids), BATCH_SIZE):
+    batch = pageids[start:start + BATCH_SIZE]
+    for pageid, found in _coordinates_query({'pageids': '|'.join(batch)}, by='pageid')[0].items():
+      by_pageid[pageid] = found
+
+  for item in titles_or_pageids:
+    if isinstance(item, WikipediaPage):
+      item._coordinates = results[item.title] = by_pageid.get(str(item.pageid))
+    elif _is_pageid(item):
+      results[item] = by_pageid.get(str(item))
+
+  return results
+
+
+def _is_pageid(item):
+  '''
+  Whether `item` of ``pages`` or ``coordinates`` is a pageid: any integer (including
+  a Python 2 long), but not a bool.
+  '''
+  return isinstance(item, numbers.Integral) and not isinstance(item, bool)
+
+
+def _coordinates_query(title_param, by='title'):
+  '''
+  Request the coordinates of the pages in `title_param`, following continuations.
+
+  Returns a dict mapping the title (or the pageid, if `by` is ``pageid``) of each
+  page with coordinates to them, and a dict mapping titles to their normalized
+  form and normalized titles to the titles they redirect to.
+  '''
+  query_params = {
+    'prop': 'coordinates',
+    'colimit': 'max',
+    'redirects': '',
+  }
+  query_params.update(title_param)
+
+  found = {}
+  aliases = {}
+  last_continue = {}
+
+  while True:
+    params = query_params.copy()
+    params.update(last_continue)
+    request = _wiki_request(params)
+
+    query = request.get('query')
+    if query is None:
+      break
+
+    for alias in query.get('normalized', []) + query.get('redirects', []):
+      aliases[alias['from']] = alias['to']
+
+    for pageid, page in query['pages'].items():
+      key = page['title'] if by == 'title' else pageid
+      if 'coordinates' in page and found.get(key) is None:
+        found[key] = _decimal_coordinates(page['coordinates'])
+
+    if 'continue' not in request:
+      break
+
+    last_continue = request['continue']
+
+  return found, aliases
+
+
+def _decimal_coordinates(coordinates):
+  return (Decimal(coordinates[0]['lat']), Decimal(coordinates[0]['lon']))
+
+
+def _page_info_query(title_param):
+  '''
+  Request basic page information for `title_param` and return the ``query`` part of the response.
+  '''
+  return _wiki_request(_page_info_params(title_param))['query']
+
+
+def _page_info_params(title_param):
+  query_params = {
+    'prop': 'info|pageprops',
+    'inprop': 'url',
+    'ppprop': 'disambiguation',
+    'redirects': '',
+  }
+  query_params.update(title_param)
+
+  return query_params
+
+
+def _page_or_error(page_info, title_param, original_title, preload, page_class=None):
+  '''
+  Turn one page of a batched info query into a `page_class` (by default WikipediaPage),
+  or into the exception WikipediaPage would have raised for it.
+  '''
+  title = title_param.get('titles')
+
+  if page_info is None or 'missing' in page_info or 'invalid' in page_info:
+    if title is not None:
+      return PageError(title)
+    return PageError(pageid=title_param['pageids'])
+
+  if 'pageprops' in page_info:
+    options = _disambiguation_options(str(page_info['pageid']), title_param, page_info.get('lastrevid'))
+    return DisambiguationError(title or page_info['title'], options)
+
+  return (page_class or WikipediaPage)._from_info(page_info, original_title=original_title, preload=preload)
+
+
+# canonical page info of the titles looked up so far, including aliases
+# (redirects and normalized titles), by (API URL, title)
+_TITLE_CACHE = LRUCache(DEFAULT_CACHE_SIZE * 10, ttl=timedelta(hours=1))
+
+
+def _cached_title(title, redirect):
+  '''
+  The info of the page a previous lookup of `title` resolved to, or None if
+  it has to be looked up. Aliases that redirect are only served if `redirect`.
+  '''
+  key = (_current_client().api_url, title)
+  page_info = _TITLE_CACHE.get(key)
+  if page_info is None or (page_info['redirected'] and not redirect):
+    instrumentation.cache_miss('titles', key)
+    return None
+
+  instrumentation.cache_hit('titles', key)
+  return page_info
+
+
+def _cache_title(title, page_info, redirected):
+  '''
+  Remember that `title` resolves to the existing, non-disambiguation page `page_info`.
+  '''
+  entry = {
+    'pageid': str(page_info['pageid']),
+    'title': page_info['title'],
+    'fullurl': page_info['fullurl'],
+  }
+  api_url = _current_client().api_url
+  _TITLE_CACHE.set((api_url, title), dict(entry, redirected=redirected))
+  _TITLE_CACHE.set((api_url, page_info['title']), dict(entry, redirected=False))
+
+
+def _resolved_page(query, title, pageid, redirect):
+  '''
+  Find the page in the ``query`` part of an info response for `title` (or `pageid`).
+
+  Redirects are resolved by the API, so the page of a redirect is already its
+  target; it is returned if `redirect`, otherwise RedirectError is raised.
+  Raises PageError if the page does not exist.
+
+  Returns a ``(pageid, page info, redirected)`` tuple.
+  '''
+  key = list(query['pages'].keys())[0]
+  page = query['pages'][key]
+
+  # missing is present if the page is missing
+  if 'missing' in page:
+    if title is not None:
+      raise PageError(title)
+    else:
+      raise PageError(pageid=pageid)
+
+  # same thing for redirect, except it shows up in query instead of page for
+  # whatever silly reason
+  redirected = 'redirects' in query
+  if redirected:
+    if not redirect:
+      raise RedirectError(title if title is not None else page['title'])
+
+    redirects = query['redirects'][0]
+
+    if 'normalized' in query:
+      normalized = query['normalized'][0]
+      assert normalized['from'] == title, ODD_ERROR_MESSAGE
+
+      from_title = normalized['to']
+
+    else:
+      from_title = title
+
+    assert redirects['from'] == from_title, ODD_ERROR_MESSAGE
+
+  return key, page, redirected
+
+
+def _unique(items):
+  '''
+  List `items` without duplicates, keeping their order.
+  '''
+  seen = set()
+  return [item for item in items if not (item in seen or seen.add(item))]
+
+
+# options of disambiguation pages by (API URL, pageid, revision id)
+_DISAMBIGUATION_CACHE = LRUCache(DEFAULT_CACHE_SIZE)
+
+
+def _disambiguation_options(pageid, title_param, revid=None):
+  '''
+  Fetch the rendered disambiguation page and list the titles it may refer to.
+
+  If the revision id `revid` is known, the options of an unchanged page are reused.
+  '''
+  options = _cached_disambiguation_options(pageid, revid)
+  if options is None:
+    options = _disambiguation_options_from(_wiki_request(_disambiguation_params(title_param)), pageid)
+
+  return options
+
+
+def _cached_disambiguation_options(pageid, revid):
+  if revid is None:
+    return None
+
+  options = _DISAMBIGUATION_CACHE.get((_current_client().api_url, pageid, revid))
+  return None if options is None else list(options)
+
+
+def _disambiguation_options_from(request, pageid):
+  revision = request['query']['pages'][pageid]['revisions'][0]
+  options = _parse_disambiguation(revision['*'])
+  if 'revid' in revision:
+    _DISAMBIGUATION_CACHE.set((_current_client().api_url, pageid, revision['revid']), tuple(options))
+
+  return options
+
+
+def _disambiguation_params(title_param):
+  query_params = {
+    'prop': 'revisions',
+    'rvprop': 'ids|content',
+    'rvparse': '',
+    'rvlimit': 1
+  }
+  query_params.update(title_param)
+
+  return query_params
+
+
+def _parse_disambiguation(html):
+  '''
+  List the text of the first link in every list item of `html`, except for
+  the items of the table of contents.
+  '''
+  parser = _DisambiguationParser()
+  parser.feed(html)
+  parser.close()
+
+  return [option for option in parser.options if option is not None]
+
+
+class _DisambiguationParser(HTMLParser):
+  '''
+  Streaming equivalent of ``[li.a.get_text() for li in soup.find_all('li') if li.a]``
+  (minus ``tocsection`` items) for a BeautifulSoup tree, without building the tree.
+
+  Tags are nested and closed the way BeautifulSoup's ``html.parser`` builder does:
+  an end tag closes every element opened after its start tag, and a stray end
+  tag is ignored.
+  '''
+
+  VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound',
+    'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'))
+
+  def __init__(self):
+    try:
+      HTMLParser.__init__(self, convert_charrefs=True)
+    except TypeError:
+      # Python 2 and 3.3 report references separately, see handle_entityref
+      HTMLParser.__init__(self)
+    # one entry per list item in document order: None until its first link is found
+    self.options = []
+    # open elements: (tag, indices of the options waiting for a link, or being captured by this link)
+    self._open = []
+    self._texts = {}
+
+  def handle_starttag(self, tag, attrs):
+    if tag in self.VOID_ELEMENTS:
+      return
+
+    slots = ()
+    if tag == 'li':
+      css_class = ''.join((dict(attrs).get('class') or '').split())
+      if 'tocsection' not in css_class:
+        self.options.append(None)
+        slots = (len(self.options) - 1,)
+
+    elif tag == 'a':
+      # the first link of every open list item that has none yet
+      waiting = [
+        slot for open_tag, open_slots in self._open if open_tag == 'li'
+        for slot in open_slots if slot not in self._texts]
+      for slot in waiting:
+        self._texts[slot] = []
+      slots = tuple(waiting)
+
+    self._open.append((tag, slots))
+
+  def handle_startendtag(self, tag, attrs):
+    self.handle_starttag(tag, attrs)
+    if tag not in self.VOID_ELEMENTS:
+      self.handle_endtag(tag)
+
+  def handle_endtag(self, tag):
+    if not any(open_tag == tag for open_tag, slots in self._open):
+      return
+
+    while True:
+      open_tag, slots = self._open.pop()
+      if open_tag == 'a':
+        for slot in slots:
+          self.options[slot] = ''.join(self._texts[slot])
+      if open_tag == tag:
+        break
+
+  def handle_data(self, data):
+    for open_tag, slots in self._open:
+      if open_tag == 'a':
+        for slot in slots:
+          self._texts[slot].append(data)
+
+  def handle_entityref(self, name):
+    if name in name2codepoint:
+      self.handle_data(unichr(name2codepoint[name]))
+    else:
+      self.handle_data('&' + name)
+
+  def handle_charref(self, name):
+    try:
+      codepoint = int(name[1:], 16) if name[0] in 'xX' else int(name)
+      self.handle_data(unichr(codepoint))
+    except (ValueError, OverflowError):
+      self.handle_data('&#' + name)
+
+  def close(self):
+    HTMLParser.close(self)
+    # links left open at the end of the document
+    while self._open:
+      self.handle_endtag(self._open[-1][0])
+
+
+def map_summaries(titles, workers=8, **kwargs):
+  '''
+  Get the summaries of many `titles` concurrently, on a pool of `workers` threads.
+
+  Returns a generator of ``(title, summary)`` tuples in the order the lookups
+  complete. If a lookup raised an exception (such as PageError or
+  DisambiguationError), the exception takes the place of the summary, so one
+  bad title does not abort the rest of the batch.
+
+  Requests still respect ``set_rate_limiting``, which is shared by all threads.
+
+  Keyword arguments:
+
+  * workers - the number of threads making requests. Defaults to 8
+
+  Any other keyword arguments (sentences, chars, auto_suggest, redirect) are passed to ``summary``.
+  '''
+  return _map_concurrently(lambda title: summary(title, **kwargs), titles, workers)
+
+
+def map_pages(titles, props=(), workers=8, **kwargs):
+  '''
+  Get WikipediaPage objects for many `titles` concurrently, on a pool of `workers` threads,
+  loading the properties named in `props` (for example ``['content', 'links']``) on the same thread.
+
+  Returns a generator of ``(title, page)`` tuples in the order the lookups
+  complete, with the same error handling as ``map_summaries``.
+
+  Keyword arguments:
+
+  * props - names of the WikipediaPage properties to load for every page
+  * workers - the number of threads making requests. Defaults to 8
+
+  Any other keyword arguments (auto_suggest, redirect, preload) are passed to ``page``.
+  '''
+  def load(title):
+    wiki_page = page(title, **kwargs)
+    for prop in props:
+      getattr(wiki_page, prop)
+    return wiki_page
+
+  return _map_concurrently(load, titles, workers)
+
+
+def _map_concurrently(fn, items, workers):
+  '''
+  Yield ``(item, fn(item))`` for each of `items` as soon as it is ready, with
+  exceptions in place of results. At most ``2 * workers`` items are queued at
+  once, so `items` may be a long or lazy iterable.
+
+  `fn` runs with the client of the calling thread, which is looked up now rather
+  than when the generator is first consumed.
+  '''
+  return _mapped_concurrently(_current_client(), fn, iter(items), workers)
+
+
+def _mapped_concurrently(client, fn, items, workers):
+  from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+  with ThreadPoolExecutor(max_workers=workers) as executor:
+    pending = {}
+    while True:
+      for item in items:
+        pending[executor.submit(client._call, fn, item)] = item
+        if len(pending) >= 2 * workers:
+          break
+
+      if not pending:
+        break
+
+      done, _ = wait(pending, return_when=FIRST_COMPLETED)
+      for future in done:
+        item = pending.pop(future)
+        try:
+          yield item, future.result()
+        except Exception as e:
+          yield item, e
+
+
+def export(titles, path, props=('summary',), redirect=True, workers=8, resume=True):
+  '''
+  Write pages to the JSON Lines file `path` as they are fetched, one line per title.
+
+  Titles are looked up ``BATCH_SIZE`` at a time with ``pages``. The ``summary``
+  and ``links`` of each batch are loaded for many pages per request, the other
+  properties on `workers` threads with ``WikipediaPage.prefetch``, and the batch
+  is written in the order of `titles` and dropped, so memory use does not grow
+  with the number of titles.
+
+  Each line holds the requested ``query`` and the ``title``, ``pageid`` and ``url``
+  of the page with the properties in `props`, or, for titles that do not lead to
+  a page, ``query``, ``error`` (PageError, DisambiguationError or RedirectError),
+  ``message`` and, for disambiguation pages, ``options``. Other errors, such as
+  failed requests, stop the export.
+
+  After every batch the progress is saved to ``path + '.checkpoint'``, with a hash
+  of the titles exported so far. Calling ``export`` again with the same `titles`
+  continues after the last saved batch, without fetching the exported pages again;
+  with other titles it raises ValueError. The checkpoint is removed once all titles
+  are exported, so calling ``export`` after that starts over.
+
+  Returns the number of titles exported by this call.
+
+  Arguments:
+
+  * titles - an iterable of titles (or integer pageids), which may be lazy
+  * path - the file to write to
+
+  Keyword arguments:
+
+  * props - names of the properties to export: content, summary, images, references,
+         links, categories, sections, coordinates, revision_id and parent_id.
+         Defaults to ``['summary']``
+  * redirect - follow redirects instead of recording a RedirectError
+  * workers - the number of threads loading properties. Defaults to 8
+  * resume - continue from the checkpoint if there is one, instead of starting over
+  '''
+  props = list(props)
+  unknown = [prop for prop in props if prop not in _EXPORT_PROPERTIES]
+  if unknown:
+    raise ValueError('Cannot export {0}, expected some of {1}'.format(
+      ', '.join(unknown), ', '.join(_EXPORT_PROPERTIES)))
+
+  checkpoint_path = path + '.checkpoint'
+  checkpoint = None
+  if resume and os.path.exists(checkpoint_path) and os.path.exists(path):
+    with open(checkpoint_path) as f:
+      checkpoint = json.load(f)
+    if checkpoint['props'] != props:
+      raise ValueError('{0} was exported with props {1}, not {2}'.format(path, checkpoint['props'], props))
+
+  done, offset = (checkpoint['done'], checkpoint['offset']) if checkpoint else (0, 0)
+  titles = iter(titles)
+  digest = hashlib.sha1()
+  _hash_titles(digest, itertools.islice(titles, done))
+  if checkpoint and digest.hexdigest() != checkpoint.get('titles'):
+    raise ValueError('{0} was exported from other titles, use resume=False to start over'.format(path))
+  exported = 0
+
+  with open(path, 'r+b' if checkpoint else 'wb') as f:
+    # lines written after the last checkpoint are written again
+    f.seek(offset)
+    f.truncate()
+
+    while True:
+      batch = list(itertools.islice(titles, BATCH_SIZE))
+      if not batch:
+        break
+
+      for record in _export_batch(batch, props, redirect, workers):
+        f.write((json.dumps(record, ensure_ascii=False, sort_keys=True) + '\n').encode('utf-8'))
+      f.flush()
+      os.fsync(f.fileno())
+
+      done += len(batch)
+      exported += len(batch)
+      _hash_titles(digest, batch)
+      _write_checkpoint(checkpoint_path, {
+        'done': done, 'offset': f.tell(), 'props': props, 'titles': digest.hexdigest()})
+
+  if os.path.exists(checkpoint_path):
+    os.remove(checkpoint_path)
+
+  return exported
+
+
+_EXPORT_PROPERTIES = (
+  'content', 'summary', 'images', 'references', 'links', 'categories', 'sections', 'coordinates',
+  'revision_id', 'parent_id')
+
+
+def _export_batch(titles, props, redirect, workers):
+  '''
+  Yield the export records of `titles`, in order.
+  '''
+  results = pages(titles, redirect=redirect)
+  loaded = [i for i, result in enumerate(results) if isinstance(result, WikipediaPage)]
+
+  batched = {}
+  for prop in props:
+    if prop in _EXPORT_BATCH_QUERIES:
+      batched[prop] = _export_batch_query(_unique(results[i].pageid for i in loaded), prop)
+
+  export_record = lambda i: _export_record(results[i], props, batched)
+  for i, record in _map_concurrently(export_record, loaded, workers):
+    results[i] = record
+
+  for title, result in zip(titles, results):
+    if isinstance(result, (PageError, DisambiguationError, RedirectError)):
+      record = {'query': title, 'error': type(result).__name__, 'message': '{0}'.format(result)}
+      if isinstance(result, DisambiguationError):
+        record['options'] = result.options
+      yield record
+    elif isinstance(result, Exception):
+      raise result
+    else:
+      record = result
+      record['query'] = title
+      yield record
+
+
+def _export_batch_query(pageids, prop):
+  '''
+  Load `prop` of the pages with `pageids` with as few requests as the API allows,
+  following continuations. Returns a dict of the values by pageid.
+  '''
+  query_params, size, read, value = _EXPORT_BATCH_QUERIES[prop]
+  items = dict((pageid, []) for pageid in pageids)
+
+  for start in range(0, len(pageids), size):
+    last_continue = {}
+
+    while True:
+      params = dict(query_params, pageids='|'.join(pageids[start:start + size]))
+      params.update(last_continue)
+      request = _wiki_request(params)
+
+      query = request.get('query')
+      if query is None:
+        break
+
+      for pageid, page in query['pages'].items():
+        if pageid in items:
+          items[pageid].extend(read(page))
+
+      if 'continue' not in request:
+        break
+
+      last_continue = request['continue']
+
+  return dict((pageid, value(page_items)) for pageid, page_items in items.items())
+
+
+def _export_record(page, props, batched):
+  page.prefetch([prop for prop in props if prop not in batched])
+
+  record = {'title': page.title, 'pageid': page.pageid, 'url': page.url}
+  for prop in props:
+    value = batched[prop][page.pageid] if prop in batched else getattr(page, prop)
+    if prop == 'coordinates' and value is not None:
+      value = [float(value[0]), float(value[1])]
+    record[prop] = value
+
+  page.release()
+  return record
+
+
+def _hash_titles(digest, titles):
+  # one title per line, pageids included, so that ['a', 'b'] and ['ab'] differ
+  for title in titles:
+    digest.update('{0}\n'.format(title).encode('utf-8'))
+
+
+def _write_checkpoint(path, checkpoint):
+  # written next to the checkpoint and renamed, so a crash never leaves it half written
+  temporary = path + '.tmp'
+  with open(temporary, 'w') as f:
+    json.dump(checkpoint, f)
+  getattr(os, 'replace', os.rename)(temporary, path)
+
+
+_PRELOAD_PROPERTIES = ('content', 'summary', 'images', 'references', 'links', 'sections')
+
+
+def _add_protocol(url):
+  return url if url.startswith('http') else 'http:' + url
+
+
+# Query parameters of the list properties of WikipediaPage, and how to read
+# their values from the items of a continued query. Shared with wikipedia.aio.
+_LIST_QUERIES = {
+  'images': (
+    {'generator': 'images', 'gimlimit': 'max', 'prop': 'imageinfo', 'iiprop': 'url'},
+    lambda pages: (page['imageinfo'][0]['url'] for page in pages if 'imageinfo' in page)
+  ),
+  'references': (
+    {'prop': 'extlinks', 'ellimit': 'max'},
+    lambda links: (_add_protocol(link['*']) for link in links)
+  ),
+  'links': (
+    {'prop': 'links', 'plnamespace': 0, 'pllimit': 'max'},
+    lambda links: (link['title'] for link in links)
+  ),
+  'categories': (
+    {'prop': 'categories', 'cllimit': 'max'},
+    lambda links: (re.sub(r'^Category:', '', link['title']) for link in links)
+  ),
+}
+
+
+# Query parameters of the properties WikipediaPage.prefetch can merge into a single query
+_PREFETCH_QUERIES = {
+  'content': {'prop': 'extracts|revisions', 'explaintext': '', 'rvprop': 'ids'},
+  'summary': {'prop': 'extracts', 'explaintext': '', 'exintro': ''},
+  'coordinates': {'prop': 'coordinates', 'colimit': 'max'},
+}
+for _name in ('references', 'links', 'categories'):
+  _PREFETCH_QUERIES[_name] = _LIST_QUERIES[_name][0]
+
+
+# Query parameters of the properties export loads for many pages per request, the
+# number of pages per request (the API returns at most 20 intro extracts at once),
+# and how to read the items of a page from a response and turn them into the value
+_EXPORT_BATCH_QUERIES = {
+  'summary': (
+    {'prop': 'extracts', 'explaintext': '', 'exintro': '', 'exlimit': 20}, 20,
+    lambda page: [page['extract']] if 'extract' in page else [],
+    ''.join
+  ),
+  'links': (
+    _LIST_QUERIES['links'][0], 50,
+    lambda page: page.get('links', []),
+    lambda links: list(_LIST_QUERIES['links'][1](links))
+  ),
+}
+
+
+def _merge_prefetch_queries(props):
+  '''
+  Group `props` so that no two properties in a group use the same prop module
+  (their parameters would clash), keeping as few groups as possible.
+  '''
+  groups = []
+  for prop in props:
+    modules = set(_PREFETCH_QUERIES[prop]['prop'].split('|'))
+    for group, group_modules in groups:
+      if not modules & group_modules:
+        group.append(prop)
+        group_modules.update(modules)
+        break
+    else:
+      groups.append(([prop], modules))
+
+  return [group for group, group_modules in groups]
 
-  if title is not None:
-    if auto_suggest:
-      results, suggestion = search(title, results=1, suggestion=True)
-      try:
-        title = suggestion or results[0]
-      except IndexError:
-        # if there is no suggestion or search results, the page doesn't exist
-        raise PageError(title)
-    return WikipediaPage(title, redirect=redirect, preload=preload)
-  elif pageid is not None:
-    return WikipediaPage(pageid=pageid, preload=preload)
-  else:
-    raise ValueError("Either a title or a pageid must be specified")
 
+def _continued_items(request, query_params, pageid):
+  '''
+  The items of one response to a continued query for the page `pageid`.
+  '''
+  pages = request['query']['pages']
+  if 'generator' in query_params:
+    return pages.values()
+  else:
+    return pages[pageid][query_params['prop']]
 
 
 class WikipediaPage(object):
@@ -287,6 +1463,30 @@ class WikipediaPage(object):
   Uses property methods to filter data from the raw HTML.
   '''
 
+  # the loaded data lives in slots rather than in a per-instance dict;
+  # __dict__ stays available for attributes set by users
+  __slots__ = (
+    'title', 'original_title', 'pageid', 'url', '_client',
+    '_content', '_revision_id', '_parent_id', '_summary', '_html', '_coordinates',
+    '_images', '_references', '_links', '_categories', '_sections', '_section_tree',
+    '__dict__', '__weakref__')
+
+  # the attributes holding each property, dropped by release()
+  _RELEASABLE = {
+    'content': ('_content', '_sections', '_section_tree'),
+    'html': ('_html',),
+    'summary': ('_summary',),
+    'images': ('_images',),
+    'references': ('_references',),
+    'links': ('_links',),
+    'categories': ('_categories',),
+    'sections': ('_sections', '_section_tree'),
+  }
+
+  # slots left out when pickling: the client holds locks and sessions that cannot be
+  # pickled, and the section tree is parsed again from the content when needed
+  _UNPICKLED = ('_client', '_section_tree', '__dict__', '__weakref__')
+
   def __init__(self, title=None, pageid=None, redirect=True, preload=False, original_title=''):
     if title is not None:
       self.title = title
@@ -296,15 +1496,55 @@ class WikipediaPage(object):
     else:
       raise ValueError("Either a title or a pageid must be specified")
 
+    self._client = _current_client()
     self.__load(redirect=redirect, preload=preload)
 
     if preload:
-      for prop in ('content', 'summary', 'images', 'references', 'links', 'sections'):
-        getattr(self, prop)
+      self.prefetch(_PRELOAD_PROPERTIES if preload is True else preload)
+
+  @classmethod
+  def _from_info(cls, page, original_title='', preload=False):
+    '''
+    Build a page from an already loaded ``prop=info`` query result, without another request.
+    '''
+    self = cls.__new__(cls)
+    self._client = _current_client()
+    self.original_title = original_title or page['title']
+    self.pageid = str(page['pageid'])
+    self.title = page['title']
+    self.url = page['fullurl']
+
+    if preload:
+      self.prefetch(_PRELOAD_PROPERTIES if preload is True else preload)
+
+    return self
 
   def __repr__(self):
     return stdout_encode(u'<WikipediaPage \'{}\'>'.format(self.title))
 
+  def __getstate__(self):
+    # pickle protocols 0 and 1 need the slots as a state of their own. They are read
+    # from the slots themselves, across subclasses, so that compact pages stay compressed
+    state = {}
+    for cls in type(self).__mro__:
+      for name in cls.__dict__.get('__slots__', ()):
+        if name in self._UNPICKLED:
+          continue
+        try:
+          state[name] = cls.__dict__[name].__get__(self, cls)
+        except AttributeError:
+          # unset
+          pass
+
+    state.update(self.__dict__)
+    return state
+
+  def __setstate__(self, state):
+    # an unpickled page makes its requests with the client active where it is loaded
+    self._client = _current_client()
+    for name, value in state.items():
+      setattr(self, name, value)
+
   def __eq__(self, other):
     try:
       return (
@@ -315,6 +1555,26 @@ class WikipediaPage(object):
     except:
       return False
 
+  def release(self, props=None):
+    '''
+    Free the memory held by loaded properties, keeping the title, pageid, URL
+    and revision IDs. Released properties are requested again when next used.
+
+    Keyword arguments:
+
+    * props - names of the properties to release, e.g. ``['content', 'links']``.
+           Defaults to all of ``content``, ``html``, ``summary``, ``images``,
+           ``references``, ``links``, ``categories`` and ``sections``
+    '''
+    for prop in (self._RELEASABLE if props is None else props):
+      if prop not in self._RELEASABLE:
+        raise ValueError('Cannot release {0!r}, expected one of {1}'.format(
+          prop, ', '.join(sorted(self._RELEASABLE))))
+
+      for name in self._RELEASABLE[prop]:
+        if hasattr(self, name):
+          delattr(self, name)
+
   def __load(self, redirect=True, preload=False):
     '''
     Load basic information from Wikipedia.
@@ -322,112 +1582,143 @@ class WikipediaPage(object):
 
     Does not need to be called manually, should be called automatically during __init__.
     '''
-    query_params = {
-      'prop': 'info|pageprops',
-      'inprop': 'url',
-      'ppprop': 'disambiguation',
-      'redirects': '',
-    }
     if not getattr(self, 'pageid', None):
-      query_params['titles'] = self.title
+      title = self.title
+      page_info = _cached_title(title, redirect)
+      if page_info is not None:
+        self.pageid, self.title, self.url = page_info['pageid'], page_info['title'], page_info['fullurl']
+        return
+
+      query_params = _page_info_params({'titles': title})
     else:
-      query_params['pageids'] = self.pageid
+      title = None
+      query_params = _page_info_params({'pageids': self.pageid})
 
-    request = _wiki_request(query_params)
+    request = self.__request(query_params)
 
-    query = request['query']
-    pageid = list(query['pages'].keys())[0]
-    page = query['pages'][pageid]
+    pageid, page, redirected = _resolved_page(request['query'], title, getattr(self, 'pageid', None), redirect)
 
-    # missing is present if the page is missing
-    if 'missing' in page:
-      if hasattr(self, 'title'):
-        raise PageError(self.title)
+    # since we only asked for disambiguation in ppprop,
+    # if a pageprop is returned,
+    # then the page must be a disambiguation page
+    if 'pageprops' in page:
+      if redirected:
+        title_param, title = {'titles': page['title']}, page['title']
       else:
-        raise PageError(pageid=self.pageid)
+        title_param, title = self.__title_query_param, getattr(self, 'title', page['title'])
+      may_refer_to = _disambiguation_options(pageid, title_param, page.get('lastrevid'))
 
-    # same thing for redirect, except it shows up in query instead of page for
-    # whatever silly reason
-    elif 'redirects' in query:
-      if redirect:
-        redirects = query['redirects'][0]
+      raise DisambiguationError(title, may_refer_to)
 
-        if 'normalized' in query:
-          normalized = query['normalized'][0]
-          assert normalized['from'] == self.title, ODD_ERROR_MESSAGE
+    if title is not None:
+      _cache_title(title, page, redirected)
 
-          from_title = normalized['to']
+    self.pageid = pageid
+    self.title = page['title']
+    self.url = page['fullurl']
 
-        else:
-          from_title = self.title
+  def __request(self, params):
+    '''
+    Make a request with the settings of the client the page was loaded with.
+    '''
+    with self._client._activated():
+      return _wiki_request(params)
 
-        assert redirects['from'] == from_title, ODD_ERROR_MESSAGE
+  def prefetch(self, props=_PRELOAD_PROPERTIES):
+    '''
+    Load the properties named in `props` with as few requests as possible.
 
-        # change the title and reload the whole object
-        self.__init__(redirects['to'], redirect=redirect, preload=preload)
+    Properties served by the same kind of query (``content``, ``summary``,
+    ``references``, ``links``, ``categories`` and ``coordinates``) are merged
+    into one continued query and filled in from its responses. Only properties
+    that cannot share it get requests of their own: ``images`` (a generator query)
+    and ``summary`` when ``content`` is also requested. ``sections`` is read from ``content``.
 
-      else:
-        raise RedirectError(getattr(self, 'title', page['title']))
+    Properties that are already loaded are skipped.
+    '''
+    props = [prop for prop in props if not (
+      getattr(self, '_' + prop, False) or prop == 'coordinates' and hasattr(self, '_coordinates'))]
 
-    # since we only asked for disambiguation in ppprop,
-    # if a pageprop is returned,
-    # then the page must be a disambiguation page
-    elif 'pageprops' in page:
-      query_params = {
-        'prop': 'revisions',
-        'rvprop': 'content',
-        'rvparse': '',
-        'rvlimit': 1
-      }
-      if hasattr(self, 'pageid'):
-        query_params['pageids'] = self.pageid
-      else:
-        query_params['titles'] = self.title
-      request = _wiki_request(query_params)
-      html = request['query']['pages'][pageid]['revisions'][0]['*']
+    for group in _merge_prefetch_queries([prop for prop in props if prop in _PREFETCH_QUERIES]):
+      self.__prefetch_group(group)
+
+    for prop in props:
+      if prop not in _PREFETCH_QUERIES:
+        getattr(self, prop)
 
-      lis = BeautifulSoup(html, 'html.parser').find_all('li')
-      filtered_lis = [li for li in lis if not 'tocsection' in ''.join(li.get('class', []))]
-      may_refer_to = [li.a.get_text() for li in filtered_lis if li.a]
+  def __prefetch_group(self, group):
+    modules = []
+    query_params = {}
+    for prop in group:
+      params = dict(_PREFETCH_QUERIES[prop])
+      modules.extend(params.pop('prop').split('|'))
+      query_params.update(params)
+    query_params['prop'] = '|'.join(modules)
 
-      raise DisambiguationError(getattr(self, 'title', page['title']), may_refer_to)
+    items = dict((prop, []) for prop in group if prop in _LIST_QUERIES)
+    coordinates = None
 
-    else:
-      self.pageid = pageid
-      self.title = page['title']
-      self.url = page['fullurl']
+    for request in self.__continued_requests(query_params):
+      page = request['query']['pages'][self.pageid]
 
-  def __continued_query(self, query_params):
+      if 'content' in group and 'extract' in page:
+        self._content = page['extract']
+        self._revision_id = page['revisions'][0]['revid']
+        self._parent_id = page['revisions'][0]['parentid']
+      if 'summary' in group and 'extract' in page:
+        self._summary = page['extract']
+      if 'coordinates' in page and coordinates is None:
+        coordinates = _decimal_coordinates(page['coordinates'])
+
+      for prop in items:
+        items[prop].extend(page.get(_LIST_QUERIES[prop][0]['prop'], []))
+
+    if 'coordinates' in group:
+      self._coordinates = coordinates
+
+    for prop, prop_items in items.items():
+      setattr(self, '_' + prop, list(_LIST_QUERIES[prop][1](prop_items)))
+
+  def __continued_requests(self, query_params):
     '''
     Based on https://www.mediawiki.org/wiki/API:Query#Continuing_queries
     '''
     query_params.update(self.__title_query_param)
 
     last_continue = {}
-    prop = query_params.get('prop', None)
 
     while True:
       params = query_params.copy()
       params.update(last_continue)
 
-      request = _wiki_request(params)
+      request = self.__request(params)
 
       if 'query' not in request:
         break
 
-      pages = request['query']['pages']
-      if 'generator' in query_params:
-        for datum in pages.values():  # in python 3.3+: "yield from pages.values()"
-          yield datum
-      else:
-        for datum in pages[self.pageid][prop]:
-          yield datum
+      yield request
 
       if 'continue' not in request:
         break
 
       last_continue = request['continue']
 
+  def __continued_query(self, query_params):
+    for request in self.__continued_requests(query_params):
+      for datum in _continued_items(request, query_params, self.pageid):  # in python 3.3+: "yield from ..."
+        yield datum
+
+  def __list_query(self, name):
+    return list(self.__iter_list(name))
+
+  def __iter_list(self, name):
+    loaded = getattr(self, '_' + name, False)
+    if loaded:
+      return iter(loaded)
+
+    query_params, values = _LIST_QUERIES[name]
+    return values(self.__continued_query(dict(query_params)))
+
   @property
   def __title_query_param(self):
     if getattr(self, 'title', None) is not None:
@@ -451,7 +1742,7 @@ class WikipediaPage(object):
         'titles': self.title
       }
 
-      request = _wiki_request(query_params)
+      request = self.__request(query_params)
       self._html = request['query']['pages'][self.pageid]['revisions'][0]['*']
 
     return self._html
@@ -472,7 +1763,7 @@ class WikipediaPage(object):
          query_params['titles'] = self.title
       else:
          query_params['pageids'] = self.pageid
-      request = _wiki_request(query_params)
+      request = self.__request(query_params)
       self._content     = request['query']['pages'][self.pageid]['extract']
       self._revision_id = request['query']['pages'][self.pageid]['revisions'][0]['revid']
       self._parent_id   = request['query']['pages'][self.pageid]['revisions'][0]['parentid']
@@ -491,7 +1782,7 @@ class WikipediaPage(object):
     information.
     '''
 
-    if not getattr(self, '_revid', False):
+    if not getattr(self, '_revision_id', False):
       # fetch the content (side effect is loading the revid)
       self.content
 
@@ -504,7 +1795,7 @@ class WikipediaPage(object):
     page. See ``revision_id`` for more information.
     '''
 
-    if not getattr(self, '_parentid', False):
+    if not getattr(self, '_parent_id', False):
       # fetch the content (side effect is loading the revid)
       self.content
 
@@ -527,7 +1818,7 @@ class WikipediaPage(object):
       else:
          query_params['pageids'] = self.pageid
 
-      request = _wiki_request(query_params)
+      request = self.__request(query_params)
       self._summary = request['query']['pages'][self.pageid]['extract']
 
     return self._summary
@@ -539,36 +1830,39 @@ class WikipediaPage(object):
     '''
 
     if not getattr(self, '_images', False):
-      self._images = [
-        page['imageinfo'][0]['url']
-        for page in self.__continued_query({
-          'generator': 'images',
-          'gimlimit': 'max',
-          'prop': 'imageinfo',
-          'iiprop': 'url',
-        })
-        if 'imageinfo' in page
-      ]
+      self._images = self.__list_query('images')
 
     return self._images
 
+  def iter_images(self):
+    '''
+    Generator of the URLs of images on the page, like ``images``, but yielding
+    each batch of results as it arrives. Stop early to skip the remaining requests.
+
+    Nothing is kept in memory: iterating again makes the requests again,
+    unless ``images`` has been loaded.
+    '''
+    return self.__iter_list('images')
+
   @property
   def coordinates(self):
     '''
     Tuple of Decimals in the form of (lat, lon) or None
+
+    Use ``wikipedia.coordinates`` to load the coordinates of many pages at once.
     '''
-    if not getattr(self, '_coordinates', False):
+    # None is remembered too: the page has no coordinates
+    if not hasattr(self, '_coordinates'):
       query_params = {
         'prop': 'coordinates',
         'colimit': 'max',
         'titles': self.title,
       }
 
-      request = _wiki_request(query_params)
+      request = self.__request(query_params)
 
-      if 'query' in request:
-        coordinates = request['query']['pages'][self.pageid]['coordinates']
-        self._coordinates = (Decimal(coordinates[0]['lat']), Decimal(coordinates[0]['lon']))
+      if 'query' in request and 'coordinates' in request['query']['pages'][self.pageid]:
+        self._coordinates = _decimal_coordinates(request['query']['pages'][self.pageid]['coordinates'])
       else:
         self._coordinates = None
 
@@ -582,19 +1876,16 @@ class WikipediaPage(object):
     '''
 
     if not getattr(self, '_references', False):
-      def add_protocol(url):
-        return url if url.startswith('http') else 'http:' + url
-
-      self._references = [
-        add_protocol(link['*'])
-        for link in self.__continued_query({
-          'prop': 'extlinks',
-          'ellimit': 'max'
-        })
-      ]
+      self._references = self.__list_query('references')
 
     return self._references
 
+  def iter_references(self):
+    '''
+    Generator of the URLs of external links on a page, streamed like ``iter_images``.
+    '''
+    return self.__iter_list('references')
+
   @property
   def links(self):
     '''
@@ -604,17 +1895,16 @@ class WikipediaPage(object):
     '''
 
     if not getattr(self, '_links', False):
-      self._links = [
-        link['title']
-        for link in self.__continued_query({
-          'prop': 'links',
-          'plnamespace': 0,
-          'pllimit': 'max'
-        })
-      ]
+      self._links = self.__list_query('links')
 
     return self._links
 
+  def iter_links(self):
+    '''
+    Generator of the titles of Wikipedia page links on a page, streamed like ``iter_images``.
+    '''
+    return self.__iter_list('links')
+
   @property
   def categories(self):
     '''
@@ -622,32 +1912,26 @@ class WikipediaPage(object):
     '''
 
     if not getattr(self, '_categories', False):
-      self._categories = [re.sub(r'^Category:', '', x) for x in
-        [link['title']
-        for link in self.__continued_query({
-          'prop': 'categories',
-          'cllimit': 'max'
-        })
-      ]]
+      self._categories = self.__list_query('categories')
 
     return self._categories
 
+  def iter_categories(self):
+    '''
+    Generator of the categories of a page, streamed like ``iter_images``.
+    '''
+    return self.__iter_list('categories')
+
   @property
   def sections(self):
     '''
-    List of section titles from the table of contents on the page.
+    List of section titles of the page, including subsections, in document order.
+
+    Read from the headings of `self.content`, so no further request is made once it is loaded.
     '''
 
     if not getattr(self, '_sections', False):
-      query_params = {
-        'action': 'parse',
-        'prop': 'sections',
-      }
-      if not getattr(self, 'title', None) is None:
-          query_params["page"] = self.title
-
-      request = _wiki_request(query_params)
-      self._sections = [section['line'] for section in request['parse']['sections']]
+      self._sections = [section.title for section in self.__section_tree.sections]
 
     return self._sections
 
@@ -656,25 +1940,164 @@ class WikipediaPage(object):
     Get the plain text content of a section from `self.sections`.
     Returns None if `section_title` isn't found, otherwise returns a whitespace stripped string.
 
-    This is a convenience method that wraps self.content.
+    The text includes the subsections of the section, with their headings.
 
-    .. warning:: Calling `section` on a section that has subheadings will NOT return
-           the full text of all of the subsections. It only gets the text between
-           `section_title` and the next subheading, which is often empty.
+    This is a convenience method that wraps self.content.
     '''
 
-    section = u"== {} ==".format(section_title)
-    try:
-      index = self.content.index(section) + len(section)
-    except ValueError:
+    return self.__section_tree.text(section_title)
+
+  @property
+  def __section_tree(self):
+    tree = getattr(self, '_section_tree', None)
+    if tree is None:
+      tree = self._section_tree = SectionTree(self.content)
+
+    return tree
+
+
+class _Compressed(object):
+  '''
+  Descriptor keeping a text, or a list of texts, zlib-compressed in the attribute
+  `slot` and decompressing it on every access.
+  '''
+
+  def __init__(self, slot, is_list=False):
+    self.slot = slot
+    self.is_list = is_list
+
+  def __get__(self, page, owner):
+    if page is None:
+      return self
+
+    # raises AttributeError while unset, like an empty slot
+    text = zlib.decompress(getattr(page, self.slot)).decode('utf-8')
+    if self.is_list:
+      return text.split('\n') if text else []
+    return text
+
+  def __set__(self, page, value):
+    if self.is_list:
+      # titles and URLs never contain newlines
+      value = '\n'.join(value)
+    setattr(page, self.slot, zlib.compress(value.encode('utf-8')))
+
+  def __delete__(self, page):
+    delattr(page, self.slot)
+
+
+class CompactWikipediaPage(WikipediaPage):
+  '''
+  A WikipediaPage using less memory, for holding many pages at once.
+
+  ``content``, ``html``, ``summary`` and the lists of ``images``, ``references``,
+  ``links`` and ``categories`` are kept zlib-compressed and decompressed on each
+  access, so read a property once into a variable rather than in a loop.
+  ``section`` parses ``content`` on every call instead of keeping it parsed.
+  Use ``release`` to drop properties entirely.
+
+  Get one with ``page(..., compact=True)`` or ``pages(..., compact=True)``.
+  '''
+
+  __slots__ = (
+    '_zcontent', '_zhtml', '_zsummary', '_zimages', '_zreferences', '_zlinks', '_zcategories')
+
+  _content = _Compressed('_zcontent')
+  _html = _Compressed('_zhtml')
+  _summary = _Compressed('_zsummary')
+  _images = _Compressed('_zimages', is_list=True)
+  _references = _Compressed('_zreferences', is_list=True)
+  _links = _Compressed('_zlinks', is_list=True)
+  _categories = _Compressed('_zcategories', is_list=True)
+
+  @property
+  def _section_tree(self):
+    raise AttributeError('_section_tree')
+
+  @_section_tree.setter
+  def _section_tree(self, tree):
+    # parsed again when needed instead of holding the uncompressed content
+    pass
+
+  @_section_tree.deleter
+  def _section_tree(self):
+    pass
+
+  def __repr__(self):
+    return stdout_encode(u'<CompactWikipediaPage \'{}\'>'.format(self.title))
+
+
+class SectionTree(object):
+  '''
+  Headings of the plain text content of a page, parsed once so that sections
+  are found by title in constant time.
+
+  Arguments:
+
+  * content - the page content as returned by ``WikipediaPage.content``
+
+  ``sections`` lists all sections in document order; each has a title, a
+  nesting level (2 for ``== Title ==``, 3 for ``=== Title ===``...), the
+  offsets of its text in `content` including subsections, and its subsections.
+  ``roots`` lists the top level sections.
+  '''
+
+  HEADING = re.compile(r'^(={2,6})\s*(.+?)\s*\1\s*$', re.MULTILINE)
+
+  def __init__(self, content):
+    self.content = content
+    self.sections = []
+    self.roots = []
+    self._by_title = {}
+
+    open_sections = []
+    for match in self.HEADING.finditer(content):
+      level = len(match.group(1))
+      while open_sections and open_sections[-1].level >= level:
+        open_sections.pop().end = match.start()
+
+      section = Section(match.group(2), level, match.end())
+      (open_sections[-1].subsections if open_sections else self.roots).append(section)
+      open_sections.append(section)
+      self.sections.append(section)
+      self._by_title.setdefault(section.title, section)
+
+    for section in open_sections:
+      section.end = len(content)
+
+  def __getitem__(self, title):
+    return self._by_title[title]
+
+  def __contains__(self, title):
+    return title in self._by_title
+
+  def text(self, title):
+    '''
+    The whitespace stripped text of the first section called `title`, or None if there is none.
+    '''
+    section = self._by_title.get(title)
+    if section is None:
       return None
 
-    try:
-      next_index = self.content.index("==", index)
-    except ValueError:
-      next_index = len(self.content)
+    return self.content[section.start:section.end].strip()
+
 
-    return self.content[index:next_index].lstrip("=").strip()
+class Section(object):
+  '''
+  A section in a ``SectionTree``.
+  '''
+
+  __slots__ = ('title', 'level', 'start', 'end', 'subsections')
+
+  def __init__(self, title, level, start, end=None):
+    self.title = title
+    self.level = level
+    self.start = start
+    self.end = end
+    self.subsections = []
+
+  def __repr__(self):
+    return 'Section({0!r}, level={1})'.format(self.title, self.level)
 
 
 @cache
@@ -701,6 +2124,21 @@ def languages():
   }
 
 
+def raw_request(params):
+  '''
+  Make a request to the Wikipedia API and return the response body as
+  undecoded bytes, for callers that only store or forward the JSON payload.
+
+  Rate limiting and retries apply as usual, but the response cache is bypassed.
+
+  Arguments:
+
+  * params - a dict of `API parameters <https://www.mediawiki.org/wiki/API:Main_page>`_.
+         ``format`` is always ``json``, ``action`` defaults to ``query``
+  '''
+  return _wiki_request(dict(params), raw=True)
+
+
 def donate():
   '''
   Open up the Wikimedia donate page in your favorite browser.
@@ -710,34 +2148,339 @@ def donate():
   webbrowser.open('https://donate.wikimedia.org/w/index.php?title=Special:FundraiserLandingPage', new=2)
 
 
-def _wiki_request(params):
+class WikipediaClient(object):
+  '''
+  A connection to one Wikipedia with its own language, User-Agent, rate limiter,
+  HTTP session and caches, so that several languages or configurations can be
+  used side by side, including from different threads.
+
+  Clients have the module-level functions as methods, e.g. ``client.search("Porsche")``
+  or ``client.page("Porsche")``. Pages remember the client they were loaded with and
+  make their later requests with it. The module-level functions use ``DEFAULT_CLIENT``,
+  which follows ``set_lang``, ``set_user_agent``, ``set_rate_limiting`` and ``set_transport``.
+
+  Retries, timeouts, the JSON decoder and the response cache are configured for all
+  clients with the module-level functions.
+
+  Keyword arguments:
+
+  * lang - the language prefix of the Wikipedia to request, see ``set_lang``. Defaults to ``en``
+  * user_agent - the User-Agent header to send. Defaults to the one set with ``set_user_agent``
+  * rate_limit - whether to rate limit requests. `min_wait` and `burst` configure the
+         limiter as in ``set_rate_limiting``; the limit only applies to this client
+  * transport - the transport sending requests. Defaults to an ``HTTPTransport`` with a session of its own
+  '''
+
+  def __init__(self, lang='en', user_agent=None, rate_limit=False, min_wait=timedelta(milliseconds=50),
+               burst=1, transport=None):
+    self.api_url = _api_url(lang)
+    self.user_agent = user_agent or USER_AGENT
+    self.rate_limiter = _rate_limiter(min_wait, burst) if rate_limit else None
+    self.transport = transport or HTTPTransport(_new_session(POOL_SIZE))
+    self._caches = {}
+
+  def __repr__(self):
+    return '<WikipediaClient {0!r}>'.format(self.api_url)
+
+  def _cache_for(self, cached_func):
+    '''
+    The LRUCache holding this client's results of the cached function `cached_func`,
+    with the same size and time to live.
+    '''
+    store = self._caches.get(cached_func.name)
+    if store is None:
+      info = cached_func._cache.info()
+      store = self._caches.setdefault(cached_func.name, LRUCache(info['maxsize'], info['ttl']))
+    return store
+
+  def clear_cache(self):
+    '''
+    Clear the cached results of this client.
+    '''
+    for store in list(self._caches.values()):
+      store.clear()
+
+  def close(self):
+    '''
+    Close the HTTP session of the client.
+    '''
+    self.transport.close()
+
+  @contextmanager
+  def _activated(self):
+    '''
+    Make the requests of the current thread with this client.
+    '''
+    previous = getattr(_LOCAL, 'client', None)
+    _LOCAL.client = self
+    try:
+      yield self
+    finally:
+      _LOCAL.client = previous
+
+  def _call(self, fn, *args, **kwargs):
+    with self._activated():
+      return fn(*args, **kwargs)
+
+  def _method(fn):
+    def method(self, *args, **kwargs):
+      return self._call(fn, *args, **kwargs)
+
+    functools.update_wrapper(method, fn)
+    return method
+
+  search = _method(search)
+  geosearch = _method(geosearch)
+  geosearch_many = _method(geosearch_many)
+  suggest = _method(suggest)
+  summary = _method(summary)
+  random = _method(random)
+  page = _method(page)
+  pages = _method(pages)
+  map_summaries = _method(map_summaries)
+  map_pages = _method(map_pages)
+  coordinates = _method(coordinates)
+  languages = _method(languages)
+  raw_request = _method(raw_request)
+  del _method
+
+
+class _DefaultClient(WikipediaClient):
+  '''
+  The client of the module-level functions, reading the module-level settings.
+  '''
+
+  def __init__(self):
+    pass
+
+  @property
+  def api_url(self):
+    return API_URL
+
+  @property
+  def user_agent(self):
+    return USER_AGENT
+
+  @property
+  def rate_limiter(self):
+    return RATE_LIMITER
+
+  @property
+  def transport(self):
+    return _get_transport()
+
+  def _cache_for(self, cached_func):
+    return cached_func._cache
+
+  def clear_cache(self):
+    for cached_func in (search, geosearch, suggest, summary, languages):
+      cached_func._cache.clear()
+    _GEO_CACHE.clear()
+
+
+DEFAULT_CLIENT = _DefaultClient()
+
+
+def _raise_for_error(raw_results, query):
+  '''
+  Raise the matching exception if the API answered a request for `query` with an error.
+  '''
+  if 'error' in raw_results:
+    if raw_results['error']['info'] in _TIMEOUT_ERRORS:
+      raise HTTPTimeoutError(query)
+    else:
+      raise WikipediaException(raw_results['error']['info'])
+
+
+def _api_error(response):
+  '''
+  The ``error`` object of an API response, or None. Raw responses are not inspected.
+  '''
+  return response.get('error') if isinstance(response, dict) else None
+
+
+_TIMEOUT_ERRORS = ('HTTP request timed out.', 'Pool queue is full')
+
+
+# modules answering differently on every request, which must never be cached
+_RANDOM_MODULES = (('list', 'random'), ('generator', 'random'))
+
+
+def _is_deterministic(params):
+  '''
+  Whether repeating the request with `params` gives the same response, so that it may be cached.
+  '''
+  return not any(
+    module in '{0}'.format(params.get(name, '')).split('|') for name, module in _RANDOM_MODULES)
+
+
+def _is_transient_error(response):
+  '''
+  Whether the API refused the request because of server load, so that it is worth retrying.
+  '''
+  if isinstance(response, bytes):
+    # raw responses are only decoded when they carry an error
+    if not response.startswith(b'{"error"'):
+      return False
+    response = JSON_DECODER(response)
+
+  error = response.get('error')
+  return error is not None and (error.get('code') == 'maxlag' or error.get('info') in _TIMEOUT_ERRORS)
+
+
+def _get_session():
+  '''
+  Return the shared `requests.Session`, creating it on first use.
+  '''
+  global _SESSION
+
+  with _SESSION_LOCK:
+    if _SESSION is None:
+      _SESSION = _new_session(POOL_SIZE)
+
+    return _SESSION
+
+
+def _new_session(pool_size):
+  session = requests.Session()
+  adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+  session.mount('http://', adapter)
+  session.mount('https://', adapter)
+  return session
+
+
+def _get_transport():
+  global TRANSPORT
+
+  if TRANSPORT is None:
+    TRANSPORT = HTTPTransport()
+
+  return TRANSPORT
+
+
+def _attempt_outcome(r, error, raw, retry_policy, attempt, started):
+  '''
+  Decide what follows attempt number `attempt` (counted from 0) of a request
+  started at `started`, which returned the transport response `r` or raised the
+  connection `error`. Shared by the blocking and the asyncio request paths,
+  which only differ in how they wait.
+
+  Returns ``(response, None)`` when the request is done, with the decoded
+  response (the undecoded bytes if `raw`), or ``(None, delay)`` when it should
+  be sent again after `delay` seconds. Raises the error once `retry_policy`
+  gives up.
+  '''
+  if error is not None:
+    delay = retry_policy.delay(attempt, started)
+    if delay is None:
+      raise error
+    return None, delay
+
+  if r.status_code in RETRY_STATUS_CODES:
+    response = None
+  else:
+    response = r.content if raw else JSON_DECODER(r.content)
+    if not _is_transient_error(response):
+      return response, None
+
+  delay = retry_policy.delay(attempt, started, r.headers.get('Retry-After'))
+  if delay is None:
+    if response is None:
+      raise _http_error(r)
+    # out of retries: let the caller handle the API error
+    return response, None
+
+  return None, delay
+
+
+def _http_error(r):
+  '''
+  The exception raised for a failed HTTP response `r`.
+  '''
+  return requests.HTTPError('{0} Error for url: {1}'.format(r.status_code, _current_client().api_url), response=r)
+
+
+def _wiki_request(params, raw=False, coalesce=True):
   '''
   Make a request to the Wikipedia API using the given search parameters.
-  Returns a parsed dict of the JSON response.
+  Returns a parsed dict of the JSON response, or the undecoded bytes if `raw`.
+
+  Identical requests made by several threads at once are sent only once,
+  unless `coalesce` is False.
   '''
-  global RATE_LIMIT_LAST_CALL
-  global USER_AGENT
+  client = _current_client()
 
   params['format'] = 'json'
   if not 'action' in params:
     params['action'] = 'query'
 
+  cache_key = None
+  if RESPONSE_CACHE is not None and not raw and _is_deterministic(params):
+    cache_key = RESPONSE_CACHE.key(client.api_url, params)
+    response = RESPONSE_CACHE.get(cache_key)
+    if response is not None:
+      instrumentation.cache_hit('response', cache_key)
+      return response
+    instrumentation.cache_miss('response', cache_key)
+
+  retry_policy = RETRY_POLICY
+  if retry_policy.maxlag is not None:
+    params['maxlag'] = retry_policy.maxlag
+
+  transport = client.transport
+  if not coalesce:
+    return _send_request(client, transport, params, raw, retry_policy, cache_key)
+
+  # threads making the same request at the same time share one response
+  key = (id(transport), client.api_url, raw) + request_key(None, params)[1:]
+  return _IN_FLIGHT.do(key, _send_request, client, transport, params, raw, retry_policy, cache_key)
+
+
+# requests being sent, see SingleFlight
+_IN_FLIGHT = SingleFlight()
+
+
+def _send_request(client, transport, params, raw, retry_policy, cache_key):
+  '''
+  Send a request with retries, and store the response under `cache_key` in the response cache.
+  '''
   headers = {
-    'User-Agent': USER_AGENT
+    'User-Agent': client.user_agent,
+    'Accept-Encoding': ACCEPT_ENCODING
   }
 
-  if RATE_LIMIT and RATE_LIMIT_LAST_CALL and \
-    RATE_LIMIT_LAST_CALL + RATE_LIMIT_MIN_WAIT > datetime.now():
+  instrumentation.before_request(params)
+  started = _clock()
+  attempt = 0
+  size = 0
+
+  try:
+    while True:
+      rate_limiter = client.rate_limiter
+      if rate_limiter is not None:
+        # wait until the limiter lets this request through
+        rate_limiter.wait()
+
+      try:
+        r = transport.get(client.api_url, params, headers, TIMEOUT)
+      except transport.errors as e:
+        response, delay = _attempt_outcome(None, e, raw, retry_policy, attempt, started)
+      else:
+        size += len(r.content)
+        response, delay = _attempt_outcome(r, None, raw, retry_policy, attempt, started)
 
-    # it hasn't been long enough since the last API call
-    # so wait until we're in the clear to make the request
+      if delay is None:
+        break
 
-    wait_time = (RATE_LIMIT_LAST_CALL + RATE_LIMIT_MIN_WAIT) - datetime.now()
-    time.sleep(int(wait_time.total_seconds()))
+      time.sleep(delay)
+      attempt += 1
+  except Exception as e:
+    instrumentation.after_request(params, _clock() - started, size, attempt, e)
+    raise
 
-  r = requests.get(API_URL, params=params, headers=headers)
+  instrumentation.after_request(params, _clock() - started, size, attempt, _api_error(response))
 
-  if RATE_LIMIT:
-    RATE_LIMIT_LAST_CALL = datetime.now()
+  if cache_key is not None and 'error' not in response:
+    RESPONSE_CACHE.set(cache_key, response)
 
-  return r.json()
+  return response